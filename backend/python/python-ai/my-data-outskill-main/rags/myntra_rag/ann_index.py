@@ -0,0 +1,232 @@
+from typing import Optional, Tuple
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq")
+STORAGE_TYPES = ("float32", "float16", "int8", "pq")
+
+# Map index pages on demand and share them through the OS page cache.
+# IO_FLAG_MMAP covers IVF inverted lists, IO_FLAG_MMAP_IFC flat code arrays.
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+MMAP_ALL_FLAGS = MMAP_FLAGS | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+
+
+def _pq_subquantizers(dim: int, requested: int) -> int:
+    """Largest number of PQ sub-quantizers <= requested that divides dim"""
+    for m in range(min(requested, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _scalar_quantizer(storage: str) -> int:
+    """FAISS scalar quantizer type for float16 / int8 storage"""
+    if storage == "float16":
+        return faiss.ScalarQuantizer.QT_fp16
+    return faiss.ScalarQuantizer.QT_8bit
+
+
+def build_faiss_index(
+    vectors: np.ndarray,
+    index_type: str = "flat",
+    ivf_nlist: int = 1024,
+    pq_m: int = 16,
+    pq_nbits: int = 8,
+    hnsw_m: int = 32,
+    hnsw_ef_construction: int = 200,
+    train_size: int = 100_000,
+    seed: int = 42,
+    storage: str = "float32",
+) -> faiss.Index:
+    """Create an empty (but trained) FAISS index of the requested type
+
+    `storage` sets how each vector is kept: "float32" (exact), "float16",
+    "int8" (scalar quantized, 2x / 4x smaller) or "pq" (pq_m codes of
+    pq_nbits bits). ivfpq is always product quantized. Indexes that need
+    training use a random sample of at most `train_size` vectors. When there
+    are too few vectors to train the requested layout, the number of lists is
+    reduced, PQ falls back to float16 or a flat index is returned instead.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(
+            f"Unknown index_type '{index_type}'. Choose from: {', '.join(INDEX_TYPES)}"
+        )
+    if storage not in STORAGE_TYPES:
+        raise ValueError(
+            f"Unknown storage '{storage}'. Choose from: {', '.join(STORAGE_TYPES)}"
+        )
+
+    n, dim = vectors.shape
+    m = _pq_subquantizers(dim, pq_m)
+    if storage == "pq" and index_type != "ivfpq" and n < 2**pq_nbits:
+        print(f"Only {n} vectors - too few to train PQ codes, storing float16")
+        storage = "float16"
+
+    if index_type == "flat":
+        if storage == "float32":
+            return faiss.IndexFlatL2(dim)
+        if storage == "pq":
+            index = faiss.IndexPQ(dim, m, pq_nbits)
+        else:
+            index = faiss.IndexScalarQuantizer(dim, _scalar_quantizer(storage))
+        return _train(index, vectors, train_size, seed, f"{storage} flat index")
+
+    if index_type == "hnsw":
+        if storage == "float32":
+            index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        elif storage == "pq":
+            index = faiss.IndexHNSWPQ(dim, m, hnsw_m)
+        else:
+            index = faiss.IndexHNSWSQ(dim, _scalar_quantizer(storage), hnsw_m)
+        index.hnsw.efConstruction = hnsw_ef_construction
+        return _train(index, vectors, train_size, seed, f"{storage} hnsw index")
+
+    # FAISS wants ~39 training points per inverted list
+    nlist = min(ivf_nlist, n // 39)
+    if index_type == "ivfpq" and n < 2**pq_nbits:
+        nlist = 0
+    if nlist < 1:
+        print(f"Only {n} vectors - too few to train '{index_type}', using a flat index")
+        return faiss.IndexFlatL2(dim)
+
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivfpq" or storage == "pq":
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, pq_nbits)
+    elif storage == "float32":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        index = faiss.IndexIVFScalarQuantizer(
+            quantizer, dim, nlist, _scalar_quantizer(storage)
+        )
+    return _train(
+        index, vectors, train_size, seed, f"{index_type} index ({nlist} lists)"
+    )
+
+
+def _train(
+    index: faiss.Index, vectors: np.ndarray, train_size: int, seed: int, label: str
+) -> faiss.Index:
+    """Train index (if it needs it) on a sample rather than the whole catalog"""
+    if index.is_trained:
+        return index
+    n = len(vectors)
+    if n > train_size:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, train_size, replace=False)]
+    else:
+        sample = vectors
+    print(f"Training {label} on {len(sample)} vectors...")
+    index.train(np.ascontiguousarray(sample, dtype=np.float32))
+    return index
+
+
+def set_search_params(
+    index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None
+):
+    """Apply query-time tuning knobs to whichever index type is in use"""
+    ivf = None
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        pass
+    if ivf is not None and nprobe:
+        ivf.nprobe = nprobe
+
+    if hasattr(index, "hnsw") and ef_search:
+        index.hnsw.efSearch = ef_search
+
+
+def filter_params(
+    index: faiss.Index,
+    bitmap: np.ndarray,
+    nprobe: int = 16,
+    ef_search: int = 64,
+) -> faiss.SearchParameters:
+    """Search parameters that skip every position not set in a packed bitmap
+
+    Per-search parameters replace the index's own nprobe / efSearch, so both
+    are passed again. The caller must keep `bitmap` alive until the search
+    has run.
+    """
+    selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+    if hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    if hasattr(index, "nprobe"):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def supports_selector(index: faiss.Index) -> bool:
+    """Flat PQ indexes reject per-search ID selectors"""
+    return not isinstance(index, faiss.IndexPQ)
+
+
+def filtered_search(
+    index: faiss.Index,
+    queries: np.ndarray,
+    k: int,
+    bitmap: np.ndarray,
+    nprobe: int = 16,
+    ef_search: int = 64,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """index.search limited to the positions set in a packed bitmap
+
+    Indexes that take an ID selector skip the other positions while
+    searching. The rest over-fetch and drop them, widening the search until
+    every query has k hits or the whole index has been scanned. Results are
+    padded with -1.
+    """
+    if supports_selector(index):
+        params = filter_params(index, bitmap, nprobe, ef_search)
+        return index.search(queries, k, params=params)
+
+    ntotal = index.ntotal
+    allowed = np.unpackbits(bitmap, count=ntotal, bitorder="little").astype(bool)
+    matches = int(allowed.sum())
+    distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+    positions = np.full((len(queries), k), -1, dtype=np.int64)
+    if not matches:
+        return distances, positions
+
+    # k hits are expected among k * ntotal / matches candidates; fetch twice that
+    fetch = min(ntotal, 2 * k * -(-ntotal // matches))
+    while True:
+        found_d, found = index.search(queries, fetch)
+        keep = (found >= 0) & allowed[np.maximum(found, 0)]
+        if fetch == ntotal or (keep.sum(axis=1) >= min(k, matches)).all():
+            break
+        fetch = min(ntotal, fetch * 4)
+
+    for row in range(len(queries)):
+        hits = found[row][keep[row]][:k]
+        positions[row, : len(hits)] = hits
+        distances[row, : len(hits)] = found_d[row][keep[row]][:k]
+    return distances, positions
+
+
+def read_index_mmap(path: str) -> faiss.Index:
+    """Read an index file memory-mapped and read-only"""
+    try:
+        return faiss.read_index(path, MMAP_ALL_FLAGS)
+    except RuntimeError:
+        # IVF indexes reject the combined flags - map just their lists
+        return faiss.read_index(path, MMAP_FLAGS)
+
+
+def requires_training(index_type: str, storage: str = "float32") -> bool:
+    """IVF variants and int8/PQ codes need a training sample before adding"""
+    return index_type in ("ivf", "ivfpq") or storage in ("int8", "pq")
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """Whether removing vectors keeps positions aligned with the docstore
+
+    HNSW graphs cannot remove vectors in place. IVF lists can, but they keep
+    the remaining ids as they were, while langchain renumbers its position
+    -> id map to 0..n-1 after a delete - so every later hit would map to the
+    wrong document. Flat (and flat-coded) indexes compact like the map does.
+    """
+    if hasattr(index, "hnsw"):
+        return False
+    return faiss.try_extract_index_ivf(index) is None
@@ -0,0 +1,147 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Numbers in a question ("under 500", "size 42", "2,999") - thousands
+# separators are dropped so "2,999" and "2999" compare equal
+NUMBER_PATTERN = re.compile(r"\d+(?:,\d{3})*(?:\.\d+)?")
+
+
+def normalize_question(question: str) -> str:
+    """Key for the exact-match path (case and whitespace insensitive)"""
+    return " ".join(question.lower().split())
+
+
+def question_numbers(question: str) -> Tuple[str, ...]:
+    """The numbers in a question, in order, for the semantic-hit check"""
+    return tuple(m.replace(",", "") for m in NUMBER_PATTERN.findall(question))
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed by question embedding, scoped per model
+
+    Lookups first try an exact match on the normalized question text (no
+    embedding needed), then fall back to the most similar cached question
+    in the same scope whose cosine similarity is at least `threshold` and
+    whose numbers match exactly - "shirts under 500" and "shirts under 1000"
+    embed almost identically but need different answers. Filters are part
+    of the scope, so they always match exactly. Entries expire after `ttl`
+    seconds and the least recently used entries are evicted once
+    `max_entries` is reached.
+    """
+
+    def __init__(
+        self, max_entries: int = 1000, ttl: float = 3600.0, threshold: float = 0.95
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # (scope, normalized question) -> (created_at, unit vector, numbers, value)
+        self._entries = OrderedDict()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_exact(self, scope: Hashable, question: str) -> Optional[Any]:
+        """Exact-match fast path
+
+        Does not count a miss - a semantic lookup may follow.
+        """
+        key = (scope, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry[3]
+
+    def get_similar(
+        self, scope: Hashable, question: str, vector: Sequence[float]
+    ) -> Optional[Tuple[Any, float]]:
+        """Return (value, similarity) of the closest cached question above threshold
+
+        Only cached questions with the same numbers as `question` are
+        candidates.
+        """
+        query = self._unit(vector)
+        numbers = question_numbers(question)
+        with self._lock:
+            self._purge_expired()
+            keys, vectors = [], []
+            for key, (_, cached, cached_numbers, _) in self._entries.items():
+                if key[0] == scope and cached is not None and cached_numbers == numbers:
+                    keys.append(key)
+                    vectors.append(cached)
+
+            if keys:
+                similarities = np.stack(vectors) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.semantic_hits += 1
+                    return self._entries[keys[best]][3], float(similarities[best])
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        scope: Hashable,
+        question: str,
+        value: Any,
+        vector: Optional[Sequence[float]] = None,
+    ):
+        """Store an answer; the vector enables semantic hits for this entry"""
+        key = (scope, normalize_question(question))
+        unit = self._unit(vector) if vector is not None else None
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic(),
+                unit,
+                question_numbers(question),
+                value,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (e.g. after the index is re-ingested)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counts and current size"""
+        with self._lock:
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
+
+    def _expired(self, entry) -> bool:
+        return time.monotonic() - entry[0] > self.ttl
+
+    def _purge_expired(self):
+        expired = [k for k, e in self._entries.items() if self._expired(e)]
+        for key in expired:
+            del self._entries[key]
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(arr)
+        return arr / norm if norm else arr
@@ -0,0 +1,116 @@
+"""
+Chunks-per-row and embedding-token report for MyntraRAG chunking strategies.
+
+Turns the catalog into row documents and splits them with each strategy:
+"characters" (the CharacterTextSplitter on chunk_size / separator) and
+"fields" (one chunk per product within the token budget, only long text
+fields split, low-signal columns left out of the embedded text). Reports
+chunks per row and the tokens that would be sent for embedding. Tokens are
+counted with tiktoken (cl100k_base) when installed, else ~4 characters each.
+
+Usage:
+    python chunking_report.py
+    python chunking_report.py --csv myntra_sample_catalog.csv --token-budget 256
+    python chunking_report.py --exclude product_id --exclude rating --output report.md
+"""
+
+import argparse
+import logging
+from dataclasses import replace
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from context_builder import count_tokens
+from ingest_pipeline import split_into_chunks
+from myntra_rag import Config, MyntraRAG, create_text_splitter
+
+
+def measure(config: Config, df: pd.DataFrame) -> Dict:
+    """Split the catalog the way ingest_data would and count chunks and tokens"""
+    documents = MyntraRAG._frame_to_documents(df, config.embed_exclude_columns)
+    chunks = split_into_chunks(documents, create_text_splitter(config), True)
+
+    per_row = np.bincount(
+        [df.index.get_loc(c.metadata["row_index"]) for c in chunks],
+        minlength=len(df),
+    )
+    tokens = sum(count_tokens(c.page_content) for c in chunks)
+    return {
+        "strategy": config.chunking,
+        "excluded": ", ".join(config.embed_exclude_columns) or "-",
+        "chunks": len(chunks),
+        "chunks_per_row": float(per_row.mean()),
+        "p95_chunks_per_row": float(np.percentile(per_row, 95)),
+        "max_chunks_per_row": int(per_row.max()),
+        "single_chunk_rows": float((per_row == 1).mean()),
+        "tokens": tokens,
+        "tokens_per_row": tokens / len(df),
+    }
+
+
+def run_report(df: pd.DataFrame, configs: List[Config]) -> List[Dict]:
+    return [measure(config, df) for config in configs]
+
+
+def format_report(rows: List[Dict], num_rows: int, csv_path: str) -> str:
+    """Render the results as a markdown table, relative to the first strategy"""
+    base = rows[0]
+    lines = [
+        f"# Chunking strategies ({num_rows} rows from {csv_path})",
+        "",
+        "| strategy | excluded columns | chunks | chunks/row | p95 | max | "
+        "single-chunk rows | embed tokens | tokens/row | vs first |",
+        "|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in rows:
+        lines.append(
+            f"| {r['strategy']} | {r['excluded']} | {r['chunks']} | "
+            f"{r['chunks_per_row']:.2f} | {r['p95_chunks_per_row']:.0f} | "
+            f"{r['max_chunks_per_row']} | {r['single_chunk_rows']:.0%} | "
+            f"{r['tokens']} | {r['tokens_per_row']:.0f} | "
+            f"{r['chunks'] / base['chunks']:.2f}x chunks, "
+            f"{r['tokens'] / base['tokens']:.2f}x tokens |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--csv", default=Config.csv_file_path)
+    parser.add_argument("--chunk-size", type=int, default=Config.chunk_size)
+    parser.add_argument("--token-budget", type=int, default=Config.chunk_token_budget)
+    parser.add_argument(
+        "--long-field", action="append", help="Field that may be split (repeatable)"
+    )
+    parser.add_argument(
+        "--exclude", action="append", help="Column left out of the embedded text"
+    )
+    parser.add_argument("--output", help="Write the markdown report to this file")
+    args = parser.parse_args()
+    # CharacterTextSplitter warns about every chunk longer than chunk_size
+    logging.getLogger("langchain_text_splitters").setLevel(logging.ERROR)
+
+    df = pd.read_csv(args.csv)
+    before = Config(chunking="characters", chunk_size=args.chunk_size)
+    after = Config(
+        chunking="fields",
+        chunk_token_budget=args.token_budget,
+        long_text_fields=args.long_field,
+        embed_exclude_columns=args.exclude,
+    )
+    # Field chunking alone, to separate its effect from the column exclusion
+    fields_only = replace(after, embed_exclude_columns=[])
+
+    rows = run_report(df, [before, fields_only, after])
+    report = format_report(rows, len(df), args.csv)
+    print(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+# Stands in for the chunks between two non-adjacent chunks of a product
+ELISION_MARKER = "[...]"
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens with tiktoken, falling back to ~4 characters per token"""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to its first max_tokens tokens"""
+    encoding = _get_encoding()
+    if encoding:
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+    return text[: max_tokens * 4]
+
+
+def merge_overlapping(first: str, second: str, separator: str = "\n") -> str:
+    """Join two adjacent chunks, dropping the lines the splitter repeated"""
+    a_lines = first.split(separator)
+    b_lines = second.split(separator)
+    for size in range(min(len(a_lines), len(b_lines)), 0, -1):
+        if a_lines[-size:] == b_lines[:size]:
+            return separator.join(a_lines + b_lines[size:])
+    return separator.join(a_lines + b_lines)
+
+
+def build_context(
+    documents: List[Document],
+    token_budget: Optional[int] = None,
+    separator: str = "\n",
+) -> Tuple[str, Dict[str, Any]]:
+    """Pack retrieved chunks into a de-duplicated context within a token budget
+
+    Chunks of the same row are joined in chunk order: adjacent chunks are
+    merged with their overlap removed, and a gap (chunks that were not
+    retrieved) is marked with ELISION_MARKER. Products are ordered by the
+    rank of their best chunk and whole products are added until the budget
+    is spent; a best-ranked product that alone exceeds the budget is
+    truncated to it rather than dropped. Returns the context text and token
+    statistics.
+    """
+    # Group chunks by product row, remembering the best (first) rank
+    groups: Dict[Any, List[Document]] = {}
+    for rank, doc in enumerate(documents):
+        key = doc.metadata.get("row_index", ("rank", rank))
+        groups.setdefault(key, []).append(doc)
+
+    blocks = []
+    for chunks in groups.values():
+        chunks = sorted(chunks, key=lambda d: d.metadata.get("chunk_index", 0))
+        text = chunks[0].page_content
+        for prev, chunk in zip(chunks, chunks[1:]):
+            index = chunk.metadata.get("chunk_index")
+            prev_index = prev.metadata.get("chunk_index")
+            if index == prev_index:
+                continue  # duplicate hit for the same chunk
+            if index is not None and prev_index is not None and index == prev_index + 1:
+                text = merge_overlapping(text, chunk.page_content, separator)
+            else:
+                # Only adjacent chunks share an overlap
+                text = separator.join([text, ELISION_MARKER, chunk.page_content])
+        blocks.append(f"Text: {text}")
+
+    # Greedily pack whole products, best ranked first
+    packed, used, truncated = [], 0, 0
+    for block in blocks:
+        tokens = count_tokens(block)
+        if token_budget is not None and used + tokens > token_budget:
+            if packed or token_budget <= 0:
+                continue
+            # The best match alone is over budget - send as much as fits
+            block = truncate_to_tokens(block, token_budget)
+            tokens = count_tokens(block)
+            truncated += 1
+        packed.append(block)
+        used += tokens
+
+    context = "\n".join(packed)
+
+    # Compare against the plain one-"Text:"-line-per-chunk format
+    raw = "\n".join(f"Text: {doc.page_content}" for doc in documents)
+    raw_tokens = count_tokens(raw) if raw else 0
+    context_tokens = count_tokens(context) if context else 0
+    stats = {
+        "chunks": len(documents),
+        "products": len(blocks),
+        "products_packed": len(packed),
+        "products_truncated": truncated,
+        "raw_tokens": raw_tokens,
+        "context_tokens": context_tokens,
+        "tokens_saved": raw_tokens - context_tokens,
+    }
+    return context, stats
@@ -0,0 +1,263 @@
+import asyncio
+import os
+import random
+import time
+from typing import List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import EmbeddingCache, text_key
+
+# HTTP statuses worth retrying: timed out, rate limited or a transient server error
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, 5xx responses and timeouts - not auth, bad requests or bugs
+
+    Provider SDKs wrap their errors (langchain_google_genai raises
+    GoogleGenerativeAIError from the google.api_core error), so the whole
+    exception chain is checked for a timeout or an HTTP status code.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+            return True
+        response = getattr(error, "response", None)
+        for status in (
+            getattr(error, "code", None),
+            getattr(error, "status_code", None),
+            getattr(response, "status_code", None),
+        ):
+            if isinstance(status, int) and status in RETRYABLE_STATUS:
+                return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def pack_batches(
+    texts: Sequence[str], max_batch_size: int, max_batch_tokens: int
+) -> List[List[int]]:
+    """Pack text indices into batches bounded by item count and token estimate"""
+    batches = []
+    current, current_tokens = [], 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (
+            len(current) >= max_batch_size or current_tokens + tokens > max_batch_tokens
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class TokenBucket:
+    """Async token-bucket limiter (rate is tokens per second)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens are available, then take them"""
+        # Requests larger than the bucket would never fit - cap them
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class EmbeddingScheduler:
+    """Embeds texts in token-bounded batches, concurrently and within provider quotas
+
+    Batches run `concurrency` at a time behind request and token rate limiters,
+    failed batches are retried with jittered exponential backoff, and finished
+    batches are written to a checkpoint store so an interrupted run resumes
+    where it stopped.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        max_batch_size: int = 100,
+        max_batch_tokens: int = 8000,
+        concurrency: int = 4,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        checkpoint_path: Optional[str] = None,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.checkpoint_path = checkpoint_path
+
+        self.retries = 0
+        self.resumed_batches = 0
+        # (loop, semaphore, request bucket, token bucket) shared by all calls
+        self._limits = None
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        """Synchronous entry point"""
+        return asyncio.run(self.aembed_documents(texts))
+
+    async def aembed_documents(
+        self, texts: Sequence[str], keep_checkpoint: bool = False
+    ) -> List[List[float]]:
+        """Embed all texts and return vectors in input order
+
+        Concurrent calls on the same event loop share the concurrency and
+        rate limits. With keep_checkpoint=True the checkpoint survives the
+        call (for callers embedding a stream in several calls); remove it
+        with remove_checkpoint() once everything is done.
+        """
+        texts = list(texts)
+        batches = pack_batches(texts, self.max_batch_size, self.max_batch_tokens)
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+
+        checkpoint = (
+            EmbeddingCache(self.checkpoint_path) if self.checkpoint_path else None
+        )
+        if checkpoint is not None:
+            # Reuse vectors from an interrupted run
+            keys = [text_key(t) for t in texts]
+            done = checkpoint.get_many(self.model_name, keys)
+            pending = []
+            for batch in batches:
+                if all(keys[i] in done for i in batch):
+                    for i in batch:
+                        vectors[i] = done[keys[i]]
+                    self.resumed_batches += 1
+                else:
+                    pending.append(batch)
+            batches = pending
+            if self.resumed_batches:
+                print(
+                    f"Resuming embedding: {self.resumed_batches} batches checkpointed"
+                )
+
+        semaphore, request_bucket, token_bucket = self._loop_limits()
+        completed = 0
+
+        async def run_batch(batch: List[int]):
+            nonlocal completed
+            batch_texts = [texts[i] for i in batch]
+            async with semaphore:
+                result = await self._embed_with_retry(
+                    batch_texts, request_bucket, token_bucket
+                )
+
+            if checkpoint is not None:
+                checkpoint.put_many(
+                    self.model_name, [text_key(t) for t in batch_texts], result
+                )
+            for i, vector in zip(batch, result):
+                vectors[i] = vector
+
+            completed += 1
+            if completed % 50 == 0 or completed == len(batches):
+                print(f"Embedded {completed}/{len(batches)} batches")
+
+        try:
+            await asyncio.gather(*(run_batch(b) for b in batches))
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+        # Checkpoint is only needed until the run finishes
+        if not keep_checkpoint:
+            self.remove_checkpoint()
+
+        return vectors
+
+    def remove_checkpoint(self):
+        """Delete the checkpoint store and its SQLite side files"""
+        if self.checkpoint_path:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.checkpoint_path + suffix):
+                    os.remove(self.checkpoint_path + suffix)
+
+    def _loop_limits(self):
+        """Concurrency and rate limiters for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._limits is None or self._limits[0] is not loop:
+            request_bucket = None
+            if self.requests_per_minute:
+                request_bucket = TokenBucket(
+                    self.requests_per_minute / 60.0, max(1.0, self.concurrency)
+                )
+            token_bucket = None
+            if self.tokens_per_minute:
+                token_bucket = TokenBucket(
+                    self.tokens_per_minute / 60.0, self.tokens_per_minute / 60.0
+                )
+            semaphore = asyncio.Semaphore(self.concurrency)
+            self._limits = (loop, semaphore, request_bucket, token_bucket)
+        return self._limits[1:]
+
+    async def _embed_with_retry(
+        self,
+        batch_texts: List[str],
+        request_bucket: Optional[TokenBucket],
+        token_bucket: Optional[TokenBucket],
+    ) -> List[List[float]]:
+        """Call the provider within the rate limits, retrying transient failures
+
+        Every attempt - retries included - first takes its share of the
+        request and token buckets, so a burst of 429s cannot re-send faster
+        than the quota. Errors that are not retryable (see is_retryable) are
+        raised at once. Retries back off with full-jitter exponential delays.
+        """
+        tokens = sum(estimate_tokens(t) for t in batch_texts)
+        attempt = 0
+        while True:
+            if request_bucket is not None:
+                await request_bucket.acquire(1)
+            if token_bucket is not None:
+                await token_bucket.acquire(tokens)
+            try:
+                return await self.embeddings.aembed_documents(batch_texts)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.retries += 1
+                delay = random.uniform(
+                    0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                )
+                print(
+                    f"Embedding batch failed ({e}); retry {attempt}/"
+                    f"{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
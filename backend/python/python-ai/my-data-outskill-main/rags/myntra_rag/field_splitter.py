@@ -0,0 +1,108 @@
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from langchain.text_splitter import TextSplitter
+
+from context_builder import count_tokens
+
+# Sentence ends and line breaks inside a long field, kept as separators
+_SENTENCE_BREAK = re.compile(r"((?<=[.!?])\s+|\n+)")
+
+
+def parse_fields(text: str, columns: Sequence[str]) -> List[Tuple[Optional[str], str]]:
+    """Cut "col: value" row text into (column, "col: value") blocks, in order
+
+    Columns are matched in the order the row text was built, so a line inside
+    a description that happens to look like "Material: cotton" only starts a
+    new field when Material is a later column of the row.
+    """
+    fields: List[List] = []
+    remaining = list(columns)
+    for line in text.split("\n"):
+        name = next((c for c in remaining if line.startswith(f"{c}: ")), None)
+        if name is not None:
+            remaining = remaining[remaining.index(name) + 1 :]
+            fields.append([name, line])
+        elif fields:
+            fields[-1][1] += "\n" + line
+        else:
+            fields.append([None, line])
+    return [(name, block) for name, block in fields]
+
+
+class FieldAwareSplitter(TextSplitter):
+    """Chunks product text by field instead of by character count
+
+    A product whose text fits token_budget stays a single chunk. Longer ones
+    are packed field by field into as few chunks as possible; only
+    long_fields (descriptions) are broken up, at sentence boundaries, so
+    short attributes such as brand or price are never cut apart.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 512,
+        long_fields: Sequence[str] = ("description",),
+        **kwargs,
+    ):
+        super().__init__(
+            chunk_size=token_budget,
+            chunk_overlap=0,
+            length_function=count_tokens,
+            **kwargs,
+        )
+        self.token_budget = token_budget
+        self.long_fields = tuple(long_fields)
+
+    def split_text(self, text: str, columns: Sequence[str] = None) -> List[str]:
+        """Split one row's text; pass its columns (in order) for exact parsing"""
+        if count_tokens(text) <= self.token_budget:
+            return [text]
+        if columns is None:
+            columns = [line.split(": ", 1)[0] for line in text.split("\n")]
+
+        # (separator before the unit, unit text, tokens)
+        units: List[Tuple[str, str, int]] = []
+        for name, block in parse_fields(text, columns):
+            if name in self.long_fields:
+                pieces = _SENTENCE_BREAK.split(block)
+                separator = "\n"
+                for i in range(0, len(pieces), 2):
+                    if pieces[i]:
+                        units.append((separator, pieces[i], count_tokens(pieces[i])))
+                    separator = pieces[i + 1] if i + 1 < len(pieces) else " "
+            else:
+                units.append(("\n", block, count_tokens(block)))
+        return self._pack(units)
+
+    def _pack(self, units: List[Tuple[str, str, int]]) -> List[str]:
+        """Greedily fill chunks up to the token budget, unit by unit"""
+        chunks: List[str] = []
+        parts: List[str] = []
+        used = 0
+        for separator, unit, tokens in units:
+            if parts and used + tokens > self.token_budget:
+                chunks.append("".join(parts))
+                parts, used = [], 0
+            if tokens > self.token_budget:
+                # A single sentence or attribute larger than the budget
+                chunks.extend(self._split_words(unit))
+                continue
+            parts.append(unit if not parts else separator + unit)
+            used += tokens
+        if parts:
+            chunks.append("".join(parts))
+        return chunks
+
+    def _split_words(self, text: str) -> List[str]:
+        chunks, words, used = [], [], 0
+        for word in text.split(" "):
+            tokens = count_tokens(word)
+            if words and used + tokens > self.token_budget:
+                chunks.append(" ".join(words))
+                words, used = [], 0
+            words.append(word)
+            used += tokens
+        if words:
+            chunks.append(" ".join(words))
+        return chunks
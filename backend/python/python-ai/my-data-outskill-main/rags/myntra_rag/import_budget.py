@@ -0,0 +1,120 @@
+"""
+Import-time budget check for myntra_rag.py.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+fails when the module's cumulative import time exceeds the budget or when
+it pulls in a dependency that should only load on the code path using it.
+Prints the slowest top-level imports so a regression is easy to locate.
+
+Usage:
+    python import_budget.py
+    python import_budget.py --budget-ms 300 --runs 5
+    python import_budget.py --module rag_benchmark --allow pandas
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Heavy dependencies that myntra_rag must not import at module load
+DEFERRED_MODULES = (
+    "faiss",
+    "langchain",
+    "langchain_community",
+    "langchain_core",
+    "langchain_google_genai",
+    "langchain_openai",
+    "pandas",
+    "sentence_transformers",
+    "tiktoken",
+)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, depth, self us, cumulative us) for every -X importtime line"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:") :].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, self_us, cumulative_us))
+    return entries
+
+
+def measure(module: str) -> List[Tuple[str, int, int, int]]:
+    """Import module once in a fresh interpreter and parse its import timings"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def check(
+    module: str, budget_ms: float, runs: int, allowed: List[str]
+) -> Tuple[bool, str]:
+    """Return (passed, report) for the median of `runs` cold imports"""
+    samples = [measure(module) for _ in range(runs)]
+    totals = [next(c for n, _, _, c in s if n == module) / 1000 for s in samples]
+    median_ms = statistics.median(totals)
+    entries = samples[totals.index(sorted(totals)[len(totals) // 2])]
+
+    imported = {name.split(".")[0] for name, _, _, _ in entries}
+    deferred = sorted(m for m in DEFERRED_MODULES if m in imported and m not in allowed)
+
+    # Slowest imports started directly by the module under test; -X importtime
+    # lists children before their parent, so they follow the previous
+    # top-level entry
+    children: Dict[str, int] = {}
+    for name, depth, _, cumulative in entries:
+        if depth == 0:
+            if name == module:
+                break
+            children = {}
+        elif depth == 1:
+            children[name] = cumulative
+    slowest = sorted(children.items(), key=lambda kv: kv[1], reverse=True)[:10]
+
+    passed = median_ms <= budget_ms and not deferred
+    lines = [
+        f"import {module}: {median_ms:.0f} ms median over {runs} runs "
+        f"(budget {budget_ms:.0f} ms) - {'OK' if passed else 'FAIL'}",
+        "Slowest direct imports:",
+    ]
+    lines += [f"  {us / 1000:8.1f} ms  {name}" for name, us in slowest]
+    if deferred:
+        lines.append("Imported at module load but should be deferred:")
+        lines += [f"  {name}" for name in deferred]
+    return passed, "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="myntra_rag")
+    parser.add_argument("--budget-ms", type=float, default=400.0)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--allow", action="append", default=[], help="Deferred module to permit"
+    )
+    args = parser.parse_args()
+
+    passed, report = check(args.module, args.budget_ms, args.runs, args.allow)
+    print(report)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Recall-vs-latency report for the FAISS index modes used by MyntraRAG.
+
+Builds each index type (hnsw, ivf, ivfpq) over the same vectors, sweeps its
+query-time knob (efSearch / nprobe) and compares recall@k and per-query
+latency against the exact flat index.
+
+Usage:
+    python index_report.py --vector-store myntra_vector_store
+    python index_report.py --synthetic 200000 --dim 768 --output report.md
+"""
+
+import argparse
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from ann_index import build_faiss_index, set_search_params
+from rescorer import ExactRescorer
+
+SWEEPS = {
+    "hnsw": ("efSearch", [16, 32, 64, 128, 256]),
+    "ivf": ("nprobe", [1, 4, 16, 64]),
+    "ivfpq": ("nprobe", [1, 4, 16, 64]),
+}
+
+
+def load_vectors(vector_store_path: str) -> np.ndarray:
+    """Read the stored vectors back out of a saved index
+
+    Quantized indexes only hold approximations, so the exact copy kept for
+    rescoring is used when there is one.
+    """
+    index = faiss.read_index(f"{vector_store_path}/index.faiss")
+    if ExactRescorer.exists(vector_store_path):
+        return np.array(ExactRescorer.load(vector_store_path, index.d).vectors)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors, roughly shaped like text embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 100), dim)).astype(np.float32)
+    assignments = rng.integers(0, len(centers), n)
+    noise = 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+    return centers[assignments] + noise
+
+
+def timed_search(index: faiss.Index, queries: np.ndarray, k: int):
+    """Search one query at a time (as in serving) and collect latencies"""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, ids[i] = index.search(q[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return ids, np.array(latencies)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Fraction of true neighbours that the approximate index returned"""
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run_report(
+    vectors: np.ndarray, num_queries: int = 500, k: int = 10, **index_kwargs
+) -> List[Dict]:
+    """Build every index mode and measure recall@k and latency against flat"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(1)
+    query_ids = rng.choice(len(vectors), min(num_queries, len(vectors)), False)
+    # Perturb stored vectors so queries are not exact matches
+    queries = vectors[query_ids] + 0.05 * rng.standard_normal(
+        (len(query_ids), vectors.shape[1])
+    ).astype(np.float32)
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    truth, flat_lat = timed_search(flat, queries, k)
+
+    rows = [
+        {
+            "index": "flat",
+            "param": "-",
+            "build_s": 0.0,
+            "recall": 1.0,
+            "p50_ms": float(np.percentile(flat_lat, 50)),
+            "p99_ms": float(np.percentile(flat_lat, 99)),
+        }
+    ]
+
+    for index_type, (param, values) in SWEEPS.items():
+        start = time.perf_counter()
+        index = build_faiss_index(vectors, index_type=index_type, **index_kwargs)
+        index.add(vectors)
+        build_s = time.perf_counter() - start
+
+        for value in values:
+            if param == "nprobe":
+                set_search_params(index, nprobe=value)
+            else:
+                set_search_params(index, ef_search=value)
+            found, lat = timed_search(index, queries, k)
+            rows.append(
+                {
+                    "index": index_type,
+                    "param": f"{param}={value}",
+                    "build_s": build_s,
+                    "recall": recall_at_k(found, truth),
+                    "p50_ms": float(np.percentile(lat, 50)),
+                    "p99_ms": float(np.percentile(lat, 99)),
+                }
+            )
+    return rows
+
+
+def format_report(rows: List[Dict], n: int, dim: int, k: int) -> str:
+    """Render the results as a markdown table"""
+    lines = [
+        f"# Index recall vs latency ({n} vectors, dim {dim}, recall@{k})",
+        "",
+        "| index | setting | build (s) | recall | p50 (ms) | p99 (ms) |",
+        "|---|---|---|---|---|---|",
+    ]
+    for r in rows:
+        lines.append(
+            f"| {r['index']} | {r['param']} | {r['build_s']:.1f} | "
+            f"{r['recall']:.3f} | {r['p50_ms']:.3f} | {r['p99_ms']:.3f} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vector-store", help="Saved MyntraRAG vector store path")
+    parser.add_argument("--synthetic", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--output", help="Write the markdown report to this file")
+    args = parser.parse_args()
+
+    if args.vector_store:
+        vectors = load_vectors(args.vector_store)
+    else:
+        vectors = synthetic_vectors(args.synthetic, args.dim)
+
+    rows = run_report(vectors, args.queries, args.k, ivf_nlist=args.nlist)
+    report = format_report(rows, len(vectors), vectors.shape[1], args.k)
+    print(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
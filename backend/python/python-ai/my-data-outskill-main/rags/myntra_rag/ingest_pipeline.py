@@ -0,0 +1,282 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from langchain.schema import Document
+from langchain.text_splitter import TextSplitter
+
+from field_splitter import FieldAwareSplitter
+
+
+def split_into_chunks(
+    documents: List[Document], splitter: TextSplitter, compact: bool
+) -> List[Document]:
+    """Split row documents into chunk documents
+
+    Module-level so it can run in a worker process. With compact=True the
+    chunks keep only row_index/chunk_index (and product_key when present);
+    the row metadata lives in the row store.
+    """
+    chunks = []
+    by_field = isinstance(splitter, FieldAwareSplitter)
+    for doc in documents:
+        if by_field:
+            # The row's columns, in order, mark where each field starts
+            split_texts = splitter.split_text(doc.page_content, list(doc.metadata))
+        else:
+            split_texts = splitter.split_text(doc.page_content)
+        for i, chunk_text in enumerate(split_texts):
+            if compact:
+                metadata = {"row_index": doc.metadata["row_index"], "chunk_index": i}
+                if "product_key" in doc.metadata:
+                    metadata["product_key"] = doc.metadata["product_key"]
+            else:
+                metadata = {
+                    **doc.metadata,
+                    "chunk_index": i,
+                    "total_chunks": len(split_texts),
+                }
+            chunks.append(Document(page_content=chunk_text, metadata=metadata))
+    return chunks
+
+
+class StageStats:
+    """Items processed and active time span of one pipeline stage"""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+
+    def record(self, start: float, end: float, items: int):
+        self.items += items
+        if self.first_start is None or start < self.first_start:
+            self.first_start = start
+        if self.last_end is None or end > self.last_end:
+            self.last_end = end
+
+    @property
+    def seconds(self) -> float:
+        if self.first_start is None:
+            return 0.0
+        return self.last_end - self.first_start
+
+    def as_dict(self) -> Dict[str, Any]:
+        seconds = self.seconds
+        return {
+            "items": self.items,
+            "unit": self.unit,
+            "seconds": seconds,
+            "per_second": self.items / seconds if seconds > 0 else 0.0,
+        }
+
+
+class IngestPipeline:
+    """Streams CSV blocks through parse -> split -> embed -> index
+
+    Each stage runs concurrently and hands work to the next through a bounded
+    queue, so a slow stage (normally embedding) applies backpressure instead
+    of the whole catalog piling up in memory. Splitting runs on a process
+    pool; several blocks can be embedding at once, sharing the scheduler's
+    rate limits; the index stage adds vectors in batches of `add_batch`.
+    Blocks reach the index in CSV order, so ids and positions are the same
+    as a serial ingest.
+    """
+
+    def __init__(
+        self,
+        blocks: Iterator[List[Document]],
+        splitter: TextSplitter,
+        compact: bool,
+        embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+        add: Callable[[List[Document], List[List[float]]], None],
+        on_block: Callable[[List[Document]], None] = None,
+        workers: Optional[int] = None,
+        queue_size: int = 4,
+        add_batch: int = 10_000,
+    ):
+        self.blocks = blocks
+        self.splitter = splitter
+        self.compact = compact
+        self.embed = embed
+        self.add = add
+        self.on_block = on_block
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.queue_size = queue_size
+        self.add_batch = add_batch
+
+        self.stages = {
+            "parse": StageStats("parse", "rows"),
+            "split": StageStats("split", "rows"),
+            "embed": StageStats("embed", "chunks"),
+            "index": StageStats("index", "chunks"),
+        }
+        self.wall_seconds = 0.0
+
+    def run(self) -> Dict[str, Any]:
+        """Synchronous entry point"""
+        return asyncio.run(self.arun())
+
+    async def arun(self) -> Dict[str, Any]:
+        """Run all stages to completion and return per-stage throughput"""
+        start = time.perf_counter()
+        self._pool = None
+        split_queue = asyncio.Queue(self.queue_size)
+        embed_queue = asyncio.Queue(self.queue_size)
+        index_queue = asyncio.Queue(self.queue_size)
+
+        tasks = [
+            asyncio.create_task(self._parse(split_queue)),
+            asyncio.create_task(self._split(split_queue, embed_queue)),
+            asyncio.create_task(self._embed(embed_queue, index_queue)),
+            asyncio.create_task(self._index(index_queue)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+        self.wall_seconds = time.perf_counter() - start
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage items/second plus how close the run came to embed-bound"""
+        stages = {name: s.as_dict() for name, s in self.stages.items()}
+        embed_seconds = stages["embed"]["seconds"]
+        return {
+            "wall_seconds": self.wall_seconds,
+            "stages": stages,
+            "embed_bound_ratio": (
+                embed_seconds / self.wall_seconds if self.wall_seconds else 0.0
+            ),
+        }
+
+    async def _parse(self, out: asyncio.Queue):
+        """Read CSV blocks (and run on_block) in a thread so the loop stays free
+
+        on_block hashes every row, so it runs off the loop too; blocks are
+        still handed to it one at a time, in order.
+        """
+        done = object()
+        while True:
+            start = time.perf_counter()
+            block = await asyncio.to_thread(next, self.blocks, done)
+            if block is done:
+                break
+            if self.on_block is not None:
+                await asyncio.to_thread(self.on_block, block)
+            self.stages["parse"].record(start, time.perf_counter(), len(block))
+            await out.put(block)
+        await out.put(None)
+
+    async def _split(self, inp: asyncio.Queue, out: asyncio.Queue):
+        """Start splitting each block and pass the pending result on in order
+
+        The process pool is only started once a second block arrives: a
+        catalog that fits in one block is split in a thread, which is
+        quicker than spawning the workers.
+        """
+        loop = asyncio.get_running_loop()
+        first = True
+        while True:
+            block = await inp.get()
+            if block is None:
+                break
+            start = time.perf_counter()
+            if not first and self.workers > 1 and self._pool is None:
+                # Forking a process that already runs threads (the event loop's
+                # executors, gRPC, tokenizers) can deadlock the child
+                self._pool = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            first = False
+            if self._pool is not None:
+                future = loop.run_in_executor(
+                    self._pool, split_into_chunks, block, self.splitter, self.compact
+                )
+            else:
+                future = asyncio.ensure_future(
+                    asyncio.to_thread(
+                        split_into_chunks, block, self.splitter, self.compact
+                    )
+                )
+            future.add_done_callback(
+                lambda _, start=start, rows=len(block): self.stages["split"].record(
+                    start, time.perf_counter(), rows
+                )
+            )
+            await out.put(future)
+        await out.put(None)
+
+    async def _embed(self, inp: asyncio.Queue, out: asyncio.Queue):
+        """Embed split blocks, keeping several blocks in flight"""
+
+        async def embed_block(chunks: List[Document]):
+            start = time.perf_counter()
+            vectors = await self.embed([c.page_content for c in chunks])
+            self.stages["embed"].record(start, time.perf_counter(), len(chunks))
+            return chunks, vectors
+
+        try:
+            while True:
+                future = await inp.get()
+                if future is None:
+                    break
+                chunks = await future
+                # The bounded queue caps how many blocks embed concurrently
+                await out.put(asyncio.create_task(embed_block(chunks)))
+        except BaseException:
+            while not out.empty():
+                task = out.get_nowait()
+                if task is not None:
+                    task.cancel()
+            raise
+        await out.put(None)
+
+    async def _index(self, inp: asyncio.Queue):
+        """Add embedded chunks to the index in batches of add_batch"""
+        chunks: List[Document] = []
+        vectors: List[List[float]] = []
+
+        async def flush():
+            start = time.perf_counter()
+            await asyncio.to_thread(self.add, chunks, vectors)
+            self.stages["index"].record(start, time.perf_counter(), len(chunks))
+
+        while True:
+            task = await inp.get()
+            if task is None:
+                break
+            block_chunks, block_vectors = await task
+            chunks.extend(block_chunks)
+            vectors.extend(block_vectors)
+            if len(chunks) >= self.add_batch:
+                await flush()
+                chunks, vectors = [], []
+        if chunks:
+            await flush()
+
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    """One line per stage, for printing after an ingest"""
+    lines = [f"Ingest pipeline: {stats['wall_seconds']:.1f}s wall"]
+    for name, s in stats["stages"].items():
+        lines.append(
+            f"  {name}: {s['items']} {s['unit']} in {s['seconds']:.1f}s "
+            f"({s['per_second']:.0f} {s['unit']}/s)"
+        )
+    lines.append(
+        f"  embedding active for {stats['embed_bound_ratio']:.0%} of wall-clock"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,82 @@
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterator, Union
+
+from langchain.schema import Document
+from langchain_community.docstore.base import Docstore
+
+from ann_index import read_index_mmap
+
+# Docstore of stores saved before the native format (see native_store.py);
+# kept so those stores still load without unpickling anything
+DOCSTORE_FILE = "docstore.sqlite"
+
+
+class _ReadOnlyConnection:
+    """Thread-safe read-only SQLite connection shared by the lazy store classes"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+
+    def one(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def all(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+
+class SqliteDocstore(Docstore):
+    """Read-only docstore that pages documents in from SQLite on lookup"""
+
+    def __init__(self, connection: _ReadOnlyConnection):
+        self._db = connection
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._db.one("SELECT content, metadata FROM docs WHERE id = ?", (search,))
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        raise NotImplementedError("Lazily loaded vector stores are read-only")
+
+    def delete(self, ids) -> None:
+        raise NotImplementedError("Lazily loaded vector stores are read-only")
+
+
+class LazyIndexToDocstoreId(Mapping):
+    """FAISS position -> docstore id mapping read from SQLite on demand"""
+
+    def __init__(self, connection: _ReadOnlyConnection):
+        self._db = connection
+        self._len = self._db.one("SELECT COUNT(*) FROM docs")[0]
+
+    def __getitem__(self, pos: int) -> str:
+        row = self._db.one("SELECT id FROM docs WHERE pos = ?", (int(pos),))
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __iter__(self) -> Iterator[int]:
+        return (row[0] for row in self._db.all("SELECT pos FROM docs ORDER BY pos"))
+
+    def __len__(self) -> int:
+        return self._len
+
+
+def load_lazy(index_path: str, docstore_path: str):
+    """Memory-map a FAISS index and open its SQLite docstore
+
+    Returns (index, docstore, index_to_docstore_id) ready to pass to the
+    langchain FAISS constructor. Nothing is unpickled.
+    """
+    index = read_index_mmap(index_path)
+    connection = _ReadOnlyConnection(docstore_path)
+    return index, SqliteDocstore(connection), LazyIndexToDocstoreId(connection)
@@ -0,0 +1,158 @@
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Keeps SKUs like "PROD001" and sizes like "8-10" as whole tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-+.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens for lexical matching"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    """Fuse ranked id lists: score(id) = sum over lists of 1 / (k + rank)"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class LexicalIndex:
+    """BM25 inverted index over chunk text, keyed by docstore id
+
+    Postings are stored in CSR form (one offsets array plus flat doc/tf
+    arrays) so the index saves and loads as plain numpy arrays.
+    """
+
+    FILE_NAME = "lexical_index.npz"
+
+    def __init__(
+        self,
+        doc_ids: np.ndarray,
+        doc_lengths: np.ndarray,
+        vocab: Dict[str, int],
+        offsets: np.ndarray,
+        postings_docs: np.ndarray,
+        postings_tf: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.doc_ids = doc_ids
+        self.doc_lengths = doc_lengths
+        self.vocab = vocab
+        self.offsets = offsets
+        self.postings_docs = postings_docs
+        self.postings_tf = postings_tf
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @classmethod
+    def build(cls, doc_ids: Sequence[str], texts: Sequence[str]) -> "LexicalIndex":
+        """Tokenize texts and build the inverted index"""
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = np.zeros(len(texts), dtype=np.int32)
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[doc] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        vocab = {term: i for i, term in enumerate(sorted(postings))}
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        for term, i in vocab.items():
+            offsets[i + 1] = len(postings[term])
+        offsets = np.cumsum(offsets)
+
+        postings_docs = np.empty(offsets[-1], dtype=np.int32)
+        postings_tf = np.empty(offsets[-1], dtype=np.int32)
+        for term, i in vocab.items():
+            entries = np.asarray(postings[term], dtype=np.int32)
+            postings_docs[offsets[i] : offsets[i + 1]] = entries[:, 0]
+            postings_tf[offsets[i] : offsets[i + 1]] = entries[:, 1]
+
+        return cls(
+            np.asarray(doc_ids, dtype=str),
+            doc_lengths,
+            vocab,
+            offsets,
+            postings_docs,
+            postings_tf,
+        )
+
+    @classmethod
+    def from_vector_store(cls, vector_store) -> "LexicalIndex":
+        """Index every chunk in a langchain FAISS store"""
+        doc_ids = list(vector_store.index_to_docstore_id.values())
+        texts = [vector_store.docstore.search(i).page_content for i in doc_ids]
+        return cls.build(doc_ids, texts)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to k (docstore id, BM25 score) pairs, best first"""
+        docs_parts, score_parts = [], []
+        num_docs = len(self.doc_ids)
+        for term in set(tokenize(query)):
+            i = self.vocab.get(term)
+            if i is None:
+                continue
+            docs = self.postings_docs[self.offsets[i] : self.offsets[i + 1]]
+            tf = self.postings_tf[self.offsets[i] : self.offsets[i + 1]]
+            idf = np.log(1.0 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (
+                1.0 - self.b + self.b * self.doc_lengths[docs] / self.avg_doc_length
+            )
+            docs_parts.append(docs)
+            score_parts.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+
+        if not docs_parts:
+            return []
+
+        # Sum per-term scores only over candidate docs
+        candidates, inverse = np.unique(np.concatenate(docs_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        top = np.argsort(-scores)[:k]
+        return [(str(self.doc_ids[candidates[j]]), float(scores[j])) for j in top]
+
+    def save(self, directory: str):
+        """Write the index next to the FAISS files"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        np.savez(
+            path / self.FILE_NAME,
+            doc_ids=self.doc_ids,
+            doc_lengths=self.doc_lengths,
+            terms=np.frombuffer(json.dumps(terms).encode("utf-8"), dtype=np.uint8),
+            offsets=self.offsets,
+            postings_docs=self.postings_docs,
+            postings_tf=self.postings_tf,
+            params=np.array([self.k1, self.b]),
+        )
+
+    @classmethod
+    def load(cls, directory: str) -> "LexicalIndex":
+        """Load an index saved with save() (no pickle involved)"""
+        with np.load(Path(directory) / cls.FILE_NAME, allow_pickle=False) as data:
+            terms = json.loads(data["terms"].tobytes().decode("utf-8"))
+            k1, b = data["params"]
+            return cls(
+                data["doc_ids"],
+                data["doc_lengths"],
+                {term: i for i, term in enumerate(terms)},
+                data["offsets"],
+                data["postings_docs"],
+                data["postings_tf"],
+                k1=float(k1),
+                b=float(b),
+            )
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return (Path(directory) / cls.FILE_NAME).exists()
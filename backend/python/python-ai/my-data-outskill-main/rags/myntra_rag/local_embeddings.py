@@ -0,0 +1,89 @@
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+BACKENDS = ("torch", "onnx")
+
+
+class LocalEmbeddings(Embeddings):
+    """Sentence-transformers embeddings computed in-process on the CPU
+
+    Removes the network round trip from every query embedding. The model is
+    run with the torch backend or, with backend="onnx", through ONNX Runtime
+    (usually faster on CPU for small encoders). Texts are encoded in batches
+    of batch_size; num_threads caps the intra-op threads so an embedding call
+    does not compete with the rest of the server for every core. Vectors are
+    L2-normalized.
+
+    Requires the optional `sentence-transformers` package (plus `onnxruntime`
+    for the onnx backend) unless a `model` with an
+    `encode(texts, batch_size=..., normalize_embeddings=...)` method is
+    passed in.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        backend: str = "torch",
+        batch_size: int = 32,
+        num_threads: Optional[int] = None,
+        model=None,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown embedding backend '{backend}'. Choose one of {BACKENDS}"
+            )
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self._model = model
+
+    @property
+    def model(self):
+        """Load the encoder on first use"""
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise ImportError(
+                    "Local embeddings need sentence-transformers: "
+                    "pip install sentence-transformers"
+                ) from e
+
+            kwargs = {}
+            if self.backend == "onnx":
+                kwargs["model_kwargs"] = {"provider": "CPUExecutionProvider"}
+                if self.num_threads:
+                    import onnxruntime
+
+                    options = onnxruntime.SessionOptions()
+                    options.intra_op_num_threads = self.num_threads
+                    kwargs["model_kwargs"]["session_options"] = options
+            elif self.num_threads:
+                import torch
+
+                torch.set_num_threads(self.num_threads)
+
+            self._model = SentenceTransformer(
+                self.model_name, device="cpu", backend=self.backend, **kwargs
+            )
+        return self._model
+
+    def warm_up(self):
+        """Load the model and run one batch so the first query is not slow"""
+        self.embed_documents(["warm up"] * min(self.batch_size, 8))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
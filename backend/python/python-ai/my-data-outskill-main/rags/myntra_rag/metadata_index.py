@@ -0,0 +1,227 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Chunk bookkeeping fields that are never useful as filters
+INTERNAL_FIELDS = {"chunk_index", "total_chunks", "product_key"}
+
+RANGE_OPS = {"$gt", "$gte", "$lt", "$lte"}
+SUPPORTED_OPS = RANGE_OPS | {"$eq", "$ne", "$in"}
+
+
+class MetadataIndex:
+    """Secondary indexes over chunk metadata, aligned with FAISS vector positions
+
+    Categorical fields (strings, booleans, low-cardinality values) get one
+    packed bitmap per distinct value. Numeric fields (price, rating, ...) get
+    a sorted value array plus the positions in that order, so ranges resolve
+    with two binary searches. `select()` turns a filter expression into a
+    packed bitmap that can be handed straight to faiss.IDSelectorBitmap.
+
+    Filter expressions are dicts of field -> condition, all ANDed together:
+        {"brand": "Nike"}                          equality
+        {"category": ["Men Shirts", "Men T-Shirts"]}   any of
+        {"price": {"$lt": 2000}, "rating": {"$gte": 4}}  ranges
+        {"in_stock": True, "color": {"$ne": "Black"}}
+    """
+
+    FILE_NAME = "metadata_index.npz"
+
+    def __init__(
+        self,
+        metadatas: Union[pd.DataFrame, Sequence[Dict[str, Any]]],
+        max_categorical_values: int = 1000,
+        fields: Optional[List[str]] = None,
+    ):
+        self.size = len(metadatas)
+        self.num_bytes = (self.size + 7) // 8
+        self.categorical: Dict[str, Dict[Any, np.ndarray]] = {}
+        self.numeric: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        if isinstance(metadatas, pd.DataFrame):
+            df = metadatas
+        else:
+            df = pd.DataFrame.from_records(list(metadatas))
+        for field in fields or df.columns:
+            if field in INTERNAL_FIELDS or field not in df.columns:
+                continue
+            column = df[field]
+            non_null = column.dropna()
+            if non_null.empty:
+                continue
+
+            if self._is_numeric(non_null):
+                values = pd.to_numeric(column, errors="coerce").to_numpy(
+                    dtype=np.float64
+                )
+                order = np.argsort(values, kind="stable")  # NaN sorts last
+                valid = int(np.count_nonzero(~np.isnan(values)))
+                self.numeric[field] = (values[order][:valid], order[:valid])
+            else:
+                codes, uniques = pd.factorize(column)
+                if len(uniques) > max_categorical_values:
+                    continue  # free text such as names and descriptions
+                order = np.argsort(codes, kind="stable")
+                bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+                bitmaps = {}
+                for code, value in enumerate(uniques):
+                    positions = order[bounds[code] : bounds[code + 1]]
+                    bitmaps[self._key(value)] = self._positions_to_bitmap(positions)
+                self.categorical[field] = bitmaps
+
+    @classmethod
+    def from_vector_store(cls, vector_store, **kwargs) -> "MetadataIndex":
+        """Build from a langchain FAISS store, in index position order"""
+        metadatas = [
+            vector_store.docstore.search(vector_store.index_to_docstore_id[i]).metadata
+            for i in range(vector_store.index.ntotal)
+        ]
+        return cls(metadatas, **kwargs)
+
+    def save(self, directory: str):
+        """Write the bitmaps and sorted columns next to the FAISS files"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        header = {"size": self.size, "categorical": [], "numeric": []}
+        arrays = {}
+        for i, (field, bitmaps) in enumerate(self.categorical.items()):
+            header["categorical"].append([field, list(bitmaps)])
+            arrays[f"categorical_{i}"] = np.stack(list(bitmaps.values()))
+        for i, (field, (values, order)) in enumerate(self.numeric.items()):
+            header["numeric"].append(field)
+            arrays[f"numeric_values_{i}"] = values
+            arrays[f"numeric_order_{i}"] = order
+        header = json.dumps(header, default=str).encode("utf-8")
+        np.savez(
+            path / self.FILE_NAME,
+            header=np.frombuffer(header, dtype=np.uint8),
+            **arrays,
+        )
+
+    @classmethod
+    def load(cls, directory: str) -> "MetadataIndex":
+        """Load an index saved with save() (no pickle involved)"""
+        index = cls([])
+        with np.load(Path(directory) / cls.FILE_NAME, allow_pickle=False) as data:
+            header = json.loads(data["header"].tobytes().decode("utf-8"))
+            index.size = header["size"]
+            index.num_bytes = (index.size + 7) // 8
+            for i, (field, values) in enumerate(header["categorical"]):
+                bitmaps = data[f"categorical_{i}"]
+                index.categorical[field] = dict(zip(values, bitmaps))
+            for i, field in enumerate(header["numeric"]):
+                index.numeric[field] = (
+                    data[f"numeric_values_{i}"],
+                    data[f"numeric_order_{i}"],
+                )
+        return index
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return (Path(directory) / cls.FILE_NAME).exists()
+
+    @property
+    def fields(self) -> List[str]:
+        return sorted([*self.categorical, *self.numeric])
+
+    def select(self, filter: Dict[str, Any]) -> Tuple[np.ndarray, int]:
+        """Resolve a filter expression to (packed bitmap, number of matches)"""
+        bitmap = self._positions_to_bitmap(np.arange(self.size))
+        for field, condition in filter.items():
+            bitmap &= self._select_field(field, condition)
+        return bitmap, self.count(bitmap)
+
+    @staticmethod
+    def count(bitmap: np.ndarray) -> int:
+        return int(np.unpackbits(bitmap).sum())
+
+    def _select_field(self, field: str, condition: Any) -> np.ndarray:
+        if field not in self.categorical and field not in self.numeric:
+            raise ValueError(
+                f"Field '{field}' is not indexed for filtering. "
+                f"Indexed fields: {', '.join(self.fields)}"
+            )
+
+        if not isinstance(condition, dict):
+            if isinstance(condition, (list, tuple, set)):
+                condition = {"$in": list(condition)}
+            else:
+                condition = {"$eq": condition}
+
+        result = self._positions_to_bitmap(np.arange(self.size))
+        for op, operand in condition.items():
+            if op not in SUPPORTED_OPS:
+                raise ValueError(
+                    f"Unsupported filter operator '{op}'. "
+                    f"Use one of: {', '.join(sorted(SUPPORTED_OPS))}"
+                )
+            if op == "$in":
+                matched = self._empty()
+                for value in operand:
+                    matched |= self._equals(field, value)
+            elif op == "$eq":
+                matched = self._equals(field, operand)
+            elif op == "$ne":
+                matched = self._present(field) & ~self._equals(field, operand)
+            else:
+                matched = self._range(field, op, operand)
+            result &= matched
+        return result
+
+    def _equals(self, field: str, value: Any) -> np.ndarray:
+        if field in self.numeric:
+            return self._range(field, "$gte", value) & self._range(field, "$lte", value)
+        return self.categorical[field].get(self._key(value), self._empty()).copy()
+
+    def _present(self, field: str) -> np.ndarray:
+        """Positions where the field has a value"""
+        if field in self.numeric:
+            return self._positions_to_bitmap(self.numeric[field][1])
+        present = self._empty()
+        for bitmap in self.categorical[field].values():
+            present |= bitmap
+        return present
+
+    def _range(self, field: str, op: str, value: Any) -> np.ndarray:
+        if field not in self.numeric:
+            raise ValueError(
+                f"Range filter '{op}' needs a numeric field, got '{field}'"
+            )
+        sorted_values, order = self.numeric[field]
+        value = float(value)
+        if op == "$gt":
+            positions = order[np.searchsorted(sorted_values, value, side="right") :]
+        elif op == "$gte":
+            positions = order[np.searchsorted(sorted_values, value, side="left") :]
+        elif op == "$lt":
+            positions = order[: np.searchsorted(sorted_values, value, side="left")]
+        else:
+            positions = order[: np.searchsorted(sorted_values, value, side="right")]
+        return self._positions_to_bitmap(positions)
+
+    def _empty(self) -> np.ndarray:
+        return np.zeros(self.num_bytes, dtype=np.uint8)
+
+    def _positions_to_bitmap(self, positions: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.num_bytes * 8, dtype=bool)
+        mask[positions] = True
+        # Little bit order matches faiss.IDSelectorBitmap
+        return np.packbits(mask, bitorder="little")
+
+    @staticmethod
+    def _is_numeric(values: pd.Series) -> bool:
+        return pd.api.types.infer_dtype(values, skipna=True) in (
+            "integer",
+            "floating",
+            "mixed-integer-float",
+        )
+
+    @staticmethod
+    def _key(value: Any) -> Any:
+        """Normalize numpy scalars so lookups match plain Python values"""
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
@@ -0,0 +1,303 @@
+import json
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+PREFIX = "myntra_rag"
+
+# Seconds - from a memoised query embedding up to a slow LLM call
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+COUNTER_HELP = {
+    "tokens_total": "Tokens by kind (context, saved, prompt, completion)",
+    "cache_lookups_total": "Cache lookups by cache and result",
+    "queries_total": "Answered queries by entry point and outcome",
+}
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar(
+    "myntra_rag_trace", default=None
+)
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    """Render a sorted label tuple in Prometheus syntax"""
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Trace:
+    """Spans and attributes of one request, written as a single JSONL line"""
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = dict(attrs)
+        self.start = time.perf_counter()
+        self.timestamp = time.time()
+        self.spans: List[Dict[str, Any]] = []
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add_span(self, stage: str, start: float, seconds: float, attrs: Dict):
+        span = {
+            "stage": stage,
+            "start_ms": round((start - self.start) * 1000, 3),
+            "duration_ms": round(seconds * 1000, 3),
+        }
+        if attrs:
+            span.update(attrs)
+        self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "duration_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            **self.attrs,
+            "spans": self.spans,
+        }
+
+
+class _Span:
+    """Context manager timing one stage into the histogram and active trace"""
+
+    __slots__ = ("metrics", "stage", "attrs", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str, attrs: Dict[str, Any]):
+        self.metrics = metrics
+        self.stage = stage
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.metrics.observe(
+            self.stage, time.perf_counter() - self.start, self.start, **self.attrs
+        )
+        return False
+
+
+class _TraceScope:
+    """Context manager making a Trace current for the enclosed spans"""
+
+    def __init__(self, metrics: "Metrics", name: str, attrs: Dict[str, Any]):
+        self.metrics = metrics
+        self.trace = Trace(name, attrs)
+
+    def __enter__(self) -> Trace:
+        self._token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_trace.reset(self._token)
+        if exc_type is not None:
+            self.trace.set(error=exc_type.__name__)
+        self.metrics.write_trace(self.trace)
+        return False
+
+
+class Metrics:
+    """Per-stage latency histograms, counters and JSONL request traces
+
+    Stages are timed with `with metrics.span("search"):`; spans inside a
+    `with metrics.trace("query"):` block are also collected into one JSON
+    line per request, appended to trace_path when it is set.
+    """
+
+    enabled = True
+
+    def __init__(
+        self, trace_path: Optional[str] = None, buckets: Sequence[float] = None
+    ):
+        self.trace_path = trace_path
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS)
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._lock = threading.Lock()
+        self._trace_file = None
+
+    def span(self, stage: str, **attrs) -> _Span:
+        return _Span(self, stage, attrs)
+
+    def trace(self, name: str, **attrs) -> _TraceScope:
+        return _TraceScope(self, name, attrs)
+
+    def current_trace(self) -> Optional[Trace]:
+        return _current_trace.get()
+
+    def observe(
+        self, stage: str, seconds: float, start: Optional[float] = None, **attrs
+    ):
+        """Record an already measured stage duration"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            if start is None:
+                start = time.perf_counter() - seconds
+            trace.add_span(stage, start, seconds, attrs)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Add to a counter; labels become Prometheus labels"""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def write_trace(self, trace: Trace):
+        """Append one trace as a JSON line (no-op without trace_path)"""
+        if not self.trace_path:
+            return
+        line = json.dumps(trace.to_dict(), default=str)
+        with self._lock:
+            if self._trace_file is None:
+                self._trace_file = open(self.trace_path, "a", encoding="utf-8")
+            self._trace_file.write(line + "\n")
+            self._trace_file.flush()
+
+    def to_prometheus(self) -> str:
+        """All histograms and counters in the Prometheus text format"""
+        name = f"{PREFIX}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each query stage",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (None,), h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound is None else repr(bound)
+                    labels = _labels((("le", le), ("stage", stage)))
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                stage_label = _labels((("stage", stage),))
+                lines.append(f"{name}_sum{stage_label} {h.sum}")
+                lines.append(f"{name}_count{stage_label} {h.count}")
+
+            counter_names = sorted({n for n, _ in self._counters})
+            for counter in counter_names:
+                full = f"{PREFIX}_{counter}"
+                lines.append(f"# HELP {full} {COUNTER_HELP.get(counter, counter)}")
+                lines.append(f"# TYPE {full} counter")
+                for (n, labels), value in sorted(self._counters.items()):
+                    if n == counter:
+                        lines.append(f"{full}{_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Histogram count/sum per stage and counter values, as plain dicts"""
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {"count": h.count, "sum_seconds": h.sum}
+                    for stage, h in self._histograms.items()
+                },
+                "counters": {
+                    name + _labels(labels): value
+                    for (name, labels), value in self._counters.items()
+                },
+            }
+
+    def close(self):
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NoopMetrics:
+    """Drop-in Metrics that records nothing; spans are a shared no-op object"""
+
+    enabled = False
+
+    def span(self, stage: str, **attrs) -> _NoopSpan:
+        return _NOOP_SPAN
+
+    def trace(self, name: str, **attrs) -> _NoopSpan:
+        return _NOOP_SPAN
+
+    def current_trace(self) -> None:
+        return None
+
+    def observe(self, stage: str, seconds: float, start=None, **attrs):
+        pass
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        pass
+
+    def write_trace(self, trace: Trace):
+        pass
+
+    def to_prometheus(self) -> str:
+        return ""
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"stages": {}, "counters": {}}
+
+    def close(self):
+        pass
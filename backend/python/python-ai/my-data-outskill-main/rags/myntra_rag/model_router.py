@@ -0,0 +1,246 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class ModelStats:
+    """Rolling latency and error window for one model"""
+
+    def __init__(self, window: int = 100):
+        self.latencies = deque(maxlen=window)  # successful calls only
+        self.outcomes = deque(maxlen=window)  # True = ok, False = error
+        self.last_error: Optional[float] = None
+
+    def record(self, latency: float, ok: bool):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+        else:
+            self.last_error = time.monotonic()
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        return float(np.percentile(self.latencies, q))
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+
+class ModelRouter:
+    """Latency-aware model selection with optional hedged requests
+
+    Every LLM call made through invoke()/ainvoke() is timed and recorded per
+    model. rank() orders the models of a quality tier: healthy models first,
+    fastest rolling p50 first, with models that have too few samples tried
+    in their configured order so they get measured. A model is unhealthy
+    while its error rate is above `max_error_rate` and its last error is
+    less than `cooldown` seconds old; after that it gets traffic again as a
+    probe.
+
+    Failover: a call that fails is retried on the next candidate in order
+    until one answers. Hedging: with a hedge delay, a backup model is also
+    started if the primary has not answered after that many seconds, and
+    the first successful answer wins.
+    """
+
+    def __init__(
+        self,
+        aliases: Dict[str, str] = None,
+        window: int = 100,
+        max_error_rate: float = 0.25,
+        min_samples: int = 5,
+        cooldown: float = 60.0,
+    ):
+        self.aliases = aliases or {}
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def key(self, model: str) -> str:
+        """Full model name for a shorthand"""
+        return self.aliases.get(model, model)
+
+    def record(self, model: str, latency: float, ok: bool):
+        """Record the outcome of one call"""
+        with self._lock:
+            stats = self._stats.get(self.key(model))
+            if stats is None:
+                stats = self._stats[self.key(model)] = ModelStats(self.window)
+            stats.record(latency, ok)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Rolling p50/p95 latency (seconds), error rate and sample count per model"""
+        with self._lock:
+            return {
+                model: {
+                    "p50": s.percentile(50),
+                    "p95": s.percentile(95),
+                    "error_rate": s.error_rate,
+                    "samples": len(s.outcomes),
+                    "healthy": self._healthy(s),
+                }
+                for model, s in self._stats.items()
+            }
+
+    def healthy(self, model: str) -> bool:
+        with self._lock:
+            stats = self._stats.get(self.key(model))
+            return stats is None or self._healthy(stats)
+
+    def _healthy(self, stats: ModelStats) -> bool:
+        if len(stats.outcomes) < self.min_samples:
+            return True
+        if stats.error_rate <= self.max_error_rate:
+            return True
+        return time.monotonic() - stats.last_error >= self.cooldown
+
+    def rank(self, models: Sequence[str]) -> List[str]:
+        """Order candidate models: healthy before unhealthy, then fastest p50"""
+        with self._lock:
+
+            def sort_key(item):
+                position, model = item
+                stats = self._stats.get(self.key(model))
+                if stats is None or len(stats.latencies) < self.min_samples:
+                    # Unmeasured - keep configured order ahead of measured models
+                    return (stats is not None and not self._healthy(stats), 0, position)
+                return (not self._healthy(stats), 1, stats.percentile(50))
+
+            return [m for _, m in sorted(enumerate(models), key=sort_key)]
+
+    def hedge_delay(self, model: str, default: float) -> float:
+        """Hedge after the primary's rolling p95 once it is known"""
+        with self._lock:
+            stats = self._stats.get(self.key(model))
+            if stats is None or len(stats.latencies) < self.min_samples:
+                return default
+            return stats.percentile(95)
+
+    def _timed(self, model: str, call: Callable[[str], Any]):
+        start = time.perf_counter()
+        try:
+            value = call(model)
+        except Exception:
+            self.record(model, time.perf_counter() - start, False)
+            raise
+        self.record(model, time.perf_counter() - start, True)
+        return value
+
+    def invoke(
+        self,
+        candidates: Sequence[str],
+        call: Callable[[str], Any],
+        hedge_delay: Optional[float] = None,
+    ) -> Tuple[str, Any, bool]:
+        """Call candidates[0], hedging with the next candidate if it is slow
+
+        The hedge is sent after hedge_delay seconds; without one, failed
+        calls fall over to the next candidate in turn. Returns (model that
+        answered, its response, whether a hedge was sent).
+        The losing call cannot be interrupted in a thread; its response is
+        discarded but its latency is still recorded.
+        """
+        if hedge_delay is None or len(candidates) < 2:
+            error = None
+            for model in candidates:
+                try:
+                    return model, self._timed(model, call), False
+                except Exception as e:
+                    error = e
+            raise error
+
+        pool = ThreadPoolExecutor(max_workers=len(candidates))
+        try:
+            pending = {pool.submit(self._timed, candidates[0], call): candidates[0]}
+            backups = list(candidates[1:])
+            hedged, error = False, None
+            while pending:
+                done, _ = wait(
+                    pending,
+                    timeout=hedge_delay if backups and not hedged else None,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    model = pending.pop(future)
+                    try:
+                        return model, future.result(), hedged
+                    except Exception as e:
+                        error = e
+                # Hedge once when the primary is slow; replace every failure
+                launch = len(done) if done else 1
+                for model in backups[:launch]:
+                    pending[pool.submit(self._timed, model, call)] = model
+                del backups[:launch]
+                hedged = hedged or not done
+            raise error
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _atimed(self, model: str, call: Callable[[str], Awaitable[Any]]):
+        start = time.perf_counter()
+        try:
+            value = await call(model)
+        except Exception:
+            self.record(model, time.perf_counter() - start, False)
+            raise
+        self.record(model, time.perf_counter() - start, True)
+        return value
+
+    async def ainvoke(
+        self,
+        candidates: Sequence[str],
+        call: Callable[[str], Awaitable[Any]],
+        hedge_delay: Optional[float] = None,
+    ) -> Tuple[str, Any, bool]:
+        """Async invoke(); the losing request is cancelled
+
+        A cancelled call is not recorded - it neither answered nor failed,
+        and the time it ran says nothing about its latency.
+        """
+        if hedge_delay is None or len(candidates) < 2:
+            error = None
+            for model in candidates:
+                try:
+                    return model, await self._atimed(model, call), False
+                except Exception as e:
+                    error = e
+            raise error
+
+        task = asyncio.ensure_future(self._atimed(candidates[0], call))
+        pending = {task: candidates[0]}
+        backups = list(candidates[1:])
+        hedged, error = False, None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=hedge_delay if backups and not hedged else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    model = pending.pop(task)
+                    try:
+                        return model, task.result(), hedged
+                    except Exception as e:
+                        error = e
+                launch = len(done) if done else 1
+                for model in backups[:launch]:
+                    pending[asyncio.ensure_future(self._atimed(model, call))] = model
+                del backups[:launch]
+                hedged = hedged or not done
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
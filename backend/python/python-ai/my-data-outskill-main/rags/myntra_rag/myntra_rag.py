@@ -1,23 +1,78 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
 import os
-import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
-import pandas as pd
 
 # For environment variables
 from dotenv import load_dotenv
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain.schema import Document, HumanMessage, SystemMessage
 
-# Core Libraries
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_openai import ChatOpenAI
+# Light modules only - langchain, the provider SDKs, FAISS and pandas are
+# imported by the methods that need them, so the CLI and cached-index
+# paths start fast (see import_budget.py)
+from answer_cache import SemanticAnswerCache
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from metrics import Metrics, NoopMetrics
+from model_router import ModelRouter
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from langchain.prompts import PromptTemplate
+    from langchain.schema import Document
+    from langchain.text_splitter import TextSplitter
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import Embeddings
+    from langchain_openai import ChatOpenAI
+
+    from embedding_scheduler import EmbeddingScheduler
+    from metadata_index import MetadataIndex
+    from rescorer import ExactRescorer, FullVectorWriter
+    from row_store import RowStore
+    from sharded_index import ShardedIndex, ShardedIndexWriter
+
+PROMPT_TEMPLATE = """{context}
+
+---
+
+Given the context above, answer the question as best as possible.
+
+Question: {question}
+
+Answer: """
+
+# Columns that only add noise to embeddings - identifiers, links, CSV index
+LOW_SIGNAL_COLUMNS = (
+    "Unnamed: 0",
+    "product_id",
+    "p_id",
+    "img",
+    "image",
+    "image_url",
+    "url",
+    "product_url",
+)
+
+# Written next to the index: the embedding provider and model that built it
+EMBEDDINGS_FILE = "embeddings.json"
+# Pickled docstore written by FAISS.save_local before the native format
+LEGACY_PICKLE_FILE = "index.pkl"
+
+# Embedding model used when Config.embedding_model is not set
+DEFAULT_EMBEDDING_MODELS = {
+    "google": "models/text-embedding-004",
+    "local": "sentence-transformers/all-MiniLM-L6-v2",
+}
 
 # Load environment variables
 load_dotenv()
@@ -30,14 +85,64 @@ class Config:
     # File paths
     csv_file_path: str = "Myntra_300_prod_catalogue.csv"
     vector_store_path: str = "myntra_vector_store"
-
-    # Text splitting parameters
+    # Memory-map the index and docstore and decode documents on demand when loading
+    lazy_load: bool = False
+    # Check the SHA-256 of every store file against the manifest on eager loads;
+    # lazy loads check file sizes only, so opening a mapped store stays instant
+    verify_store_checksums: bool = True
+    # Load stores saved in the old pickle format - unsafe, only for stores you
+    # created yourself; the next save rewrites them in the native format
+    allow_pickle_load: bool = False
+    # Column that uniquely identifies a product (falls back to row_index if missing)
+    id_column: str = "product_id"
+
+    # CSV loading - read the catalog in blocks of this many rows (None = all at once)
+    csv_batch_rows: Optional[int] = None
+
+    # Text splitting - "characters" cuts the "col: value" text into chunk_size
+    # character chunks on separator; "fields" keeps a product whole when it
+    # fits chunk_token_budget and splits only long_text_fields
+    chunking: str = "characters"
     chunk_size: int = 200
     chunk_overlap: int = 50
     separator: str = "\n"
-
-    # Embedding configuration
-    embedding_model: str = "models/text-embedding-004"
+    chunk_token_budget: int = 512
+    long_text_fields: List[str] = None  # default: ["description"]
+    # Columns left out of the embedded text but kept in metadata
+    # (default for "fields": ids, URLs and the CSV index column)
+    embed_exclude_columns: List[str] = None
+    # Store row metadata once in a side store; chunks keep only row/chunk index
+    compact_metadata: bool = True
+
+    # Embedding configuration - "google" (GoogleGenerativeAIEmbeddings) or
+    # "local" (sentence-transformers on the CPU, no network round trip per
+    # query). The index records the provider and model that built it and
+    # refuses to load with a different one
+    embedding_provider: str = "google"
+    embedding_model: str = None  # default depends on embedding_provider
+    local_embedding_backend: str = "torch"  # "torch" or "onnx"
+    local_embedding_batch_size: int = 32
+    local_embedding_threads: Optional[int] = None  # None = library default
+    local_embedding_warm_up: bool = True  # run one batch when the model loads
+    # On-disk embedding cache so unchanged chunks are not re-embedded (None = off)
+    embedding_cache_path: Optional[str] = "myntra_embedding_cache.db"
+
+    # Embedding scheduler - batching, concurrency and provider quotas
+    embed_batch_size: int = 100
+    embed_batch_tokens: int = 8000
+    embed_concurrency: int = 4
+    embed_requests_per_minute: Optional[float] = 1500
+    embed_tokens_per_minute: Optional[float] = None
+    embed_max_retries: int = 6
+
+    # Pipelined ingestion - blocks of rows stream through parse -> split ->
+    # embed -> index with at most ingest_queue_size blocks between stages
+    ingest_block_rows: int = 5000  # block size when csv_batch_rows is not set
+    # Split processes (None = CPU count); only started for catalogs larger
+    # than one block
+    split_workers: Optional[int] = None
+    ingest_queue_size: int = 4
+    index_add_batch: int = 10_000  # vectors added to the index per call
 
     # OpenRouter Models - Updated model names for OpenRouter (last updated: 2024)
     openrouter_models: Dict[str, str] = None
@@ -46,17 +151,105 @@ class Config:
     )
     temperature: float = 0.1
     max_tokens: int = 4096
+    llm_concurrency_per_model: int = 8  # max in-flight async calls per model
+
+    # Model routing - when enabled, queries without an explicit model go to the
+    # fastest healthy model of routing_tier (see model_tiers)
+    routing_enabled: bool = False
+    routing_tier: str = "balanced"
+    model_tiers: Dict[str, List[str]] = None
+    routing_window: int = 100  # calls kept per model for p50/p95/error rate
+    routing_min_samples: int = 5
+    routing_max_error_rate: float = 0.25
+    routing_cooldown: float = 60.0  # seconds before an unhealthy model is retried
+    # Hedged requests - start the next model of the tier if the first is slow
+    hedge_requests: bool = False
+    hedge_delay: float = 2.0  # seconds, until the primary's p95 is known
+
+    # Context packing - merge chunks per product and cap prompt context size
+    pack_context: bool = True
+    context_token_budget: Optional[int] = 2000
 
     # Search configuration
     num_results: int = 10
-    search_type: str = "similarity"  # or "mmr" for Maximum Marginal Relevance
+    # "similarity", "mmr" (Maximum Marginal Relevance) or "hybrid" (BM25 + vector)
+    search_type: str = "similarity"
+    hybrid_fetch_k: int = 50  # candidates taken from each retriever in hybrid mode
+    rrf_k: int = 60  # reciprocal rank fusion constant
+
+    # Reranking - re-score rerank_fetch_k candidates with a CPU cross-encoder and
+    # keep rerank_top_k for the prompt (None = off)
+    rerank_model: Optional[str] = None  # e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    rerank_fetch_k: int = 100
+    rerank_top_k: int = 5
+    rerank_batch_size: int = 32
+    rerank_budget_ms: Optional[float] = 200.0  # stop scoring new batches after this
+
+    # Index configuration - "flat" (exact), "hnsw", "ivf" or "ivfpq" (approximate)
+    index_type: str = "flat"
+    ivf_nlist: int = 1024  # number of inverted lists for ivf/ivfpq
+    pq_m: int = 16  # PQ sub-quantizers for ivfpq and pq storage
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 200
+    index_train_size: int = 100_000  # max vectors sampled to train ivf/ivfpq
+    nprobe: int = 16  # lists probed per query (ivf/ivfpq)
+    ef_search: int = 64  # HNSW search breadth
+    # Vector storage - "float32", "float16", "int8" (scalar quantized) or "pq"
+    # (product quantized). With rescore_factor > 0, k * rescore_factor
+    # candidates are re-ranked against the exact float32 vectors, which are
+    # memory-mapped from disk rather than held in RAM
+    vector_storage: str = "float32"
+    rescore_factor: int = 0
+
+    # Sharding - with shard_by set ("hash" or a column such as "category"),
+    # ingest_data also writes one index per shard and vector search scatters
+    # over them on a process pool; a filter on the shard column skips the
+    # shards it rules out. The main index is then only built flat - it backs
+    # MMR and the fallback for stale shards
+    shard_by: Optional[str] = None
+    num_shards: int = 8  # buckets for shard_by="hash"
+    shard_workers: Optional[int] = None  # processes (None = one per shard, 0 = none)
+
+    # Answer cache - reuse answers for repeated or near-identical questions.
+    # Off by default: a semantic hit returns an answer written for a different
+    # wording, which is only safe once the threshold is tuned on real traffic
+    answer_cache_enabled: bool = False
+    answer_cache_size: int = 1000
+    answer_cache_ttl: float = 3600.0  # seconds
+    answer_cache_threshold: float = 0.95  # cosine similarity for a semantic hit
+
+    # HTTP serving (rag_server.py) - requests beyond serve_max_concurrency wait
+    # in a queue of serve_max_queue for up to serve_queue_timeout seconds
+    serve_host: str = "127.0.0.1"
+    serve_port: int = 8080
+    serve_max_concurrency: int = 16
+    serve_max_queue: int = 64
+    serve_queue_timeout: float = 10.0
+
+    # Metrics - per-stage latency histograms and counters (export_metrics());
+    # with trace_path set, one JSON line per query is appended there
+    metrics_enabled: bool = False
+    trace_path: Optional[str] = None
+
+    # Metadata filtering - fields with more distinct values are not indexed
+    max_filter_values: int = 1000
 
     # API Keys (will be loaded from environment)
     google_api_key: Optional[str] = None
     openrouter_api_key: Optional[str] = None
 
     def __post_init__(self):
-        """Initialize OpenRouter models dictionary"""
+        """Initialize OpenRouter models dictionary, embedding and chunking defaults"""
+        if self.embedding_model is None:
+            self.embedding_model = DEFAULT_EMBEDDING_MODELS.get(self.embedding_provider)
+        if self.long_text_fields is None:
+            self.long_text_fields = ["description"]
+        if self.embed_exclude_columns is None:
+            self.embed_exclude_columns = (
+                list(LOW_SIGNAL_COLUMNS) if self.chunking == "fields" else []
+            )
+
         if self.openrouter_models is None:
             self.openrouter_models = {
                 # OpenAI models
@@ -94,25 +287,221 @@ class Config:
                 "claude-instant": "anthropic/claude-instant-1.2",
             }
 
+        if self.model_tiers is None:
+            self.model_tiers = {
+                "fast": [
+                    "gpt-4o-mini",
+                    "claude-3.5-haiku",
+                    "gemini-1.5-flash",
+                    "llama-3.1-8b",
+                ],
+                "balanced": [
+                    "gpt-5-mini",
+                    "gpt-4o-mini",
+                    "claude-3.5-haiku",
+                    "gemini-1.5-flash",
+                ],
+                "best": [
+                    "gpt-4o",
+                    "claude-3.5-sonnet",
+                    "gemini-1.5-pro",
+                    "llama-3.1-405b",
+                ],
+            }
+
+
+class StreamedAnswer:
+    """Iterator over streamed answer tokens; `result` is filled in when it ends"""
+
+    def __init__(
+        self,
+        tokens: Iterator[str],
+        result: Dict[str, Any],
+        start_time: float,
+        on_complete: Callable[[Dict[str, Any]], None] = None,
+    ):
+        self._tokens = tokens
+        self._result = result
+        self._start_time = start_time
+        self._on_complete = on_complete
+        self.result: Optional[Dict[str, Any]] = None
+
+    def __iter__(self) -> Iterator[str]:
+        parts = []
+        first_token_time = None
+        for token in self._tokens:
+            if not token:
+                continue
+            if first_token_time is None:
+                first_token_time = time.perf_counter() - self._start_time
+            parts.append(token)
+            yield token
+
+        latency = time.perf_counter() - self._start_time
+        self.result = {
+            **self._result,
+            "answer": "".join(parts),
+            "time_to_first_token": (
+                first_token_time if first_token_time is not None else latency
+            ),
+            "latency": latency,
+        }
+        if self._on_complete is not None:
+            self._on_complete(self.result)
+
+
+def create_text_splitter(config: Config) -> TextSplitter:
+    """Text splitter for config.chunking ("characters" or "fields")"""
+    if config.chunking == "fields":
+        from field_splitter import FieldAwareSplitter
+
+        return FieldAwareSplitter(
+            token_budget=config.chunk_token_budget,
+            long_fields=config.long_text_fields,
+        )
+    if config.chunking != "characters":
+        raise ValueError(
+            f"Unknown chunking '{config.chunking}'. Choose 'characters' or 'fields'"
+        )
+
+    from langchain.text_splitter import CharacterTextSplitter
+
+    return CharacterTextSplitter(
+        chunk_size=config.chunk_size,
+        chunk_overlap=config.chunk_overlap,
+        separator=config.separator,
+        length_function=len,
+    )
+
+
+def create_embeddings(config: Config) -> Embeddings:
+    """Embedding model for config.embedding_provider ("google" or "local")"""
+    if config.embedding_provider == "local":
+        from local_embeddings import LocalEmbeddings
+
+        embeddings = LocalEmbeddings(
+            config.embedding_model,
+            backend=config.local_embedding_backend,
+            batch_size=config.local_embedding_batch_size,
+            num_threads=config.local_embedding_threads,
+        )
+        if config.local_embedding_warm_up:
+            embeddings.warm_up()
+        return embeddings
+    if config.embedding_provider != "google":
+        raise ValueError(
+            f"Unknown embedding provider '{config.embedding_provider}'. "
+            "Choose 'google' or 'local'"
+        )
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return GoogleGenerativeAIEmbeddings(
+        model=config.embedding_model, google_api_key=config.google_api_key
+    )
+
+
+def _is_google_embeddings(embeddings) -> bool:
+    """isinstance check that does not import the Google SDK just to say no"""
+    module = sys.modules.get("langchain_google_genai")
+    return module is not None and isinstance(
+        embeddings, module.GoogleGenerativeAIEmbeddings
+    )
+
+
+class _StoreBuilder:
+    """Builds a vector store from embedded chunks arriving batch by batch
+
+    ivf/ivfpq indexes and int8/pq storage need training, so their batches
+    are held back until config.index_train_size vectors (or all of them)
+    have arrived.
+    """
+
+    def __init__(self, rag: "MyntraRAG"):
+        self.rag = rag
+        self.vector_store: Optional[FAISS] = None
+        self._pending: List[Tuple[List[Document], List[List[float]]]] = []
+        self._pending_vectors = 0
+
+    def add(self, chunks: List[Document], vectors: List[List[float]]):
+        if self.vector_store is not None:
+            self.rag._add_to_store(self.vector_store, chunks, vectors)
+            return
+
+        self._pending.append((chunks, vectors))
+        self._pending_vectors += len(vectors)
+        from ann_index import requires_training
+
+        config = self.rag.config
+        if (
+            not requires_training(*self.rag._main_index_layout())
+            or self._pending_vectors >= config.index_train_size
+        ):
+            self._create()
+
+    def finish(self) -> FAISS:
+        """Return the store, creating it from whatever is still held back"""
+        if self.vector_store is None:
+            if not self._pending_vectors:
+                raise ValueError("No chunks to index")
+            self._create()
+        return self.vector_store
+
+    def _create(self):
+        sample = np.asarray(
+            [v for _, vectors in self._pending for v in vectors], dtype=np.float32
+        )
+        self.vector_store = self.rag._empty_vector_store(sample)
+        for chunks, vectors in self._pending:
+            self.rag._add_to_store(self.vector_store, chunks, vectors)
+        self._pending = []
+        self._pending_vectors = 0
+
 
 class MyntraRAG:
     """Main RAG system for Myntra product search and Q&A"""
 
+    QUERY_EMBEDDING_MEMO_SIZE = 4096
+
     def __init__(self, config: Config = None):
         """Initialize the RAG system with configuration"""
         self.config = config or Config()
         self._load_api_keys()
         self._initialize_components()
         self.vector_store = None
+        self.metadata_index = None
+        self._metadata_index_store = None
+        self._docstore_positions = None
+        self._docstore_positions_store = None
+        self.lexical_index = None
+        self._lexical_index_store = None
+        self.row_store = None
+        self._row_store_store = None
+        self.rescorer = None
+        self._rescorer_store = None
+        # (store, FullVectorWriter) for a store being built with rescoring on
+        self._full_vectors = None
+        self.shards = None
+        self._shards_store = None
+        # Set while ingest_data builds a sharded store
+        self._shard_writer: Optional[ShardedIndexWriter] = None
+        self._shard_executor = None
+        self.last_ingest_stats = None
         self.current_model = self.config.default_model
+        # Held while the side stores above are built or swapped, so searches
+        # running in worker threads (the server) never see half-built state
+        self._state_lock = threading.RLock()
 
     def _load_api_keys(self):
         """Load API keys from environment variables"""
         self.config.google_api_key = os.getenv("GOOGLE_API_KEY")
         self.config.openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
 
-        # Validate required API keys
-        if not self.config.google_api_key:
+        # Validate required API keys (local embeddings need no Google key)
+        if (
+            self.config.embedding_provider == "google"
+            and not self.config.google_api_key
+        ):
             raise ValueError("GOOGLE_API_KEY not found in environment variables")
         if not self.config.openrouter_api_key:
             print(
@@ -121,19 +510,53 @@ class MyntraRAG:
 
     def _initialize_components(self):
         """Initialize embeddings, LLMs, and other components"""
-        # Initialize embeddings
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model=self.config.embedding_model, google_api_key=self.config.google_api_key
-        )
+        # Latency/token metrics (the no-op version costs next to nothing)
+        if self.config.metrics_enabled:
+            self.metrics = Metrics(trace_path=self.config.trace_path)
+        else:
+            self.metrics = NoopMetrics()
+
+        # Embeddings, text splitter and prompt template are created on first
+        # use (see the properties below) so their libraries load lazily
+        self._embeddings = None
+        self.embedding_cache = None
+        self._text_splitter = None
+        self._prompt_template = None
+
+        # Remember recent query embeddings so a question is embedded once
+        self._query_embeddings = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
+        self._llm_semaphores = {}
+
+        # Initialize answer cache
+        self.answer_cache = None
+        if self.config.answer_cache_enabled:
+            self.answer_cache = SemanticAnswerCache(
+                max_entries=self.config.answer_cache_size,
+                ttl=self.config.answer_cache_ttl,
+                threshold=self.config.answer_cache_threshold,
+            )
 
-        # Initialize text splitter
-        self.text_splitter = CharacterTextSplitter(
-            chunk_size=self.config.chunk_size,
-            chunk_overlap=self.config.chunk_overlap,
-            separator=self.config.separator,
-            length_function=len,
+        # Per-model latency/error tracking and routing policy
+        self.model_router = ModelRouter(
+            aliases=self.config.openrouter_models,
+            window=self.config.routing_window,
+            max_error_rate=self.config.routing_max_error_rate,
+            min_samples=self.config.routing_min_samples,
+            cooldown=self.config.routing_cooldown,
         )
 
+        # Initialize cross-encoder reranker (model is loaded on first use)
+        self.reranker = None
+        if self.config.rerank_model:
+            from reranker import CrossEncoderReranker
+
+            self.reranker = CrossEncoderReranker(
+                self.config.rerank_model,
+                batch_size=self.config.rerank_batch_size,
+                budget_ms=self.config.rerank_budget_ms,
+            )
+
         # Initialize OpenRouter LLM dictionary
         self.llms = {}
 
@@ -145,18 +568,47 @@ class MyntraRAG:
         else:
             print("No OpenRouter API key found. LLM features disabled.")
 
-        # Initialize prompt template
-        self.prompt_template = PromptTemplate(
-            input_variables=["context", "question"],
-            template="""{context}
+    @property
+    def embeddings(self) -> Embeddings:
+        """Embedding model, wrapped with the persistent cache when configured"""
+        if self._embeddings is None:
+            self._embeddings = create_embeddings(self.config)
 
----
+            # Wrap with the persistent embedding cache
+            if self.config.embedding_cache_path:
+                from embedding_cache import CachedEmbeddings, EmbeddingCache
 
-Given the context above, answer the question as best as possible.
+                self.embedding_cache = EmbeddingCache(self.config.embedding_cache_path)
+                self._embeddings = CachedEmbeddings(
+                    self._embeddings, self._embedding_key(), self.embedding_cache
+                )
+        return self._embeddings
 
-Question: {question}
+    @embeddings.setter
+    def embeddings(self, embeddings: Embeddings):
+        self._embeddings = embeddings
 
-Answer: """,
+    @property
+    def text_splitter(self) -> TextSplitter:
+        if self._text_splitter is None:
+            self._text_splitter = create_text_splitter(self.config)
+        return self._text_splitter
+
+    @property
+    def prompt_template(self) -> PromptTemplate:
+        if self._prompt_template is None:
+            from langchain.prompts import PromptTemplate
+
+            self._prompt_template = PromptTemplate(
+                input_variables=["context", "question"], template=PROMPT_TEMPLATE
+            )
+        return self._prompt_template
+
+    def _is_cached_embeddings(self) -> bool:
+        """True if the embedder is the CachedEmbeddings wrapper"""
+        module = sys.modules.get("embedding_cache")
+        return module is not None and isinstance(
+            self.embeddings, module.CachedEmbeddings
         )
 
     def get_llm(self, model_name: str = None) -> ChatOpenAI:
@@ -172,6 +624,8 @@ Answer: """,
 
         # Create LLM instance if not cached
         if model_name not in self.llms:
+            from langchain_openai import ChatOpenAI
+
             self.llms[model_name] = ChatOpenAI(
                 model=model_name,
                 temperature=self.config.temperature,
@@ -191,63 +645,113 @@ Answer: """,
         """List all available models"""
         return self.config.openrouter_models
 
+    def route_models(self, tier: str = None) -> List[str]:
+        """Models of a quality tier, best first for the next request"""
+        tier = tier or self.config.routing_tier
+        if tier not in self.config.model_tiers:
+            raise ValueError(
+                f"Unknown model tier: {tier}. "
+                f"Choose from {sorted(self.config.model_tiers)}"
+            )
+        return self.model_router.rank(self.config.model_tiers[tier])
+
+    def model_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Rolling p50/p95 latency, error rate and health per model used so far"""
+        return self.model_router.stats()
+
+    def _candidate_models(self, model: Optional[str]):
+        """Return (candidate models, hedge delay) for one generation call"""
+        if model is not None:
+            return [model], None
+        candidates = self.route_models()
+        delay = None
+        if self.config.hedge_requests:
+            delay = self.model_router.hedge_delay(
+                candidates[0], self.config.hedge_delay
+            )
+        return candidates, delay
+
     def load_and_process_csv(self, file_path: str = None) -> List[Document]:
         """Load CSV file and convert to documents"""
+        documents = []
+        for batch in self.iter_csv_documents(file_path):
+            documents.extend(batch)
+
+        return documents
+
+    def iter_csv_documents(
+        self, file_path: str = None, batch_rows: int = None
+    ) -> Iterator[List[Document]]:
+        """Stream the CSV as lists of documents, one list per block of rows"""
+        import pandas as pd
+
         file_path = file_path or self.config.csv_file_path
+        batch_rows = batch_rows or self.config.csv_batch_rows
 
         print(f"Loading CSV file from: {file_path}")
 
-        # Load CSV
+        # Load CSV (optionally in blocks so the whole frame is never materialised)
         try:
-            df = pd.read_csv(file_path)
+            if batch_rows:
+                frames = pd.read_csv(file_path, chunksize=batch_rows)
+            else:
+                frames = [pd.read_csv(file_path)]
+
+            total_rows = 0
+            for df in frames:
+                total_rows += len(df)
+                yield self._frame_to_documents(df, self.config.embed_exclude_columns)
         except FileNotFoundError:
             raise FileNotFoundError(f"CSV file not found at: {file_path}")
 
-        print(f"Loaded {len(df)} rows from CSV")
+        print(f"Loaded {total_rows} rows from CSV")
 
-        # Convert DataFrame to text documents
-        documents = []
-        for idx, row in df.iterrows():
-            # Create text representation of each row
-            text_parts = []
-            for col, value in row.items():
-                if pd.notna(value):  # Skip NaN values
-                    text_parts.append(f"{col}: {value}")
-
-            text = "\n".join(text_parts)
-
-            # Create document with metadata
-            doc = Document(
-                page_content=text,
-                metadata={
-                    "row_index": idx,
-                    **row.to_dict(),  # Include all row data as metadata
-                },
-            )
-            documents.append(doc)
+    @staticmethod
+    def _frame_to_documents(
+        df: pd.DataFrame, exclude: List[str] = ()
+    ) -> List[Document]:
+        """Convert a block of rows to documents, building text column by column
 
-        return documents
+        Columns in `exclude` stay in the metadata but not in the text.
+        """
+        from langchain.schema import Document
+
+        if df.empty:
+            return []
+
+        # Build "col: value" lines for the whole block at once, skipping NaN
+        # cells with a mask instead of checking every cell in Python
+        texts = np.full(len(df), "", dtype=object)
+        has_text = np.zeros(len(df), dtype=bool)
+        for col in df.columns:
+            if col in exclude:
+                continue
+            mask = df[col].notna().to_numpy()
+            if not mask.any():
+                continue
+            line = (f"{col}: " + df[col].astype(str)).to_numpy(dtype=object)
+            sep = np.where(has_text & mask, "\n", "")
+            texts = texts + sep + np.where(mask, line, "")
+            has_text |= mask
+
+        # Include all row data as metadata (one conversion for the whole block)
+        records = df.to_dict(orient="records")
+
+        return [
+            Document(page_content=text, metadata={"row_index": idx, **record})
+            for idx, text, record in zip(df.index, texts, records)
+        ]
 
     def split_documents(self, documents: List[Document]) -> List[Document]:
         """Split documents into chunks"""
         print(f"Splitting {len(documents)} documents into chunks...")
 
-        chunks = []
-        for doc in documents:
-            # Split the document text
-            split_texts = self.text_splitter.split_text(doc.page_content)
-
-            # Create new documents for each chunk
-            for i, chunk_text in enumerate(split_texts):
-                chunk_doc = Document(
-                    page_content=chunk_text,
-                    metadata={
-                        **doc.metadata,
-                        "chunk_index": i,
-                        "total_chunks": len(split_texts),
-                    },
-                )
-                chunks.append(chunk_doc)
+        from ingest_pipeline import split_into_chunks
+
+        # Row data lives once in the row store when compact_metadata is on
+        chunks = split_into_chunks(
+            documents, self.text_splitter, self.config.compact_metadata
+        )
 
         print(f"Created {len(chunks)} chunks")
         return chunks
@@ -256,60 +760,737 @@ Answer: """,
         """Create FAISS vector store from documents"""
         print("Creating vector store with embeddings...")
 
-        # Create FAISS vector store
-        vector_store = FAISS.from_documents(
-            documents=documents, embedding=self.embeddings
-        )
+        if self._is_cached_embeddings():
+            self.embeddings.reset_stats()
+
+        # Embed through the scheduler, then build the FAISS vector store
+        # (stable ids allow incremental updates later)
+        texts = [d.page_content for d in documents]
+        vectors = self._embed_texts(texts)
+        if not documents:
+            raise ValueError("No chunks to index")
+
+        # Approximate indexes train on a sample, then all vectors are added
+        vector_store = self._empty_vector_store(np.asarray(vectors, dtype=np.float32))
+        self._add_to_store(vector_store, documents, vectors)
+
+        if self._is_cached_embeddings():
+            stats = self.embeddings.stats()
+            print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses")
 
         print("Vector store created successfully")
         return vector_store
 
+    def _empty_vector_store(self, sample: np.ndarray) -> FAISS:
+        """Empty store whose index is built (and, if it needs it, trained) on sample"""
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+
+        from ann_index import build_faiss_index, set_search_params
+
+        index_type, storage = self._main_index_layout()
+        index = build_faiss_index(
+            sample,
+            index_type=index_type,
+            ivf_nlist=self.config.ivf_nlist,
+            pq_m=self.config.pq_m,
+            pq_nbits=self.config.pq_nbits,
+            hnsw_m=self.config.hnsw_m,
+            hnsw_ef_construction=self.config.hnsw_ef_construction,
+            train_size=self.config.index_train_size,
+            storage=storage,
+        )
+        set_search_params(index, self.config.nprobe, self.config.ef_search)
+        vector_store = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+        )
+        if self.config.rescore_factor:
+            self._track_full_vectors(vector_store)
+        return vector_store
+
+    def _main_index_layout(self) -> Tuple[str, str]:
+        """(index type, vector storage) of the store's own FAISS index
+
+        A sharded store is searched through its shard indexes, so the main
+        index only serves MMR and the fallback for stale shards. It is kept
+        flat, with the configured compression, instead of building the
+        graph or clustering a second time over every vector.
+        """
+        if not self.config.shard_by:
+            return self.config.index_type, self.config.vector_storage
+        if self.config.index_type == "ivfpq":
+            return "flat", "pq"
+        return "flat", self.config.vector_storage
+
+    def _track_full_vectors(self, vector_store: FAISS) -> FullVectorWriter:
+        """Write the exact vectors added to vector_store for rescoring
+
+        The file is moved next to the index when the store is saved.
+        """
+        from rescorer import FullVectorWriter
+
+        if self._full_vectors is not None:
+            self._full_vectors[1].abort()
+        writer = FullVectorWriter(self.config.vector_store_path)
+        self._full_vectors = (vector_store, writer)
+        return writer
+
+    def _add_to_store(
+        self, vector_store: FAISS, chunks: List[Document], vectors: List[List[float]]
+    ):
+        """Add embedded chunks (stable ids allow incremental updates later)"""
+        ids = None
+        if chunks and all("product_key" in c.metadata for c in chunks):
+            ids = self._ids_for_chunks(chunks)
+        if self._shard_writer is not None:
+            self._shard_writer.add(
+                [c.metadata["row_index"] for c in chunks],
+                vector_store.index.ntotal,
+                vectors,
+            )
+        vector_store.add_embeddings(
+            text_embeddings=list(zip([c.page_content for c in chunks], vectors)),
+            metadatas=self._stored_metadatas(chunks),
+            ids=ids,
+        )
+        if self._full_vectors is not None and self._full_vectors[0] is vector_store:
+            self._full_vectors[1].append(vectors)
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed document texts in batches through the rate-limited scheduler"""
+        return self._embedding_scheduler().embed_documents(texts)
+
+    def _embedding_scheduler(self) -> EmbeddingScheduler:
+        """Scheduler configured with the batching limits and provider quotas"""
+        # With the embedding cache on, finished batches are already persisted
+        # there, so an interrupted ingest resumes without a separate checkpoint
+        from embedding_scheduler import EmbeddingScheduler
+
+        checkpoint_path = None
+        if not self.config.embedding_cache_path:
+            checkpoint_path = f"{self.config.vector_store_path}_embed_checkpoint.db"
+
+        if self.config.embedding_provider == "local":
+            # One batch at a time - the model already uses every CPU thread
+            # it is given, and there is no provider quota to respect
+            return EmbeddingScheduler(
+                self.embeddings,
+                self._embedding_key(),
+                max_batch_size=self.config.embed_batch_size,
+                max_batch_tokens=self.config.embed_batch_tokens,
+                concurrency=1,
+                max_retries=0,
+                checkpoint_path=checkpoint_path,
+            )
+        return EmbeddingScheduler(
+            self.embeddings,
+            self._embedding_key(),
+            max_batch_size=self.config.embed_batch_size,
+            max_batch_tokens=self.config.embed_batch_tokens,
+            concurrency=self.config.embed_concurrency,
+            requests_per_minute=self.config.embed_requests_per_minute,
+            tokens_per_minute=self.config.embed_tokens_per_minute,
+            max_retries=self.config.embed_max_retries,
+            checkpoint_path=checkpoint_path,
+        )
+
+    def _embedding_provider(self) -> Dict[str, Any]:
+        """Provider and model that embed text, recorded next to the index"""
+        if self.config.embedding_provider == "local":
+            return {
+                "provider": "local",
+                "model": self.config.embedding_model,
+                "backend": self.config.local_embedding_backend,
+            }
+        return {"provider": "google", "model": self.config.embedding_model}
+
+    def _embedding_key(self) -> str:
+        """Model name under which vectors are cached and checkpointed"""
+        if self.config.embedding_provider == "local":
+            # torch and onnx runs of a model differ slightly - keep them apart
+            return (
+                f"local:{self.config.local_embedding_backend}:"
+                f"{self.config.embedding_model}"
+            )
+        return self.config.embedding_model
+
+    def _embeddings_path(self) -> Path:
+        return Path(self.config.vector_store_path) / EMBEDDINGS_FILE
+
+    def _stored_embedding_provider(self) -> Dict[str, Any]:
+        """Provider recorded with the saved index
+
+        Indexes saved before the provider was recorded were all built with
+        Google embeddings; their model is unknown.
+        """
+        path = self._embeddings_path()
+        if not path.exists():
+            return {"provider": "google", "model": None}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _embedding_provider_changed(self) -> List[str]:
+        """Settings of the configured embeddings that differ from the index's"""
+        stored = self._stored_embedding_provider()
+        return [
+            key
+            for key, value in self._embedding_provider().items()
+            if stored.get(key) is not None and stored[key] != value
+        ]
+
+    def _check_embedding_provider(self):
+        """Refuse an index built by another embedding provider or model"""
+        mismatch = self._embedding_provider_changed()
+        if mismatch:
+            stored = self._stored_embedding_provider()
+            built_with = ", ".join(f"{k}={v}" for k, v in stored.items())
+            raise ValueError(
+                f"Vector store at {self.config.vector_store_path} was built with "
+                f"{built_with}; the configured embeddings differ in "
+                f"{', '.join(mismatch)}. Re-ingest the data or configure the "
+                "same embedding provider and model."
+            )
+
     def save_vector_store(self, vector_store: FAISS = None):
-        """Save vector store to disk"""
+        """Save vector store to disk
+
+        The index, the docstore columns and a manifest with checksums are
+        written by native_store - nothing is pickled.
+        """
+        import native_store
+        from lazy_store import DOCSTORE_FILE
+        from rescorer import ExactRescorer
+
         vs = vector_store or self.vector_store
         if vs is None:
             raise ValueError("No vector store to save")
 
         print(f"Saving vector store to: {self.config.vector_store_path}")
-        vs.save_local(self.config.vector_store_path)
+        store_path = Path(self.config.vector_store_path)
+        store_path.mkdir(parents=True, exist_ok=True)
+        with open(self._embeddings_path(), "w", encoding="utf-8") as f:
+            json.dump({**self._embedding_provider(), "dim": vs.index.d}, f)
+        # Exact vectors for rescoring; without rescoring a leftover copy
+        # would fall out of step with the index
+        if self._full_vectors is not None and self._full_vectors[0] is vs:
+            self._full_vectors[1].commit()
+            self._full_vectors = None
+            self._rescorer_store = None
+        elif not self.config.rescore_factor:
+            ExactRescorer.remove(self.config.vector_store_path)
+        native_store.save_store(
+            vs,
+            str(store_path),
+            extra_files=[EMBEDDINGS_FILE, *self._side_store_files()],
+        )
+        # Files of the pickle/SQLite format would no longer match the index
+        for legacy in (LEGACY_PICKLE_FILE, DOCSTORE_FILE):
+            (store_path / legacy).unlink(missing_ok=True)
         print("Vector store saved successfully")
 
-    def load_vector_store(self) -> FAISS:
-        """Load vector store from disk"""
+    def _side_store_files(self) -> List[str]:
+        """Side stores next to the index that the store manifest covers"""
+        from metadata_index import MetadataIndex
+        from rescorer import ExactRescorer
+        from row_store import RowStore
+        from sharded_index import SHARDS_DIR
+
+        return [
+            RowStore.FILE_NAME,
+            RowStore.LEGACY_FILE_NAME,
+            LexicalIndex.FILE_NAME,
+            MetadataIndex.FILE_NAME,
+            self._ingest_state_path().name,
+            ExactRescorer.FILE_NAME,
+            SHARDS_DIR,
+        ]
+
+    def load_vector_store(self, lazy: bool = None) -> FAISS:
+        """Load vector store from disk
+
+        The files are checked against the store manifest first. With
+        lazy=True (default: config.lazy_load) the index and the docstore
+        columns are memory-mapped and documents are decoded as results need
+        them, so worker processes share the OS page cache and start almost
+        instantly. Lazily loaded stores are read-only.
+        """
+        from langchain_community.vectorstores import FAISS
+
+        import native_store
+        from ann_index import set_search_params
+
         print(f"Loading vector store from: {self.config.vector_store_path}")
 
-        if not Path(self.config.vector_store_path).exists():
+        store_path = Path(self.config.vector_store_path)
+        if not store_path.exists():
             raise FileNotFoundError(
                 f"Vector store not found at: {self.config.vector_store_path}"
             )
+        self._check_embedding_provider()
 
+        lazy = self.config.lazy_load if lazy is None else lazy
+        if native_store.exists(str(store_path)):
+            # Hashing would read every mapped page the lazy load avoids
+            index, docstore, index_to_docstore_id = native_store.load_store(
+                str(store_path), lazy, self.config.verify_store_checksums and not lazy
+            )
+        else:
+            index, docstore, index_to_docstore_id = self._load_legacy_store(lazy)
+        vector_store = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+        )
+        set_search_params(vector_store.index, self.config.nprobe, self.config.ef_search)
+
+        print("Vector store loaded successfully")
+        return vector_store
+
+    def _load_legacy_store(self, lazy: bool):
+        """Open a store saved before the native format (no manifest)
+
+        Its SQLite docstore is read without pickle; stores that only have
+        the pickled docstore need config.allow_pickle_load. Either way the
+        next save rewrites the store natively.
+        """
+        import faiss
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+
+        from lazy_store import DOCSTORE_FILE, load_lazy
+
+        store_path = Path(self.config.vector_store_path)
+        print("Vector store has no manifest - reading the legacy format")
+        if (store_path / DOCSTORE_FILE).exists():
+            index, docstore, index_to_docstore_id = load_lazy(
+                str(store_path / "index.faiss"), str(store_path / DOCSTORE_FILE)
+            )
+            if lazy:
+                return index, docstore, index_to_docstore_id
+            # Incremental updates need a writable, in-memory copy
+            index_to_docstore_id = dict(index_to_docstore_id.items())
+            docstore = InMemoryDocstore(
+                {d: docstore.search(d) for d in index_to_docstore_id.values()}
+            )
+            index = faiss.read_index(str(store_path / "index.faiss"))
+            return index, docstore, index_to_docstore_id
+
+        if not self.config.allow_pickle_load:
+            raise ValueError(
+                f"Vector store at {self.config.vector_store_path} is in the old "
+                "pickle format, which is unsafe to load. Re-ingest the data, or "
+                "set Config.allow_pickle_load=True once for a store you created "
+                "yourself and save it again."
+            )
         vector_store = FAISS.load_local(
             self.config.vector_store_path,
             self.embeddings,
             allow_dangerous_deserialization=True,
         )
+        return (
+            vector_store.index,
+            vector_store.docstore,
+            vector_store.index_to_docstore_id,
+        )
 
-        print("Vector store loaded successfully")
-        return vector_store
+    def ingest_data(self, file_path: str = None, incremental: bool = False):
+        """Complete ingestion pipeline: load CSV, process, and create vector store
 
-    def ingest_data(self, file_path: str = None):
-        """Complete ingestion pipeline: load CSV, process, and create vector store"""
-        # Load and process CSV
-        documents = self.load_and_process_csv(file_path)
+        With incremental=True, only products that were added, changed or removed
+        since the last ingest are re-embedded (falls back to a full rebuild when
+        there is no previous index).
+        """
+        if incremental and self._ingest_state_path().exists():
+            return self._ingest_incremental(file_path)
+
+        from ingest_pipeline import IngestPipeline, format_stats
+
+        state = {
+            "embedding_model": self.config.embedding_model,
+            "id_column": self.config.id_column,
+            "chunking": self._chunking_settings(),
+            "rows": {},
+        }
+        row_metadatas = []
+        seen_keys = {}
+
+        from sharded_index import ShardedIndex, ShardedIndexWriter
+
+        if self.config.shard_by:
+            self._shard_writer = ShardedIndexWriter(
+                self.config.vector_store_path,
+                self.config.shard_by,
+                self.config.num_shards,
+            )
 
-        # Split documents into chunks
-        chunks = self.split_documents(documents)
+        def on_block(documents: List[Document]):
+            keys = self._product_keys(documents, seen_keys)
+            state["rows"].update(self._build_ingest_state(documents, keys)["rows"])
+            row_metadatas.extend(d.metadata for d in documents)
+            if self._shard_writer is not None:
+                self._shard_writer.assign(d.metadata for d in documents)
+
+        # Index is created once the first vectors arrive (ivf/ivfpq wait for
+        # a full training sample)
+        builder = _StoreBuilder(self)
+
+        def add(chunks: List[Document], vectors: List[List[float]]):
+            builder.add(chunks, vectors)
+            self._record_chunk_counts(state, chunks)
+
+        if self._is_cached_embeddings():
+            self.embeddings.reset_stats()
+        scheduler = self._embedding_scheduler()
+
+        async def embed(texts: List[str]) -> List[List[float]]:
+            return await scheduler.aembed_documents(texts, keep_checkpoint=True)
+
+        pipeline = IngestPipeline(
+            self.iter_csv_documents(
+                file_path, self.config.csv_batch_rows or self.config.ingest_block_rows
+            ),
+            self.text_splitter,
+            self.config.compact_metadata,
+            embed,
+            add,
+            on_block=on_block,
+            workers=self.config.split_workers,
+            queue_size=self.config.ingest_queue_size,
+            add_batch=self.config.index_add_batch,
+        )
+        try:
+            self.last_ingest_stats = pipeline.run()
+            scheduler.remove_checkpoint()
+            self.vector_store = builder.finish()
+        except BaseException:
+            if self._shard_writer is not None:
+                self._shard_writer.abort()
+                self._shard_writer = None
+            raise
+
+        print(format_stats(self.last_ingest_stats))
+        if self._is_cached_embeddings():
+            stats = self.embeddings.stats()
+            print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses")
+
+        # Side stores first: the manifest save_vector_store writes last
+        # covers them too
+        if self._shard_writer is not None:
+            writer, self._shard_writer = self._shard_writer, None
+            num_shards = writer.commit(self._build_shard_index)
+            print(f"Wrote {num_shards} shards by {self.config.shard_by}")
+        else:
+            ShardedIndex.remove(self.config.vector_store_path)
+        self._shards_store = None
+        self._rebuild_lexical_index()
+        self._save_row_store(row_metadatas)
+        self._rebuild_metadata_index()
+        self._invalidate_answer_cache()
+        self._save_ingest_state(state)
+        self.save_vector_store()
 
-        # Create vector store
-        self.vector_store = self.create_vector_store(chunks)
+        print(f"Ingestion complete! {self.vector_store.index.ntotal} chunks indexed.")
+
+    def _ingest_incremental(self, file_path: str = None):
+        """Diff the CSV against the indexed state and apply only the delta"""
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+
+        from ann_index import supports_removal
+
+        documents = self.load_and_process_csv(file_path)
+        keys = self._product_keys(documents)
+        new_state = self._build_ingest_state(documents, keys)
+        old_state = self._load_ingest_state()
+
+        # Vectors from different embedding models cannot share an index
+        if self._embedding_provider_changed():
+            print("Embedding provider changed - rebuilding from scratch")
+            return self.ingest_data(file_path)
+
+        # Kept rows chunked with other settings would mix chunk layouts
+        previous = old_state.get("chunking")
+        if previous is None and self.config.chunking == "characters":
+            previous = new_state["chunking"]  # state written before it was recorded
+        if previous != new_state["chunking"]:
+            print("Chunking settings changed - rebuilding from scratch")
+            return self.ingest_data(file_path)
+
+        old_rows, new_rows = old_state["rows"], new_state["rows"]
+        removed = [k for k in old_rows if k not in new_rows]
+        changed = [
+            k
+            for k in new_rows
+            if k in old_rows and old_rows[k]["hash"] != new_rows[k]["hash"]
+        ]
+        added = [k for k in new_rows if k not in old_rows]
+
+        print(
+            f"Incremental ingest: {len(added)} added, {len(changed)} changed, "
+            f"{len(removed)} removed, {len(new_rows) - len(added) - len(changed)} "
+            "unchanged"
+        )
 
-        # Save vector store
+        if not (added or changed or removed):
+            print("Index is up to date.")
+            return
+
+        if self.config.shard_by:
+            # Unchanged chunks come back from the embedding cache
+            print("Sharded stores are rebuilt in full")
+            return self.ingest_data(file_path)
+
+        # Updates need a writable, fully loaded store
+        if self.vector_store is None or not isinstance(
+            self.vector_store.docstore, InMemoryDocstore
+        ):
+            self.vector_store = self.load_vector_store(lazy=False)
+
+        if (removed or changed) and not supports_removal(self.vector_store.index):
+            print("Index type does not support deletes - rebuilding from scratch")
+            return self.ingest_data(file_path)
+
+        # Drop chunks of removed and changed products
+        stale_ids = [
+            chunk_id
+            for key in removed + changed
+            for chunk_id in self._chunk_ids(key, old_rows[key]["chunks"])
+        ]
+        rescorer = self.get_rescorer()
+        if rescorer is not None:
+            # Rewrite the exact vectors without the stale rows, in index order
+            positions = {
+                d: p for p, d in self.vector_store.index_to_docstore_id.items()
+            }
+            keep = np.ones(len(rescorer), dtype=bool)
+            keep[[positions[chunk_id] for chunk_id in stale_ids]] = False
+            rescorer.copy_to(self._track_full_vectors(self.vector_store), keep)
+        if stale_ids:
+            self.vector_store.delete(stale_ids)
+
+        # Embed and add chunks for new and changed products
+        upsert_keys = set(added + changed)
+        upsert_docs = [d for d, k in zip(documents, keys) if k in upsert_keys]
+        chunks = self.split_documents(upsert_docs)
+        if chunks:
+            texts = [c.page_content for c in chunks]
+            self._add_to_store(self.vector_store, chunks, self._embed_texts(texts))
+
+        # Row positions may have shifted in the new CSV - repoint kept chunks
+        # (row_index is left out of the change hash)
+        key_to_row = {k: d.metadata["row_index"] for d, k in zip(documents, keys)}
+        for doc_id in self.vector_store.index_to_docstore_id.values():
+            doc = self.vector_store.docstore.search(doc_id)
+            doc.metadata["row_index"] = key_to_row[doc_id.rsplit(":", 1)[0]]
+
+        self._rebuild_lexical_index()
+        self._save_row_store([d.metadata for d in documents])
+        self._rebuild_metadata_index()
+        self._invalidate_answer_cache()
+
+        # Unchanged products keep their previous chunk counts
+        for key, row in new_state["rows"].items():
+            if key not in upsert_keys:
+                row["chunks"] = old_rows[key]["chunks"]
+        self._record_chunk_counts(new_state, chunks)
+        self._save_ingest_state(new_state)
         self.save_vector_store()
 
-        print(f"Ingestion complete! {len(chunks)} chunks indexed.")
+        print(
+            f"Incremental ingest complete! {len(stale_ids)} chunks removed, "
+            f"{len(chunks)} chunks added."
+        )
+
+    def _product_keys(
+        self, documents: List[Document], seen: Dict[str, int] = None
+    ) -> List[str]:
+        """Assign each row a stable product key and store it in the metadata
+
+        Pass the same `seen` dict when keying a CSV block by block so
+        duplicate ids are numbered across blocks.
+        """
+        keys = []
+        seen = {} if seen is None else seen
+        for doc in documents:
+            value = doc.metadata.get(self.config.id_column)
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                value = doc.metadata["row_index"]
+            key = str(value)
+
+            # Disambiguate duplicate ids deterministically by occurrence
+            count = seen.get(key, 0)
+            seen[key] = count + 1
+            if count:
+                key = f"{key}#{count}"
+
+            doc.metadata["product_key"] = key
+            keys.append(key)
+        return keys
+
+    def _build_ingest_state(
+        self, documents: List[Document], keys: List[str]
+    ) -> Dict[str, Any]:
+        """Record the content hash of every product"""
+        rows = {}
+        for doc, key in zip(documents, keys):
+            rows[key] = {"hash": self._row_hash(doc), "chunks": 0}
+        return {
+            "embedding_model": self.config.embedding_model,
+            "id_column": self.config.id_column,
+            "chunking": self._chunking_settings(),
+            "rows": rows,
+        }
+
+    @staticmethod
+    def _row_hash(doc: Document) -> str:
+        """Hash of a row's text and every column, embedded or not
+
+        Columns left out of the text (embed_exclude_columns) still end up in
+        the stored metadata, so editing one must count as a change. The
+        row position is left out - inserting a row does not change the rows
+        after it.
+        """
+        metadata = {
+            k: v
+            for k, v in doc.metadata.items()
+            if k not in ("row_index", "product_key")
+        }
+        row = json.dumps([doc.page_content, metadata], sort_keys=True, default=str)
+        return hashlib.sha256(row.encode("utf-8")).hexdigest()
+
+    def _chunking_settings(self) -> Dict[str, Any]:
+        """Settings that decide chunk boundaries, recorded in the ingest state"""
+        if self.config.chunking == "fields":
+            return {
+                "strategy": "fields",
+                "token_budget": self.config.chunk_token_budget,
+                "long_text_fields": list(self.config.long_text_fields),
+            }
+        return {
+            "strategy": "characters",
+            "chunk_size": self.config.chunk_size,
+            "chunk_overlap": self.config.chunk_overlap,
+            "separator": self.config.separator,
+        }
+
+    @staticmethod
+    def _record_chunk_counts(state: Dict[str, Any], chunks: List[Document]):
+        """Store how many chunks each product was split into"""
+        for chunk in chunks:
+            row = state["rows"][chunk.metadata["product_key"]]
+            row["chunks"] = max(row["chunks"], chunk.metadata["chunk_index"] + 1)
+
+    @staticmethod
+    def _chunk_ids(key: str, num_chunks: int) -> List[str]:
+        """Deterministic docstore ids for the chunks of a product"""
+        return [f"{key}:{i}" for i in range(num_chunks)]
+
+    @staticmethod
+    def _ids_for_chunks(chunks: List[Document]) -> List[str]:
+        """Docstore ids for split chunks, derived from their metadata"""
+        return [
+            f"{c.metadata['product_key']}:{c.metadata['chunk_index']}" for c in chunks
+        ]
+
+    def _ingest_state_path(self) -> Path:
+        return Path(self.config.vector_store_path) / "ingest_state.json"
+
+    def _load_ingest_state(self) -> Dict[str, Any]:
+        with open(self._ingest_state_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_ingest_state(self, state: Dict[str, Any]):
+        path = self._ingest_state_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    def search(
+        self, query: str, k: int = None, filter: Dict[str, Any] = None
+    ) -> List[Document]:
+        """Search for relevant documents
+
+        Args:
+            query: Search text
+            k: Number of results (defaults to config.num_results)
+            filter: Optional metadata filter, e.g.
+                {"brand": "Nike", "price": {"$lt": 2000}, "in_stock": True}.
+                The vector search is restricted to matching chunks, so results
+                are exact matches without over-fetching.
+        """
+        self._ensure_vector_store()
+
+        k = k or self.config.num_results
+
+        with self.metrics.span("search", search_type=self.config.search_type, k=k):
+            if self.config.search_type == "hybrid":
+                ids = self._hybrid_search_ids(query, k, filter)
+                results = self._docs_for_ids(ids)
+            elif filter:
+                results = self._docs_for_ids(self._vector_search_ids(query, k, filter))
+            elif self.config.search_type == "mmr":
+                # Maximum Marginal Relevance search for diversity
+                embedding = self._embed_query(query)
+                with self.metrics.span("vector_search"):
+                    results = self.vector_store.max_marginal_relevance_search_by_vector(
+                        embedding=embedding, k=k, fetch_k=k * 2
+                    )
+            elif self.get_rescorer() is not None or self.get_shards() is not None:
+                results = self._docs_for_ids(self._vector_search_ids(query, k))
+            else:
+                # Standard similarity search
+                embedding = self._embed_query(query)
+                with self.metrics.span("vector_search"):
+                    results = self.vector_store.similarity_search_by_vector(
+                        embedding=embedding, k=k
+                    )
+
+            # Compact chunks get their row metadata back only now
+            with self.metrics.span("hydrate"):
+                return self._hydrate(results)
+
+    def retrieve(
+        self, query: str, filter: Dict[str, Any] = None, verbose: bool = False
+    ) -> List[Document]:
+        """Search and, when a reranker is configured, rerank the candidates
+
+        This is the document set that goes into the prompt: without a
+        reranker it is search(); with one, config.rerank_fetch_k candidates
+        are fetched and the best config.rerank_top_k kept.
+        """
+        if self.reranker is None:
+            return self.search(query, filter=filter)
+
+        candidates = self.search(query, k=self.config.rerank_fetch_k, filter=filter)
+        with self.metrics.span("rerank", candidates=len(candidates)):
+            return self.rerank(query, candidates, verbose=verbose)
+
+    def rerank(
+        self,
+        query: str,
+        documents: List[Document],
+        top_k: int = None,
+        verbose: bool = False,
+    ) -> List[Document]:
+        """Reorder documents by cross-encoder score and keep the best top_k"""
+        if self.reranker is None:
+            raise ValueError("No reranker configured. Set config.rerank_model.")
+
+        reranked, stats = self.reranker.rerank(
+            query, documents, top_k or self.config.rerank_top_k
+        )
+        if verbose:
+            print(
+                f"Reranked {stats['scored']}/{stats['candidates']} candidates "
+                f"in {stats['rerank_ms']:.1f} ms"
+            )
+        return reranked
 
-    def search(self, query: str, k: int = None) -> List[Document]:
-        """Search for relevant documents"""
+    def _ensure_vector_store(self):
+        """Load the vector store from disk if it is not in memory yet"""
         if self.vector_store is None:
             # Try to load from disk
             try:
@@ -319,29 +1500,461 @@ Answer: """,
                     "No vector store available. Please run ingest_data() first."
                 )
 
+    def search_batch(
+        self, queries: List[str], k: int = None, filter: Dict[str, Any] = None
+    ) -> List[List[Document]]:
+        """Search for many queries, embedding them in one call
+
+        Plain similarity search runs as a single multi-query FAISS search;
+        other modes reuse the batched embeddings query by query.
+        """
+        self._ensure_vector_store()
         k = k or self.config.num_results
 
-        if self.config.search_type == "mmr":
-            # Maximum Marginal Relevance search for diversity
-            results = self.vector_store.max_marginal_relevance_search(
-                query=query, k=k, fetch_k=k * 2
+        vectors = self.embed_queries(queries)
+        if filter or self.config.search_type != "similarity" or not queries:
+            return [self.search(q, k=k, filter=filter) for q in queries]
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        positions = self._index_search(matrix, k)
+        return [
+            self._hydrate(
+                self._docs_for_ids(
+                    [
+                        self.vector_store.index_to_docstore_id[int(i)]
+                        for i in row
+                        if i != -1
+                    ]
+                )
             )
-        else:
-            # Standard similarity search
-            results = self.vector_store.similarity_search(query=query, k=k)
+            for row in positions
+        ]
+
+    def get_metadata_index(self) -> MetadataIndex:
+        """Load (or build) the secondary metadata indexes for the current store"""
+        from metadata_index import MetadataIndex
+
+        with self._state_lock:
+            if (
+                self.metadata_index is None
+                or self._metadata_index_store is not self.vector_store
+            ):
+                self.metadata_index = None
+                if MetadataIndex.exists(self.config.vector_store_path):
+                    saved = MetadataIndex.load(self.config.vector_store_path)
+                    # A file left behind by another store is rebuilt
+                    if saved.size == self.vector_store.index.ntotal:
+                        self.metadata_index = saved
+                if self.metadata_index is None:
+                    self.metadata_index = self._build_metadata_index()
+                self._metadata_index_store = self.vector_store
+            return self.metadata_index
+
+    def _build_metadata_index(self) -> MetadataIndex:
+        """Index the metadata of every chunk, in FAISS position order"""
+        from metadata_index import MetadataIndex
+
+        row_store = self.get_row_store()
+        if row_store is None:
+            return MetadataIndex.from_vector_store(
+                self.vector_store,
+                max_categorical_values=self.config.max_filter_values,
+            )
+        # Expand compact chunks to full row metadata, position by position
+        store = self.vector_store
+        row_indices = [
+            store.docstore.search(store.index_to_docstore_id[i]).metadata["row_index"]
+            for i in range(store.index.ntotal)
+        ]
+        return MetadataIndex(
+            row_store.frame_for(row_indices),
+            max_categorical_values=self.config.max_filter_values,
+        )
 
-        return results
+    def _rebuild_metadata_index(self):
+        """Index the current store for filtering and persist it with the store"""
+        self.metadata_index = self._build_metadata_index()
+        self._metadata_index_store = self.vector_store
+        self.metadata_index.save(self.config.vector_store_path)
+
+    def _get_docstore_positions(self) -> Dict[str, int]:
+        """Docstore id -> FAISS position, for filtering lexical hits"""
+        with self._state_lock:
+            if self._docstore_positions_store is not self.vector_store:
+                self._docstore_positions = {
+                    doc_id: pos
+                    for pos, doc_id in self.vector_store.index_to_docstore_id.items()
+                }
+                self._docstore_positions_store = self.vector_store
+            return self._docstore_positions
+
+    def get_row_store(self) -> Optional[RowStore]:
+        """Load the row metadata side store for the current vector store, if any"""
+        from row_store import RowStore
+
+        with self._state_lock:
+            if self._row_store_store is not self.vector_store:
+                self.row_store = None
+                if RowStore.exists(self.config.vector_store_path):
+                    self.row_store = RowStore.load(self.config.vector_store_path)
+                self._row_store_store = self.vector_store
+            return self.row_store
+
+    def _save_row_store(self, metadatas: List[Dict[str, Any]]):
+        """Persist one copy of every row's metadata next to the FAISS files"""
+        if not self.config.compact_metadata:
+            return
+        from row_store import RowStore
+
+        self.row_store = RowStore.from_metadatas(metadatas)
+        self._row_store_store = self.vector_store
+        self.row_store.save(self.config.vector_store_path)
+
+    def _stored_metadatas(self, chunks: List[Document]) -> List[Dict[str, Any]]:
+        """Metadata written to the docstore for each chunk"""
+        if not self.config.compact_metadata:
+            return [c.metadata for c in chunks]
+        return [
+            {
+                "row_index": c.metadata["row_index"],
+                "chunk_index": c.metadata["chunk_index"],
+            }
+            for c in chunks
+        ]
+
+    def _hydrate(self, documents: List[Document]) -> List[Document]:
+        """Attach full row metadata to compact chunks being returned"""
+        row_store = self.get_row_store()
+        if row_store is None:
+            return documents
+        from langchain.schema import Document
+
+        return [
+            Document(
+                page_content=d.page_content, metadata=row_store.hydrate(d.metadata)
+            )
+            for d in documents
+        ]
+
+    def get_lexical_index(self) -> LexicalIndex:
+        """Load (or build) the BM25 index that belongs to the current store"""
+        with self._state_lock:
+            if (
+                self.lexical_index is None
+                or self._lexical_index_store is not self.vector_store
+            ):
+                if LexicalIndex.exists(self.config.vector_store_path):
+                    self.lexical_index = LexicalIndex.load(
+                        self.config.vector_store_path
+                    )
+                else:
+                    self.lexical_index = LexicalIndex.from_vector_store(
+                        self.vector_store
+                    )
+                self._lexical_index_store = self.vector_store
+            return self.lexical_index
+
+    def _rebuild_lexical_index(self):
+        """Index the current store for BM25 and persist it next to the FAISS files"""
+        self.lexical_index = LexicalIndex.from_vector_store(self.vector_store)
+        self._lexical_index_store = self.vector_store
+        self.lexical_index.save(self.config.vector_store_path)
+
+    def _vector_search_ids(
+        self, query: str, k: int, filter: Dict[str, Any] = None
+    ) -> List[str]:
+        """Similarity search returning docstore ids, optionally pre-filtered"""
+        bitmap = None
+        if filter:
+            with self.metrics.span("metadata_filter"):
+                bitmap, num_matches = self.get_metadata_index().select(filter)
+            if num_matches == 0:
+                return []
+            k = min(k, num_matches)
+
+        vector = np.asarray([self._embed_query(query)], dtype=np.float32)
+        with self.metrics.span("vector_search"):
+            positions = self._index_search(vector, k, filter, bitmap)
+
+        return [
+            self.vector_store.index_to_docstore_id[int(i)]
+            for i in positions[0]
+            if i != -1
+        ]
+
+    def _index_search(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        filter: Dict[str, Any] = None,
+        bitmap: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Index positions of the k nearest chunks
+
+        Searches the shards when the store is sharded, lets FAISS skip
+        positions outside the filter bitmap and rescores exactly if enabled.
+        """
+        from ann_index import filtered_search
+
+        index = self.vector_store.index
+        k = min(k, index.ntotal)
+        rescorer = self.get_rescorer()
+        fetch = k * self.config.rescore_factor if rescorer is not None else k
+        shards = self.get_shards()
+
+        if shards is not None:
+            _, positions = shards.search(
+                vectors,
+                min(fetch, index.ntotal),
+                filter,
+                bitmap,
+                self._get_shard_executor(),
+                nprobe=self.config.nprobe,
+                ef_search=self.config.ef_search,
+            )
+        elif bitmap is not None:
+            _, positions = filtered_search(
+                index,
+                vectors,
+                min(fetch, index.ntotal),
+                bitmap,
+                self.config.nprobe,
+                self.config.ef_search,
+            )
+        else:
+            _, positions = index.search(vectors, min(fetch, index.ntotal))
+
+        if rescorer is not None:
+            positions = rescorer.rescore(vectors, positions, k)[1]
+        return positions
+
+    def get_shards(self) -> Optional[ShardedIndex]:
+        """Shard indexes written for the current store (None when not sharded)"""
+        if not self.config.shard_by:
+            return None
+        with self._state_lock:
+            if self._shards_store is not self.vector_store:
+                from sharded_index import ShardedIndex
+
+                self.shards = None
+                path = self.config.vector_store_path
+                if ShardedIndex.exists(path):
+                    shards = ShardedIndex.load(path)
+                    if shards.total == self.vector_store.index.ntotal:
+                        self.shards = shards
+                    else:
+                        print("Shards do not match the index - searching it unsharded")
+                self._shards_store = self.vector_store
+            return self.shards
+
+    def _get_shard_executor(self):
+        """Process pool for scatter-gather search, started on first use"""
+        with self._state_lock:
+            shards = self.get_shards()
+            if shards is None or self.config.shard_workers == 0:
+                return None
+            if self._shard_executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                from sharded_index import open_shards
+
+                workers = self.config.shard_workers or min(
+                    len(shards.shards), os.cpu_count() or 1
+                )
+                # spawn - forking a process that runs threads is unsafe
+                self._shard_executor = ProcessPoolExecutor(
+                    workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=open_shards,
+                    initargs=(
+                        shards.paths(),
+                        shards.version,
+                        self.config.nprobe,
+                        self.config.ef_search,
+                    ),
+                )
+            return self._shard_executor
+
+    def close(self):
+        """Stop the shard search workers (they start again on next use)"""
+        with self._state_lock:
+            executor, self._shard_executor = self._shard_executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    def _build_shard_index(self, vectors: np.ndarray):
+        """Index for one shard, built with the same settings as the main index"""
+        from ann_index import build_faiss_index, set_search_params
+
+        index = build_faiss_index(
+            vectors,
+            index_type=self.config.index_type,
+            ivf_nlist=self.config.ivf_nlist,
+            pq_m=self.config.pq_m,
+            pq_nbits=self.config.pq_nbits,
+            hnsw_m=self.config.hnsw_m,
+            hnsw_ef_construction=self.config.hnsw_ef_construction,
+            train_size=self.config.index_train_size,
+            storage=self.config.vector_storage,
+        )
+        for start in range(0, len(vectors), self.config.index_add_batch):
+            batch = vectors[start : start + self.config.index_add_batch]
+            index.add(np.ascontiguousarray(batch))
+        set_search_params(index, self.config.nprobe, self.config.ef_search)
+        return index
+
+    def get_rescorer(self) -> Optional[ExactRescorer]:
+        """Exact-vector rescorer for the current store (None when disabled)"""
+        if not self.config.rescore_factor:
+            return None
+        with self._state_lock:
+            if self._rescorer_store is not self.vector_store:
+                from rescorer import ExactRescorer
+
+                self.rescorer = None
+                path = self.config.vector_store_path
+                index = self.vector_store.index
+                if ExactRescorer.exists(path):
+                    rescorer = ExactRescorer.load(path, index.d)
+                    if len(rescorer) == index.ntotal:
+                        self.rescorer = rescorer
+                    else:
+                        print(
+                            f"{ExactRescorer.FILE_NAME} does not match the index - "
+                            "rescoring is off until the next full ingest"
+                        )
+                self._rescorer_store = self.vector_store
+            return self.rescorer
+
+    def _hybrid_search_ids(
+        self, query: str, k: int, filter: Dict[str, Any] = None
+    ) -> List[str]:
+        """Run BM25 and vector retrieval and fuse them with reciprocal rank fusion"""
+        fetch_k = max(k, self.config.hybrid_fetch_k)
+        vector_ids = self._vector_search_ids(query, fetch_k, filter)
+
+        with self.metrics.span("lexical_search"):
+            lexical_ids = [
+                doc_id for doc_id, _ in self.get_lexical_index().search(query, fetch_k)
+            ]
+        if filter:
+            bitmap, _ = self.get_metadata_index().select(filter)
+            allowed = np.unpackbits(bitmap, bitorder="little")
+            positions = self._get_docstore_positions()
+            lexical_ids = [
+                doc_id
+                for doc_id in lexical_ids
+                if doc_id in positions and allowed[positions[doc_id]]
+            ]
+
+        fused = reciprocal_rank_fusion([vector_ids, lexical_ids], self.config.rrf_k)
+        return fused[:k]
+
+    def _embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing the vector if the same text was embedded recently"""
+        with self._query_embeddings_lock:
+            vector = self._query_embeddings.get(text)
+        if vector is None:
+            self.metrics.inc(
+                "cache_lookups_total", cache="query_embedding", result="miss"
+            )
+            with self.metrics.span("embed_query"):
+                vector = self.embeddings.embed_query(text)
+            self._remember_query_embedding(text, vector)
+        else:
+            self.metrics.inc(
+                "cache_lookups_total", cache="query_embedding", result="hit"
+            )
+        return vector
+
+    def _remember_query_embedding(self, text: str, vector: List[float]):
+        with self._query_embeddings_lock:
+            self._query_embeddings[text] = vector
+            self._query_embeddings.move_to_end(text)
+            while len(self._query_embeddings) > self.QUERY_EMBEDDING_MEMO_SIZE:
+                self._query_embeddings.popitem(last=False)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries with one batched embedding call"""
+        # Copy out the hits - other threads may evict them meanwhile
+        with self._query_embeddings_lock:
+            found = {
+                t: self._query_embeddings[t]
+                for t in texts
+                if t in self._query_embeddings
+            }
+        missing = list(dict.fromkeys(t for t in texts if t not in found))
+        if missing:
+            # Queries are never cached on disk - go straight to the provider
+            embeddings = getattr(self.embeddings, "embeddings", self.embeddings)
+            with self.metrics.span("embed_query", batch=len(missing)):
+                if _is_google_embeddings(embeddings):
+                    vectors = embeddings.embed_documents(
+                        missing, task_type="RETRIEVAL_QUERY"
+                    )
+                else:
+                    vectors = embeddings.embed_documents(missing)
+            for text, vector in zip(missing, vectors):
+                self._remember_query_embedding(text, vector)
+                found[text] = vector
+        return [found[t] for t in texts]
+
+    def _invalidate_answer_cache(self):
+        """Cached answers refer to the old index - drop them"""
+        if self.answer_cache is not None:
+            self.answer_cache.clear()
+
+    def _docs_for_ids(self, doc_ids: List[str]) -> List[Document]:
+        return [self.vector_store.docstore.search(doc_id) for doc_id in doc_ids]
 
     def format_context(self, documents: List[Document]) -> str:
         """Format retrieved documents as context"""
+        return self.build_context(documents)[0]
+
+    def build_context(self, documents: List[Document]) -> Tuple[str, Dict[str, Any]]:
+        """Format retrieved documents as context and report its token usage
+
+        With config.pack_context, chunks of the same product are merged
+        (overlap removed), ordered by rank and packed into
+        config.context_token_budget tokens.
+        """
+        with self.metrics.span("format_context", chunks=len(documents)) as span:
+            context, stats = self._build_context(documents)
+            span.set(context_tokens=stats["context_tokens"])
+        self.metrics.inc("tokens_total", stats["context_tokens"], kind="context")
+        self.metrics.inc("tokens_total", stats["tokens_saved"], kind="saved")
+        return context, stats
+
+    def _build_context(self, documents: List[Document]) -> Tuple[str, Dict[str, Any]]:
+        from context_builder import build_context, count_tokens
+
+        if self.config.pack_context:
+            return build_context(
+                documents,
+                token_budget=self.config.context_token_budget,
+                separator=self.config.separator,
+            )
+
         context_parts = []
         for i, doc in enumerate(documents, 1):
             context_parts.append(f"Text: {doc.page_content}")
 
-        return "\n".join(context_parts)
+        context = "\n".join(context_parts)
+        tokens = count_tokens(context) if context else 0
+        return context, {
+            "chunks": len(documents),
+            "raw_tokens": tokens,
+            "context_tokens": tokens,
+            "tokens_saved": 0,
+        }
 
     def query(
-        self, question: str, model: str = None, verbose: bool = False
+        self,
+        question: str,
+        model: str = None,
+        verbose: bool = False,
+        filter: Dict[str, Any] = None,
     ) -> Dict[str, Any]:
         """
         Main query method - searches for relevant documents and generates answer
@@ -350,58 +1963,506 @@ Answer: """,
             question: User's question
             model: Model to use (shorthand like 'gpt-4o' or full like 'openai/gpt-4o')
             verbose: Whether to print intermediate steps
+            filter: Optional metadata filter passed to search()
 
         Returns:
             Dictionary with answer and metadata
         """
-        # Search for relevant documents
-        if verbose:
-            print(f"Searching for relevant documents for: {question}")
+        with self.metrics.trace("query", question=question) as trace:
+            try:
+                result = self._query(question, model, verbose, filter)
+            except Exception:
+                self.metrics.inc("queries_total", entry="query", outcome="error")
+                raise
+            self._record_query(trace, "query", result)
+        return result
+
+    def _query(
+        self,
+        question: str,
+        model: Optional[str],
+        verbose: bool,
+        filter: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        routed = model is None and self.config.routing_enabled
+        if not routed:
+            model = model or self.current_model
+
+        # Answers are cached per model (and per filter)
+        cache_scope = self._answer_cache_scope(model, filter)
+        cached, query_vector = self._lookup_answer_cache(question, cache_scope, verbose)
+        if cached is not None:
+            return cached
+
+        retrieved_docs, prompt, context_stats = self._retrieve_and_prompt(
+            question, filter, verbose
+        )
+
+        candidates, hedge_delay = self._candidate_models(model)
+
+        try:
+            if verbose:
+                print(f"Using model: {candidates[0]}")
+
+            # Generate answer (timed per model; may hedge to a backup model)
+            with self.metrics.span("llm") as span:
+                model, response, hedged = self.model_router.invoke(
+                    candidates,
+                    lambda name: self.get_llm(name).invoke(prompt),
+                    hedge_delay,
+                )
+                span.set(model=model, hedged=hedged)
+            self._record_usage(response)
+
+            # Extract answer text
+            if hasattr(response, "content"):
+                answer = response.content
+            else:
+                answer = str(response)
+
+            result = self._build_result(
+                question, answer, retrieved_docs, model, context_stats
+            )
+            if routed:
+                result["hedged"] = hedged
 
-        retrieved_docs = self.search(question)
+            if self.answer_cache is not None:
+                self.answer_cache.put(cache_scope, question, result, query_vector)
 
+            return result
+
+        except Exception as e:
+            print(f"Error with model {model or candidates[0]}: {e}")
+            raise
+
+    def query_stream(
+        self,
+        question: str,
+        model: str = None,
+        verbose: bool = False,
+        filter: Dict[str, Any] = None,
+    ) -> "StreamedAnswer":
+        """
+        Streaming variant of query() - yields answer tokens as they arrive
+
+        Iterate over the returned StreamedAnswer to receive tokens; once the
+        stream ends its `result` holds the same dictionary query() returns,
+        plus `time_to_first_token` and `latency` (seconds).
+        """
+        start = time.perf_counter()
+        # The trace covers retrieval and prompt building; the streamed LLM
+        # call is only recorded in the "llm" histogram
+        with self.metrics.trace("query_stream", question=question) as trace:
+            try:
+                stream = self._query_stream(question, model, verbose, filter, start)
+            except Exception:
+                self.metrics.inc("queries_total", entry="query_stream", outcome="error")
+                raise
+            self._record_query(trace, "query_stream", stream._result)
+        return stream
+
+    def _query_stream(
+        self,
+        question: str,
+        model: Optional[str],
+        verbose: bool,
+        filter: Optional[Dict[str, Any]],
+        start: float,
+    ) -> "StreamedAnswer":
+        if not (model is None and self.config.routing_enabled):
+            model = model or self.current_model
+
+        cache_scope = self._answer_cache_scope(model, filter)
+        cached, query_vector = self._lookup_answer_cache(question, cache_scope, verbose)
+        if cached is not None:
+            return StreamedAnswer(iter([cached["answer"]]), cached, start)
+
+        retrieved_docs, prompt, context_stats = self._retrieve_and_prompt(
+            question, filter, verbose
+        )
+
+        # Streams are routed but not hedged
+        model = self._candidate_models(model)[0][0]
+        llm = self.get_llm(model)
         if verbose:
-            print(f"Found {len(retrieved_docs)} relevant documents")
+            print(f"Using model: {model}")
+
+        result = self._build_result(question, "", retrieved_docs, model, context_stats)
+
+        def on_complete(final: Dict[str, Any]):
+            if self.answer_cache is not None:
+                cached_result = {
+                    k: v
+                    for k, v in final.items()
+                    if k not in ("time_to_first_token", "latency")
+                }
+                self.answer_cache.put(
+                    cache_scope, question, cached_result, query_vector
+                )
 
-        # Format context
-        context = self.format_context(retrieved_docs)
+        def tokens():
+            llm_start = time.perf_counter()
+            try:
+                for chunk in llm.stream(prompt):
+                    yield chunk.content if hasattr(chunk, "content") else str(chunk)
+            except Exception:
+                self.model_router.record(model, time.perf_counter() - llm_start, False)
+                raise
+            elapsed = time.perf_counter() - llm_start
+            self.model_router.record(model, elapsed, True)
+            self.metrics.observe("llm", elapsed, llm_start, model=model)
+
+        return StreamedAnswer(tokens(), result, start, on_complete)
+
+    async def aquery(
+        self, question: str, model: str = None, filter: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Async variant of query()"""
+        with self.metrics.trace("aquery", question=question) as trace:
+            try:
+                result = await self._aquery(question, model, filter)
+            except Exception:
+                self.metrics.inc("queries_total", entry="aquery", outcome="error")
+                raise
+            self._record_query(trace, "aquery", result)
+        return result
+
+    async def _aquery(
+        self,
+        question: str,
+        model: Optional[str],
+        filter: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        if not (model is None and self.config.routing_enabled):
+            model = model or self.current_model
+        cache_scope = self._answer_cache_scope(model, filter)
+        cached, query_vector = await asyncio.to_thread(
+            self._lookup_answer_cache, question, cache_scope
+        )
+        if cached is not None:
+            return cached
 
-        # Get LLM
-        model = model or self.current_model
+        retrieved_docs, prompt, context_stats = await asyncio.to_thread(
+            self._retrieve_and_prompt, question, filter
+        )
+        return await self._agenerate(
+            question,
+            model,
+            retrieved_docs,
+            prompt,
+            context_stats,
+            cache_scope,
+            query_vector,
+        )
+
+    def query_batch(
+        self,
+        questions: List[str],
+        concurrency: int = 8,
+        model: str = None,
+        filter: Dict[str, Any] = None,
+    ) -> List[Dict[str, Any]]:
+        """Answer many questions; see aquery_batch()"""
+        return asyncio.run(self.aquery_batch(questions, concurrency, model, filter))
+
+    async def aquery_batch(
+        self,
+        questions: List[str],
+        concurrency: int = 8,
+        model: str = None,
+        filter: Dict[str, Any] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer many questions with shared retrieval and concurrent LLM calls
+
+        All questions are embedded in one batched call and retrieved with a
+        single multi-query search; LLM calls then run `concurrency` at a time
+        (and at most config.llm_concurrency_per_model per model).
+
+        Returns:
+            One entry per question, in input order. Failed items are
+            {"question", "model", "error"} instead of a result dict.
+        """
+        try:
+            results = await self._aquery_batch(questions, concurrency, model, filter)
+        except Exception:
+            self.metrics.inc(
+                "queries_total", len(questions), entry="aquery_batch", outcome="error"
+            )
+            raise
+        for result in results:
+            if "error" in result:
+                outcome = "error"
+            else:
+                outcome = "cached" if result.get("cached") else "answered"
+            self.metrics.inc("queries_total", entry="aquery_batch", outcome=outcome)
+        return results
+
+    async def _aquery_batch(
+        self,
+        questions: List[str],
+        concurrency: int,
+        model: str,
+        filter: Optional[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        if not (model is None and self.config.routing_enabled):
+            model = model or self.current_model
+        cache_scope = self._answer_cache_scope(model, filter)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+
+        # Exact cache hits need no embedding at all
+        pending = []
+        for i, question in enumerate(questions):
+            cached = None
+            if self.answer_cache is not None:
+                cached = self.answer_cache.get_exact(cache_scope, question)
+            if cached is not None:
+                results[i] = {**cached, "question": question, "cached": "exact"}
+                self.metrics.inc("cache_lookups_total", cache="answer", result="exact")
+            else:
+                pending.append(i)
+
+        # One embedding call for every remaining question
+        vectors = await asyncio.to_thread(
+            self.embed_queries, [questions[i] for i in pending]
+        )
+        query_vectors = dict(zip(pending, vectors))
+        if self.answer_cache is not None:
+            still_pending = []
+            for i in pending:
+                similar = self.answer_cache.get_similar(
+                    cache_scope, questions[i], query_vectors[i]
+                )
+                if similar is not None:
+                    results[i] = {
+                        **similar[0],
+                        "question": questions[i],
+                        "cached": "semantic",
+                    }
+                    result = "semantic"
+                else:
+                    still_pending.append(i)
+                    result = "miss"
+                self.metrics.inc("cache_lookups_total", cache="answer", result=result)
+            pending = still_pending
+
+        if not pending:
+            return results
 
         if not self.config.openrouter_api_key:
             raise ValueError(
                 "No OpenRouter API key available. Please set OPENROUTER_API_KEY"
             )
 
-        try:
-            llm = self.get_llm(model)
+        # Shared retrieval for the whole batch
+        fetch_k = self.config.rerank_fetch_k if self.reranker is not None else None
+        docs_per_question = await asyncio.to_thread(
+            self.search_batch, [questions[i] for i in pending], fetch_k, filter
+        )
+        if self.reranker is not None:
+            docs_per_question = await asyncio.to_thread(
+                lambda: [
+                    self.rerank(questions[i], docs)
+                    for i, docs in zip(pending, docs_per_question)
+                ]
+            )
 
-            if verbose:
-                print(f"Using model: {model}")
+        semaphore = asyncio.Semaphore(concurrency)
 
-            # Generate answer
-            prompt = self.prompt_template.format(context=context, question=question)
+        async def answer(i: int, retrieved_docs: List[Document]):
+            question = questions[i]
+            try:
+                context, context_stats = self.build_context(retrieved_docs)
+                prompt = self.prompt_template.format(context=context, question=question)
+                async with semaphore:
+                    results[i] = await self._agenerate(
+                        question,
+                        model,
+                        retrieved_docs,
+                        prompt,
+                        context_stats,
+                        cache_scope,
+                        query_vectors[i],
+                    )
+            except Exception as e:
+                results[i] = {"question": question, "model": model, "error": str(e)}
 
-            response = llm.invoke(prompt)
+        await asyncio.gather(
+            *(answer(i, docs) for i, docs in zip(pending, docs_per_question))
+        )
+        return results
 
-            # Extract answer text
-            if hasattr(response, "content"):
-                answer = response.content
-            else:
-                answer = str(response)
+    async def _agenerate(
+        self,
+        question: str,
+        model: str,
+        retrieved_docs: List[Document],
+        prompt: str,
+        context_stats: Dict[str, Any],
+        cache_scope,
+        query_vector: Optional[List[float]],
+    ) -> Dict[str, Any]:
+        """Call the LLM asynchronously under the per-model concurrency limit
 
-            return {
-                "question": question,
-                "answer": answer,
-                "sources": retrieved_docs,
-                "model": model,
-                "num_sources": len(retrieved_docs),
-            }
+        A model of None means routed: the tier's best model is used and,
+        with hedging on, a backup is started if it is slow.
+        """
 
-        except Exception as e:
-            print(f"Error with model {model}: {e}")
-            raise
+        async def generate(name: str):
+            llm = self.get_llm(name)
+            async with self._llm_semaphore(name):
+                return await llm.ainvoke(prompt)
+
+        routed = model is None
+        candidates, hedge_delay = self._candidate_models(model)
+        with self.metrics.span("llm") as span:
+            model, response, hedged = await self.model_router.ainvoke(
+                candidates, generate, hedge_delay
+            )
+            span.set(model=model, hedged=hedged)
+        self._record_usage(response)
+
+        answer = response.content if hasattr(response, "content") else str(response)
+        result = self._build_result(
+            question, answer, retrieved_docs, model, context_stats
+        )
+        if routed:
+            result["hedged"] = hedged
+        if self.answer_cache is not None:
+            self.answer_cache.put(cache_scope, question, result, query_vector)
+        return result
+
+    def _llm_semaphore(self, model: str) -> asyncio.Semaphore:
+        """Per-model concurrency limit, scoped to the running event loop"""
+        loop = asyncio.get_running_loop()
+        entry = self._llm_semaphores.get(model)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Semaphore(self.config.llm_concurrency_per_model))
+            self._llm_semaphores[model] = entry
+        return entry[1]
+
+    def _answer_cache_scope(self, model: Optional[str], filter: Dict[str, Any] = None):
+        """Cache scope: resolved model name (or routing tier) plus the filter"""
+        if model is None:
+            model = f"tier:{self.config.routing_tier}"
+        return (
+            self.config.openrouter_models.get(model, model),
+            json.dumps(filter, sort_keys=True, default=str) if filter else None,
+        )
+
+    def _lookup_answer_cache(self, question: str, cache_scope, verbose: bool = False):
+        """Return (cached result or None, question embedding used for the lookup)"""
+        if self.answer_cache is None:
+            return None, None
+
+        with self.metrics.span("answer_cache") as span:
+            cached = self.answer_cache.get_exact(cache_scope, question)
+            if cached is not None:
+                if verbose:
+                    print("Answer cache hit (exact match)")
+                self._record_cache_lookup(span, "exact")
+                return {**cached, "question": question, "cached": "exact"}, None
+
+            query_vector = self._embed_query(question)
+            similar = self.answer_cache.get_similar(cache_scope, question, query_vector)
+            if similar is not None:
+                if verbose:
+                    print(f"Answer cache hit (similarity {similar[1]:.3f})")
+                self._record_cache_lookup(span, "semantic")
+                return {**similar[0], "question": question, "cached": "semantic"}, None
+
+            self._record_cache_lookup(span, "miss")
+            return None, query_vector
+
+    def _record_cache_lookup(self, span, result: str):
+        span.set(result=result)
+        self.metrics.inc("cache_lookups_total", cache="answer", result=result)
+
+    def _record_usage(self, response):
+        """Count prompt/completion tokens reported by the provider, if any"""
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            self.metrics.inc(
+                "tokens_total", usage.get("input_tokens", 0), kind="prompt"
+            )
+            self.metrics.inc(
+                "tokens_total", usage.get("output_tokens", 0), kind="completion"
+            )
+
+    def _record_query(self, trace, entry: str, result: Dict[str, Any]):
+        """Count a finished query and attach its outcome to the trace"""
+        if not self.metrics.enabled:
+            return
+        cached = result.get("cached")
+        self.metrics.inc(
+            "queries_total", entry=entry, outcome="cached" if cached else "answered"
+        )
+        trace.set(
+            model=result["model"],
+            cached=cached,
+            num_sources=result["num_sources"],
+            context_tokens=result["context_tokens"],
+        )
+
+    def export_metrics(self, path: str = None) -> str:
+        """Metrics in the Prometheus text format, optionally written to path
+
+        Empty unless config.metrics_enabled is set.
+        """
+        text = self.metrics.to_prometheus()
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def _retrieve_and_prompt(
+        self, question: str, filter: Dict[str, Any] = None, verbose: bool = False
+    ):
+        """Search for relevant documents and build the LLM prompt"""
+        # Search for relevant documents
+        if verbose:
+            print(f"Searching for relevant documents for: {question}")
+
+        retrieved_docs = self.retrieve(question, filter=filter, verbose=verbose)
+
+        if verbose:
+            print(f"Found {len(retrieved_docs)} relevant documents")
+
+        # Format context
+        context, context_stats = self.build_context(retrieved_docs)
+
+        if verbose:
+            print(
+                f"Context: {context_stats['context_tokens']} tokens "
+                f"({context_stats['tokens_saved']} saved by packing)"
+            )
+
+        if not self.config.openrouter_api_key:
+            raise ValueError(
+                "No OpenRouter API key available. Please set OPENROUTER_API_KEY"
+            )
+
+        prompt = self.prompt_template.format(context=context, question=question)
+        return retrieved_docs, prompt, context_stats
+
+    @staticmethod
+    def _build_result(
+        question: str,
+        answer: str,
+        retrieved_docs: List[Document],
+        model: str,
+        context_stats: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Result dictionary shared by all query entry points"""
+        return {
+            "question": question,
+            "answer": answer,
+            "sources": retrieved_docs,
+            "model": model,
+            "num_sources": len(retrieved_docs),
+            "context_tokens": context_stats["context_tokens"],
+            "tokens_saved": context_stats["tokens_saved"],
+        }
 
     def chat(self):
         """Interactive chat interface"""
@@ -422,6 +2483,7 @@ Answer: """,
                     print("  quit - Exit the chat")
                     print("  help - Show this help message")
                     print("  models - List available models")
+                    print("  stats - Show latency and error rate per model")
                     print("  model:<name> - Switch model (e.g., model:gpt-4o)")
 
                     # Group models by provider for the help display
@@ -524,6 +2586,21 @@ Answer: """,
                     print()
                     continue
 
+                elif user_input.lower() == "stats":
+                    stats = self.model_stats()
+                    if not stats:
+                        print("No model calls recorded yet\n")
+                    for name, s in stats.items():
+                        p50 = "-" if s["p50"] is None else f"{s['p50']:.2f}s"
+                        p95 = "-" if s["p95"] is None else f"{s['p95']:.2f}s"
+                        print(
+                            f"  {name}: p50 {p50}, p95 {p95}, "
+                            f"errors {s['error_rate']:.0%} of {s['samples']}"
+                            f"{'' if s['healthy'] else ' (unhealthy)'}"
+                        )
+                    print()
+                    continue
+
                 elif user_input.lower().startswith("model:"):
                     model_name = user_input.split(":", 1)[1].strip()
 
@@ -539,15 +2616,26 @@ Answer: """,
                         print("Use 'models' command to see available models\n")
                     continue
 
-                # Process the query
-                result = self.query(
+                # Process the query, printing the answer as it streams in
+                stream = self.query_stream(
                     question=user_input, model=self.current_model, verbose=False
                 )
 
                 print(
-                    f"\nAssistant ({result['model'].split('/')[-1]}): {result['answer']}"
+                    f"\nAssistant ({self.current_model.split('/')[-1]}): ",
+                    end="",
+                    flush=True,
+                )
+                for token in stream:
+                    print(token, end="", flush=True)
+                print()
+
+                result = stream.result
+                print(
+                    f"(Based on {result['num_sources']} sources, "
+                    f"first token {result['time_to_first_token']:.2f}s, "
+                    f"total {result['latency']:.2f}s)\n"
                 )
-                print(f"(Based on {result['num_sources']} sources)\n")
 
             except KeyboardInterrupt:
                 print("\nGoodbye!")
@@ -574,7 +2662,7 @@ OPENROUTER_API_KEY=your_openrouter_api_key_here
     return True
 
 
-def create_sample_csv():
+def create_sample_csv(path: str = "myntra_sample_catalog.csv"):
     """Create a sample CSV file for testing"""
     sample_data = {
         "product_id": [
@@ -653,9 +2741,11 @@ def create_sample_csv():
         "in_stock": [True, True, False, True, True, False, True, True],
     }
 
+    import pandas as pd
+
     df = pd.DataFrame(sample_data)
-    df.to_csv("myntra_sample_catalog.csv", index=False)
-    print("Sample CSV file created: myntra_sample_catalog.csv")
+    df.to_csv(path, index=False)
+    print(f"Sample CSV file created: {path}")
 
 
 def test_openrouter_connection():
@@ -670,6 +2760,8 @@ def test_openrouter_connection():
         return False
 
     try:
+        from langchain_openai import ChatOpenAI
+
         # Test with a simple model
         llm = ChatOpenAI(
             model="openai/gpt-3.5-turbo",
@@ -764,5 +2856,108 @@ def main():
     rag.chat()
 
 
+def build_parser() -> argparse.ArgumentParser:
+    """Command line interface; parsing it imports nothing heavy"""
+    parser = argparse.ArgumentParser(
+        description="Myntra product search and Q&A over a FAISS index. "
+        "Run without a command for the guided demo."
+    )
+    parser.add_argument("--csv", default=Config.csv_file_path, help="Catalog CSV")
+    parser.add_argument(
+        "--store", default=Config.vector_store_path, help="Vector store directory"
+    )
+    parser.add_argument(
+        "--embeddings",
+        choices=sorted(DEFAULT_EMBEDDING_MODELS),
+        default=Config.embedding_provider,
+        help="Embedding provider (must match the one that built the store)",
+    )
+    parser.add_argument("--embedding-model", help="Embedding model name or path")
+    commands = parser.add_subparsers(dest="command")
+
+    ingest = commands.add_parser("ingest", help="Build or update the vector store")
+    ingest.add_argument(
+        "--incremental", action="store_true", help="Re-embed only changed products"
+    )
+
+    for name, text in (("query", "Answer a question"), ("search", "Find products")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument("question")
+        command.add_argument("--filter", help='JSON filter, e.g. {"brand": "Nike"}')
+        command.add_argument(
+            "--lazy", action="store_true", help="Memory-map the stored index"
+        )
+        if name == "query":
+            command.add_argument("--model", help="Model shorthand or full name")
+        else:
+            command.add_argument("-k", type=int, default=Config.num_results)
+
+    chat = commands.add_parser("chat", help="Interactive chat")
+    chat.add_argument("--model", help="Model shorthand or full name")
+    chat.add_argument("--lazy", action="store_true", help="Memory-map the stored index")
+
+    serve = commands.add_parser("serve", help="Run the HTTP query service")
+    serve.add_argument("--host", default=Config.serve_host)
+    serve.add_argument("--port", type=int, default=Config.serve_port)
+    serve.add_argument("--model", help="Default model shorthand or full name")
+    serve.add_argument("--max-concurrency", type=int, default=None)
+    serve.add_argument("--max-queue", type=int, default=None)
+    serve.add_argument(
+        "--lazy", action="store_true", help="Memory-map the stored index"
+    )
+    serve.add_argument(
+        "--metrics", action="store_true", help="Record metrics for GET /metrics"
+    )
+    return parser
+
+
+def cli(argv: List[str] = None):
+    """Entry point: dispatch a subcommand, or run main() when none is given"""
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        return main()
+
+    config = Config(
+        csv_file_path=args.csv,
+        vector_store_path=args.store,
+        embedding_provider=args.embeddings,
+        embedding_model=args.embedding_model,
+        lazy_load=getattr(args, "lazy", False),
+        metrics_enabled=getattr(args, "metrics", False),
+    )
+    rag = MyntraRAG(config)
+    model = getattr(args, "model", None)
+    if model:
+        rag.current_model = config.openrouter_models.get(model, model)
+
+    if args.command == "ingest":
+        rag.ingest_data(incremental=args.incremental)
+    elif args.command == "search":
+        filter = json.loads(args.filter) if args.filter else None
+        for i, doc in enumerate(rag.search(args.question, k=args.k, filter=filter), 1):
+            print(f"[{i}] {doc.page_content}\n")
+    elif args.command == "query":
+        filter = json.loads(args.filter) if args.filter else None
+        stream = rag.query_stream(args.question, filter=filter)
+        for token in stream:
+            print(token, end="", flush=True)
+        print(
+            f"\n\n(model {stream.result['model']}, "
+            f"{stream.result['num_sources']} sources)"
+        )
+    elif args.command == "chat":
+        rag.chat()
+    elif args.command == "serve":
+        from rag_server import RAGServer
+
+        RAGServer(
+            rag,
+            host=args.host,
+            port=args.port,
+            max_concurrency=args.max_concurrency,
+            max_queue=args.max_queue,
+        ).run()
+
+
 if __name__ == "__main__":
-    main()
+    cli()
@@ -0,0 +1,304 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+import faiss
+import numpy as np
+from langchain.schema import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+from ann_index import read_index_mmap
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+DOCSTORE_DIR = "docstore"
+COLUMNS = ("ids", "content", "metadata")
+# Positions sorted by document id, for id lookups without loading the ids
+ID_ORDER_FILE = "ids.order.npy"
+
+
+def _json_default(value: Any):
+    """Serialize numpy scalars found in row metadata"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _save_npy(path: Path, array: np.ndarray):
+    with open(path, "wb") as f:
+        np.save(f, array, allow_pickle=False)
+
+
+def file_checksum(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_entries(path: Path, names: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """Size and SHA-256 of the named files; directories contribute every file"""
+    files = []
+    for name in names:
+        target = path / name
+        if target.is_dir():
+            files += sorted(
+                p.relative_to(path).as_posix() for p in target.rglob("*") if p.is_file()
+            )
+        elif target.exists():
+            files.append(name)
+    return {
+        name: {
+            "bytes": (path / name).stat().st_size,
+            "sha256": file_checksum(path / name),
+        }
+        for name in files
+    }
+
+
+def _write_manifest(path: Path, manifest: Dict[str, Any]):
+    tmp_manifest = path / f"{MANIFEST_FILE}.tmp"
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, path / MANIFEST_FILE)
+
+
+class StringColumn:
+    """UTF-8 strings stored as one byte buffer plus offsets (the Arrow layout)
+
+    Both arrays are plain .npy files, so a column is memory-mapped instead
+    of read, and a string is only decoded when it is accessed.
+    """
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings: Sequence[str]) -> "StringColumn":
+        """Encode strings into an in-memory column"""
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    @staticmethod
+    def write(directory: Path, name: str, strings: Sequence[str]):
+        StringColumn.from_strings(strings).save(directory, name)
+
+    def save(self, directory: Path, name: str):
+        _save_npy(directory / f"{name}.offsets.npy", np.asarray(self.offsets))
+        _save_npy(directory / f"{name}.data.npy", np.asarray(self.data))
+
+    @classmethod
+    def load(cls, directory: Path, name: str, mmap: bool = True) -> "StringColumn":
+        mode = "r" if mmap else None
+        return cls(
+            np.load(directory / f"{name}.offsets.npy", mmap_mode=mode),
+            np.load(directory / f"{name}.data.npy", mmap_mode=mode),
+        )
+
+    def __getitem__(self, i: int) -> str:
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.data[start:end].tobytes().decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def to_list(self) -> List[str]:
+        """Decode every string (one pass over the buffer)"""
+        buffer = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        return [
+            buffer[start:end].decode("utf-8")
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+
+
+def save_store(vector_store, directory: str, extra_files: Sequence[str] = ()):
+    """Write a FAISS store's index and docstore without pickle, plus a manifest
+
+    The docstore columns are built in a temporary directory and swapped in,
+    the index is replaced atomically, and the manifest - listing the size
+    and SHA-256 of every file, including extra_files already in directory -
+    is written last, so a save interrupted halfway fails verification
+    instead of loading mismatched files. Returns the manifest.
+    """
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    ntotal = vector_store.index.ntotal
+    if len(vector_store.index_to_docstore_id) != ntotal:
+        raise ValueError("Index and docstore id map have different sizes")
+
+    ids, contents, metadatas = [], [], []
+    for pos in range(ntotal):
+        doc_id = vector_store.index_to_docstore_id[pos]
+        doc = vector_store.docstore.search(doc_id)
+        ids.append(doc_id)
+        contents.append(doc.page_content)
+        metadatas.append(json.dumps(doc.metadata, default=_json_default))
+
+    tmp_docstore = path / f"{DOCSTORE_DIR}.tmp"
+    shutil.rmtree(tmp_docstore, ignore_errors=True)
+    tmp_docstore.mkdir()
+    for name, strings in zip(COLUMNS, (ids, contents, metadatas)):
+        StringColumn.write(tmp_docstore, name, strings)
+    order = sorted(range(ntotal), key=ids.__getitem__)
+    _save_npy(tmp_docstore / ID_ORDER_FILE, np.asarray(order, dtype=np.int64))
+
+    faiss.write_index(vector_store.index, str(path / f"{INDEX_FILE}.tmp"))
+    shutil.rmtree(path / DOCSTORE_DIR, ignore_errors=True)
+    os.replace(tmp_docstore, path / DOCSTORE_DIR)
+    os.replace(path / f"{INDEX_FILE}.tmp", path / INDEX_FILE)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": uuid.uuid4().hex,
+        "created": time.time(),
+        "count": ntotal,
+        "dim": vector_store.index.d,
+        "files": _file_entries(path, [INDEX_FILE, DOCSTORE_DIR, *extra_files]),
+    }
+    _write_manifest(path, manifest)
+    return manifest
+
+
+def exists(directory: str) -> bool:
+    return (Path(directory) / MANIFEST_FILE).exists()
+
+
+def read_manifest(directory: str, verify_checksums: bool = True) -> Dict[str, Any]:
+    """Load the manifest and check the files against it
+
+    File sizes are always checked; with verify_checksums the files are
+    hashed as well, which reads them once in full.
+    """
+    path = Path(directory)
+    with open(path / MANIFEST_FILE, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    version = manifest.get("format_version")
+    if version != FORMAT_VERSION:
+        raise ValueError(
+            f"Vector store at {directory} has format version {version}; "
+            f"this version reads format {FORMAT_VERSION}. Re-ingest the data."
+        )
+    for name, expected in manifest["files"].items():
+        file_path = path / name
+        if not file_path.exists():
+            raise ValueError(f"Vector store file missing: {file_path}")
+        if file_path.stat().st_size != expected["bytes"]:
+            raise ValueError(f"Vector store file has the wrong size: {file_path}")
+        if verify_checksums and file_checksum(file_path) != expected["sha256"]:
+            raise ValueError(f"Vector store file fails its checksum: {file_path}")
+    return manifest
+
+
+class NativeDocstore(Docstore):
+    """Read-only docstore over memory-mapped columns
+
+    Ids are found by binary search over the id-sorted positions, so opening
+    the store reads nothing but the array headers.
+    """
+
+    def __init__(self, directory: Path):
+        self.ids = StringColumn.load(directory, "ids")
+        self.contents = StringColumn.load(directory, "content")
+        self.metadatas = StringColumn.load(directory, "metadata")
+        self.order = np.load(directory / ID_ORDER_FILE, mmap_mode="r")
+
+    def position(self, doc_id: str) -> int:
+        """Index position of a document id, or -1"""
+        lo, hi = 0, len(self.order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ids[int(self.order[mid])] < doc_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.order) and self.ids[int(self.order[lo])] == doc_id:
+            return int(self.order[lo])
+        return -1
+
+    def document(self, pos: int) -> Document:
+        return Document(
+            page_content=self.contents[pos], metadata=json.loads(self.metadatas[pos])
+        )
+
+    def search(self, search: str) -> Union[str, Document]:
+        pos = self.position(search)
+        if pos < 0:
+            return f"ID {search} not found."
+        return self.document(pos)
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        raise NotImplementedError("Lazily loaded vector stores are read-only")
+
+    def delete(self, ids) -> None:
+        raise NotImplementedError("Lazily loaded vector stores are read-only")
+
+
+class NativeIndexToDocstoreId(Mapping):
+    """FAISS position -> docstore id mapping over the memory-mapped id column"""
+
+    def __init__(self, ids: StringColumn):
+        self._ids = ids
+
+    def __getitem__(self, pos: int) -> str:
+        pos = int(pos)
+        if not 0 <= pos < len(self._ids):
+            raise KeyError(pos)
+        return self._ids[pos]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._ids)))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+def load_store(
+    directory: str, lazy: bool = False, verify_checksums: bool = True
+) -> Tuple[faiss.Index, Docstore, Mapping]:
+    """Open a store written by save_store()
+
+    Returns (index, docstore, index_to_docstore_id) ready to pass to the
+    langchain FAISS constructor. Nothing is unpickled. With lazy=True the
+    index and docstore are memory-mapped and read-only; otherwise they are
+    loaded into a writable InMemoryDocstore.
+    """
+    path = Path(directory)
+    manifest = read_manifest(directory, verify_checksums)
+    docstore_path = path / DOCSTORE_DIR
+
+    if lazy:
+        index = read_index_mmap(str(path / INDEX_FILE))
+        docstore = NativeDocstore(docstore_path)
+        index_to_docstore_id = NativeIndexToDocstoreId(docstore.ids)
+    else:
+        index = faiss.read_index(str(path / INDEX_FILE))
+        ids = StringColumn.load(docstore_path, "ids", mmap=False).to_list()
+        contents = StringColumn.load(docstore_path, "content", mmap=False).to_list()
+        metadatas = StringColumn.load(docstore_path, "metadata", mmap=False).to_list()
+        # One parse for the whole column instead of one per document
+        metadatas = json.loads("[" + ",".join(metadatas) + "]")
+        docstore = InMemoryDocstore(
+            {
+                doc_id: Document(page_content=content, metadata=metadata)
+                for doc_id, content, metadata in zip(ids, contents, metadatas)
+            }
+        )
+        index_to_docstore_id = dict(enumerate(ids))
+
+    if index.ntotal != manifest["count"] or len(index_to_docstore_id) != index.ntotal:
+        raise ValueError(f"Vector store at {directory} does not match its manifest")
+    return index, docstore, index_to_docstore_id
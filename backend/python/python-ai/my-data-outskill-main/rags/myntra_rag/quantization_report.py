@@ -0,0 +1,171 @@
+"""
+Memory-vs-recall report for the vector storage modes used by MyntraRAG.
+
+Builds the same index type with float32, float16, int8 and PQ storage over
+the same vectors and reports the in-memory index size, recall@k against the
+exact flat index and per-query latency, each with and without exact
+rescoring of the top k * rescore_factor candidates (see rescorer.py).
+
+Usage:
+    python quantization_report.py --vector-store myntra_vector_store
+    python quantization_report.py --synthetic 200000 --dim 768 --output report.md
+    python quantization_report.py --index-type hnsw --rescore-factor 8
+"""
+
+import argparse
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from ann_index import STORAGE_TYPES, build_faiss_index, set_search_params
+from index_report import load_vectors, recall_at_k, synthetic_vectors, timed_search
+from rescorer import ExactRescorer
+
+
+def index_bytes(index: faiss.Index) -> int:
+    """Size of the index as FAISS serializes it (codes plus structures)"""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def timed_rescored_search(
+    index: faiss.Index,
+    rescorer: ExactRescorer,
+    queries: np.ndarray,
+    k: int,
+    factor: int,
+):
+    """timed_search, but over-fetching and re-ranking against exact vectors"""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, ids[i] = rescorer.search(index, q[None, :], k, factor)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return ids, np.array(latencies)
+
+
+def run_report(
+    vectors: np.ndarray,
+    num_queries: int = 500,
+    k: int = 10,
+    index_type: str = "flat",
+    rescore_factor: int = 4,
+    nprobe: int = 16,
+    ef_search: int = 64,
+    **index_kwargs,
+) -> List[Dict]:
+    """Build every storage mode and measure size, recall@k and latency"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(1)
+    query_ids = rng.choice(len(vectors), min(num_queries, len(vectors)), False)
+    # Perturb stored vectors so queries are not exact matches
+    queries = vectors[query_ids] + 0.05 * rng.standard_normal(
+        (len(query_ids), vectors.shape[1])
+    ).astype(np.float32)
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    truth, _ = timed_search(flat, queries, k)
+    # The report keeps the exact vectors in RAM; MyntraRAG memory-maps them
+    rescorer = ExactRescorer(vectors)
+
+    rows = []
+    for storage in STORAGE_TYPES:
+        start = time.perf_counter()
+        index = build_faiss_index(
+            vectors, index_type=index_type, storage=storage, **index_kwargs
+        )
+        index.add(vectors)
+        set_search_params(index, nprobe, ef_search)
+        build_s = time.perf_counter() - start
+        size = index_bytes(index)
+
+        found, lat = timed_search(index, queries, k)
+        rescored, rescored_lat = timed_rescored_search(
+            index, rescorer, queries, k, rescore_factor
+        )
+        rows.append(
+            {
+                "storage": storage,
+                "build_s": build_s,
+                "mb": size / 2**20,
+                "bytes_per_vector": size / len(vectors),
+                "recall": recall_at_k(found, truth),
+                "p50_ms": float(np.percentile(lat, 50)),
+                "rescored_recall": recall_at_k(rescored, truth),
+                "rescored_p50_ms": float(np.percentile(rescored_lat, 50)),
+            }
+        )
+    return rows
+
+
+def format_report(
+    rows: List[Dict], n: int, dim: int, k: int, index_type: str, factor: int
+) -> str:
+    """Render the results as a markdown table"""
+    lines = [
+        f"# Vector storage modes ({index_type} index, {n} vectors, dim {dim})",
+        "",
+        f"Rescoring re-ranks the top {k}x{factor} candidates against exact "
+        f"float32 vectors ({n * dim * 4 / 2**20:.1f} MB on disk, memory-mapped).",
+        "",
+        f"| storage | index (MB) | bytes/vector | build (s) | recall@{k} | "
+        f"p50 (ms) | rescored recall@{k} | rescored p50 (ms) |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    for r in rows:
+        lines.append(
+            f"| {r['storage']} | {r['mb']:.1f} | {r['bytes_per_vector']:.0f} | "
+            f"{r['build_s']:.1f} | {r['recall']:.3f} | {r['p50_ms']:.3f} | "
+            f"{r['rescored_recall']:.3f} | {r['rescored_p50_ms']:.3f} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vector-store", help="Saved MyntraRAG vector store path")
+    parser.add_argument("--synthetic", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--output", help="Write the markdown report to this file")
+    args = parser.parse_args()
+
+    if args.vector_store:
+        vectors = load_vectors(args.vector_store)
+    else:
+        vectors = synthetic_vectors(args.synthetic, args.dim)
+
+    rows = run_report(
+        vectors,
+        args.queries,
+        args.k,
+        index_type=args.index_type,
+        rescore_factor=args.rescore_factor,
+        pq_m=args.pq_m,
+        ivf_nlist=args.nlist,
+    )
+    report = format_report(
+        rows,
+        len(vectors),
+        vectors.shape[1],
+        args.k,
+        args.index_type,
+        args.rescore_factor,
+    )
+    print(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""
+End-to-end ingest and retrieval benchmark for MyntraRAG at catalog scale.
+
+Synthesises catalogs of the requested sizes in the shape of the sample
+catalog (create_sample_csv) with product text drawn from
+Myntra_300_prod_catalogue.csv, then ingests and queries each one with a
+deterministic local embedder and LLM, so runs are offline and repeatable.
+Reports ingest rows/s, index size on disk, peak RSS, search and query
+p50/p95/p99 latency and recall@k against an exact brute-force search.
+
+Each size runs in a fresh process so peak RSS is per catalog size.
+
+Usage:
+    python rag_benchmark.py --sizes 10000,100000,1000000
+    python rag_benchmark.py --sizes 10000 --index-type hnsw --output report.md
+    python rag_benchmark.py --sizes 100000 --json results.json
+    python rag_benchmark.py --sizes 100000 --baseline results.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence
+
+import faiss
+import numpy as np
+import pandas as pd
+from langchain.schema import AIMessage
+from langchain_core.embeddings import Embeddings
+
+from myntra_rag import Config, MyntraRAG, create_sample_csv
+
+# Shipped next to this module - resolved here so the benchmark runs from any cwd
+MODULE_DIR = Path(__file__).resolve().parent
+SOURCE_CATALOG = str(MODULE_DIR / "Myntra_300_prod_catalogue.csv")
+SAMPLE_CATALOG = str(MODULE_DIR / "myntra_sample_catalog.csv")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings via signed feature hashing
+
+    Texts sharing words get similar vectors, so retrieval quality is
+    meaningful, and the same text always maps to the same vector in any
+    process (crc32, not the salted built-in hash).
+    """
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+        self._slots: Dict[str, tuple] = {}
+
+    def _slot(self, token: str) -> tuple:
+        slot = self._slots.get(token)
+        if slot is None:
+            h = zlib.crc32(token.encode("utf-8"))
+            slot = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+            self._slots[token] = slot
+        return slot
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            i, sign = self._slot(token)
+            vector[i] += sign
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class FakeChatModel:
+    """Stands in for ChatOpenAI: fixed-latency answer naming the context size"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+
+    def _answer(self, prompt) -> AIMessage:
+        return AIMessage(content=f"Answer based on {len(str(prompt))} prompt chars")
+
+    def invoke(self, prompt) -> AIMessage:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def ainvoke(self, prompt) -> AIMessage:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+    def stream(self, prompt) -> Iterator[AIMessage]:
+        yield self.invoke(prompt)
+
+
+class BenchmarkRAG(MyntraRAG):
+    """MyntraRAG with local fake embeddings and LLM - no API keys needed"""
+
+    def __init__(self, config: Config, dim: int = 128, llm_latency_ms: float = 0.0):
+        self._fake_dim = dim
+        self._fake_llm = FakeChatModel(llm_latency_ms)
+        super().__init__(config)
+
+    def _load_api_keys(self):
+        self.config.google_api_key = "benchmark"
+        self.config.openrouter_api_key = "benchmark"
+
+    def _initialize_components(self):
+        super()._initialize_components()
+        self.embeddings = HashingEmbeddings(self._fake_dim)
+
+    def get_llm(self, model_name: str = None) -> FakeChatModel:
+        return self._fake_llm
+
+
+def _seed_values() -> Dict[str, List[Any]]:
+    """Column vocabularies from the two catalogs shipped with the RAG"""
+    if not Path(SAMPLE_CATALOG).exists():
+        create_sample_csv(SAMPLE_CATALOG)
+    sample = pd.read_csv(SAMPLE_CATALOG)
+    source = pd.read_csv(SOURCE_CATALOG).dropna(subset=["name", "description"])
+
+    values = {col: sample[col].dropna().unique().tolist() for col in sample.columns}
+    values["name"] = source["name"].tolist()
+    values["long_description"] = source["description"].tolist()
+    return values
+
+
+def synthesize_catalog(
+    num_rows: int, path: str, seed: int = 0, block_rows: int = 50_000
+) -> str:
+    """Write a catalog of num_rows products to path, block by block"""
+    values = _seed_values()
+    rng = np.random.default_rng(seed)
+
+    def pick(column: str, n: int) -> np.ndarray:
+        return np.asarray(values[column], dtype=object)[
+            rng.integers(0, len(values[column]), n)
+        ]
+
+    header = True
+    for start in range(0, num_rows, block_rows):
+        n = min(block_rows, num_rows - start)
+        brand, color, name = pick("brand", n), pick("color", n), pick("name", n)
+        block = pd.DataFrame(
+            {
+                "product_id": [f"SYN{i:07d}" for i in range(start, start + n)],
+                "product_name": brand + " " + color + " " + name,
+                "category": pick("category", n),
+                "brand": brand,
+                "price": rng.integers(299, 9999, n),
+                "color": color,
+                "size": pick("size", n),
+                "features": pick("features", n),
+                "description": pick("long_description", n),
+                "rating": np.round(rng.uniform(3.0, 5.0, n), 1),
+                "in_stock": rng.random(n) < 0.8,
+            }
+        )
+        block.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+    return path
+
+
+def make_queries(csv_path: str, num_queries: int, seed: int = 1) -> List[str]:
+    """Shopper-style questions built from randomly chosen catalog rows"""
+    rows = pd.read_csv(
+        csv_path, usecols=["product_name", "category", "brand", "price"], nrows=50_000
+    )
+    rng = np.random.default_rng(seed)
+    picked = rows.iloc[rng.integers(0, len(rows), num_queries)]
+    return [
+        f"{r.category} like {r.product_name} from {r.brand} under {r.price + 500}"
+        for r in picked.itertuples()
+    ]
+
+
+def directory_size(path: str) -> int:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def brute_force_ids(
+    rag: MyntraRAG, queries: Sequence[str], k: int, block_size: int = 100_000
+) -> List[List[str]]:
+    """Exact top-k docstore ids, re-embedding stored chunks block by block"""
+    store = rag.vector_store
+    query_vectors = np.asarray(rag.embed_queries(list(queries)), dtype=np.float32)
+    best_d = np.full((len(queries), k), np.inf, dtype=np.float32)
+    best_i = np.full((len(queries), k), -1, dtype=np.int64)
+
+    total = store.index.ntotal
+    for offset in range(0, total, block_size):
+        positions = range(offset, min(offset + block_size, total))
+        texts = [
+            store.docstore.search(store.index_to_docstore_id[p]).page_content
+            for p in positions
+        ]
+        block = faiss.IndexFlatL2(query_vectors.shape[1])
+        block.add(np.asarray(rag.embeddings.embed_documents(texts), dtype=np.float32))
+        d, i = block.search(query_vectors, min(k, len(texts)))
+        i = np.where(i >= 0, i + offset, -1)
+
+        # Merge the block's candidates into the running top-k
+        all_d = np.concatenate([best_d, d], axis=1)
+        all_i = np.concatenate([best_i, i], axis=1)
+        order = np.argsort(all_d, axis=1, kind="stable")[:, :k]
+        best_d = np.take_along_axis(all_d, order, axis=1)
+        best_i = np.take_along_axis(all_i, order, axis=1)
+
+    return [
+        [store.index_to_docstore_id[int(p)] for p in row if p >= 0] for row in best_i
+    ]
+
+
+def _percentiles(values_ms: Sequence[float], prefix: str) -> Dict[str, float]:
+    return {f"{prefix}_p{q}": float(np.percentile(values_ms, q)) for q in (50, 95, 99)}
+
+
+def benchmark_size(num_rows: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Synthesise, ingest and query one catalog size (run in its own process)"""
+    workdir = Path(options["workdir"])
+    csv_path = workdir / f"catalog_{num_rows}.csv"
+    if not csv_path.exists():
+        synthesize_catalog(num_rows, str(csv_path), seed=options["seed"])
+
+    store_path = workdir / f"store_{num_rows}"
+    if store_path.exists():
+        shutil.rmtree(store_path)
+    config = Config(
+        csv_file_path=str(csv_path),
+        vector_store_path=str(store_path),
+        embedding_cache_path=None,
+        embed_requests_per_minute=None,
+        answer_cache_enabled=False,
+        index_type=options["index_type"],
+        num_results=options["k"],
+    )
+    rag = BenchmarkRAG(config, options["dim"], options["llm_latency_ms"])
+
+    start = time.perf_counter()
+    rag.ingest_data()
+    ingest_s = time.perf_counter() - start
+
+    queries = make_queries(str(csv_path), options["queries"], options["seed"] + 1)
+    rag.search(queries[0])  # warm up
+
+    search_ms, query_ms = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        rag.search(q)
+        t1 = time.perf_counter()
+        rag.query(q)
+        t2 = time.perf_counter()
+        search_ms.append((t1 - t0) * 1000)
+        query_ms.append((t2 - t1) * 1000)
+
+    k = options["k"]
+    found = [rag._vector_search_ids(q, k) for q in queries]
+    truth = brute_force_ids(rag, queries, k)
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+
+    return {
+        "rows": num_rows,
+        "chunks": rag.vector_store.index.ntotal,
+        "index_type": options["index_type"],
+        "ingest_s": ingest_s,
+        "ingest_rows_per_s": num_rows / ingest_s,
+        "index_mb": directory_size(str(store_path)) / 2**20,
+        "peak_rss_mb": self_rss / 2**20,
+        "worker_peak_rss_mb": child_rss / 2**20,
+        **_percentiles(search_ms, "search"),
+        **_percentiles(query_ms, "query"),
+        "recall": hits / max(1, sum(len(t) for t in truth)),
+        "stages": rag.last_ingest_stats["stages"],
+    }
+
+
+def run_benchmark(sizes: Sequence[int], options: Dict[str, Any]) -> List[Dict]:
+    """Benchmark every size, each in a fresh spawned process"""
+    rows = []
+    context = multiprocessing.get_context("spawn")
+    for num_rows in sizes:
+        print(f"\n=== {num_rows} rows ===")
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            rows.append(pool.submit(benchmark_size, num_rows, options).result())
+    return rows
+
+
+def compare_to_baseline(
+    rows: List[Dict], baseline: List[Dict], tolerance: float
+) -> List[str]:
+    """Describe every metric that got worse than the baseline by > tolerance"""
+    previous = {(r["rows"], r["index_type"]): r for r in baseline}
+    higher_is_better = {"ingest_rows_per_s": True, "recall": True}
+    checked = ["ingest_rows_per_s", "recall", "search_p95", "query_p95", "peak_rss_mb"]
+
+    regressions = []
+    for row in rows:
+        old = previous.get((row["rows"], row["index_type"]))
+        if old is None:
+            continue
+        for metric in checked:
+            before, after = old[metric], row[metric]
+            if higher_is_better.get(metric, False):
+                worse = after < before * (1 - tolerance)
+            else:
+                worse = after > before * (1 + tolerance)
+            if worse:
+                regressions.append(
+                    f"{row['rows']} rows: {metric} {before:.3f} -> {after:.3f}"
+                )
+    return regressions
+
+
+def format_report(rows: List[Dict], k: int) -> str:
+    """Render the results as a markdown table"""
+    lines = [
+        f"# MyntraRAG benchmark (recall@{k} vs brute force)",
+        "",
+        "| rows | chunks | index | ingest rows/s | index MB | peak RSS MB | "
+        "search p50/p95/p99 ms | query p50/p95/p99 ms | recall |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in rows:
+        lines.append(
+            f"| {r['rows']} | {r['chunks']} | {r['index_type']} | "
+            f"{r['ingest_rows_per_s']:.0f} | {r['index_mb']:.1f} | "
+            f"{r['peak_rss_mb']:.0f} (+{r['worker_peak_rss_mb']:.0f}) | "
+            f"{r['search_p50']:.2f} / {r['search_p95']:.2f} / {r['search_p99']:.2f} | "
+            f"{r['query_p50']:.2f} / {r['query_p95']:.2f} / {r['query_p99']:.2f} | "
+            f"{r['recall']:.3f} |"
+        )
+    lines.append("")
+    lines.append("Peak RSS in brackets is the largest split worker process.")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Keep catalogs and stores here")
+    parser.add_argument("--output", help="Write the markdown report to this file")
+    parser.add_argument("--json", help="Write raw results to this file")
+    parser.add_argument("--baseline", help="Results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="myntra_bench_")
+    Path(workdir).mkdir(parents=True, exist_ok=True)
+    options = {
+        "workdir": workdir,
+        "index_type": args.index_type,
+        "queries": args.queries,
+        "k": args.k,
+        "dim": args.dim,
+        "llm_latency_ms": args.llm_latency_ms,
+        "seed": args.seed,
+    }
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    rows = run_benchmark(sizes, options)
+    report = format_report(rows, args.k)
+    print(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(rows, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
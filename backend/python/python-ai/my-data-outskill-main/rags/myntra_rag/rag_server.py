@@ -0,0 +1,356 @@
+"""
+Long-running HTTP service around MyntraRAG.
+
+The index is loaded once at startup and the LLM clients of the current model
+(and routing tier) are created up front and reused, so requests never pay
+for loading or connection setup. Identical in-flight questions share one
+upstream call, and admission control rejects work with 503 once
+`max_concurrency` requests are running and `max_queue` are waiting.
+
+Endpoints (JSON in, JSON out):
+    POST /query   {"question": str, "model": str?, "filter": {}?}
+    POST /search  {"query": str, "k": int?, "filter": {}?}
+    GET  /health  server and admission counters
+    GET  /metrics Prometheus text (needs Config.metrics_enabled)
+
+Usage:
+    python myntra_rag.py serve --port 8080
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+MAX_BODY_BYTES = 1 << 20
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Dict[str, str] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _json_default(value: Any):
+    """Serialize numpy scalars and anything else found in row metadata"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _document_json(doc) -> Dict[str, Any]:
+    return {"content": doc.page_content, "metadata": doc.metadata}
+
+
+class AdmissionController:
+    """Caps running requests and the queue in front of them
+
+    Up to `max_concurrency` requests run at once; up to `max_queue` more may
+    wait, each for at most `queue_timeout` seconds. Anything beyond that is
+    rejected straight away so overload turns into fast 503s instead of
+    ever-growing latency.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def run(self, work: Callable[[], Awaitable[Any]]) -> Any:
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPError(503, "Server overloaded", {"Retry-After": "1"})
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPError(503, "Timed out waiting for capacity", {"Retry-After": "1"})
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            return await work()
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+
+class RequestCoalescer:
+    """Runs one call per distinct key; concurrent callers share its result"""
+
+    def __init__(self):
+        self._in_flight: Dict[Any, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def run(self, key: Any, work: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = asyncio.ensure_future(work())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # A caller that disconnects must not cancel the shared call
+        return await asyncio.shield(future)
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+
+class RAGServer:
+    """Minimal asyncio HTTP/1.1 server (keep-alive, JSON bodies) for MyntraRAG"""
+
+    def __init__(
+        self,
+        rag,
+        host: str = None,
+        port: int = None,
+        max_concurrency: int = None,
+        max_queue: int = None,
+        queue_timeout: float = None,
+    ):
+        config = rag.config
+        self.rag = rag
+        self.host = host or config.serve_host
+        self.port = port or config.serve_port
+        self.admission = AdmissionController(
+            max_concurrency or config.serve_max_concurrency,
+            config.serve_max_queue if max_queue is None else max_queue,
+            queue_timeout or config.serve_queue_timeout,
+        )
+        self.coalescer = RequestCoalescer()
+        self.started = time.time()
+        self.requests = 0
+        self.routes: Dict[Tuple[str, str], Callable] = {
+            ("POST", "/query"): self.handle_query,
+            ("POST", "/search"): self.handle_search,
+            ("GET", "/health"): self.handle_health,
+            ("GET", "/metrics"): self.handle_metrics,
+        }
+
+    def warm_up(self):
+        """Load the index, its side stores, shard workers and LLM clients
+
+        The side stores are otherwise built on first use; building them here
+        means the first requests do not all wait on the same build.
+        """
+        from metadata_index import MetadataIndex
+
+        self.rag._ensure_vector_store()
+        # A store saved without its filter index would have every chunk
+        # decoded here; it is built on the first filtered request instead
+        if MetadataIndex.exists(self.rag.config.vector_store_path):
+            self.rag.get_metadata_index()
+        self.rag.get_rescorer()
+        if self.rag.config.search_type == "hybrid":
+            self.rag.get_lexical_index()
+        self.rag._get_shard_executor()
+        if not self.rag.config.openrouter_api_key:
+            return
+        models = [self.rag.current_model]
+        if self.rag.config.routing_enabled:
+            models += self.rag.route_models()
+        for model in dict.fromkeys(models):
+            self.rag.get_llm(model)
+
+    async def serve_forever(self):
+        await asyncio.to_thread(self.warm_up)
+        server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        print(f"Serving MyntraRAG on http://{self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        """Blocking entry point"""
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            print("\nServer stopped")
+        finally:
+            self.rag.close()
+
+    async def handle_query(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        question = body.get("question")
+        if not isinstance(question, str) or not question.strip():
+            raise HTTPError(400, "'question' must be a non-empty string")
+        model, filter = body.get("model"), body.get("filter")
+        key = ("query", question.strip(), model, self._filter_key(filter))
+
+        result = await self.coalescer.run(
+            key,
+            lambda: self.admission.run(
+                lambda: self.rag.aquery(question.strip(), model=model, filter=filter)
+            ),
+        )
+        return {
+            **{k: v for k, v in result.items() if k != "sources"},
+            "sources": [_document_json(d) for d in result["sources"]],
+        }
+
+    async def handle_search(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        query = body.get("query")
+        if not isinstance(query, str) or not query.strip():
+            raise HTTPError(400, "'query' must be a non-empty string")
+        k, filter = body.get("k"), body.get("filter")
+        if k is not None and (not isinstance(k, int) or k < 1):
+            raise HTTPError(400, "'k' must be a positive integer")
+        key = ("search", query.strip(), k, self._filter_key(filter))
+
+        docs = await self.coalescer.run(
+            key,
+            lambda: self.admission.run(
+                lambda: asyncio.to_thread(self.rag.search, query.strip(), k, filter)
+            ),
+        )
+        return {"query": query, "results": [_document_json(d) for d in docs]}
+
+    async def handle_health(self, body) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "uptime_s": time.time() - self.started,
+            "requests": self.requests,
+            "running": self.admission.running,
+            "waiting": self.admission.waiting,
+            "rejected": self.admission.rejected,
+            "in_flight_keys": len(self.coalescer),
+            "coalesced": self.coalescer.coalesced,
+            "indexed_chunks": self.rag.vector_store.index.ntotal,
+        }
+
+    async def handle_metrics(self, body) -> str:
+        return self.rag.export_metrics()
+
+    @staticmethod
+    def _filter_key(filter: Optional[Dict[str, Any]]) -> Optional[str]:
+        if filter is None:
+            return None
+        if not isinstance(filter, dict):
+            raise HTTPError(400, "'filter' must be an object")
+        return json.dumps(filter, sort_keys=True, default=str)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload, extra = await self._dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            # Malformed request - answer once and drop the connection
+            self._write_response(writer, e.status, {"error": str(e)}, e.headers, False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """Parse one request; returns None when the client closed the connection"""
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = headers.get("content-length") or "0"
+        # int() would also accept "-1", "+5" and "5_0"
+        if not (length.isascii() and length.isdigit()):
+            raise HTTPError(400, "Invalid Content-Length")
+        length = int(length)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    async def _dispatch(self, method: str, path: str, raw_body: bytes):
+        """Route a request; returns (status, payload, extra headers)"""
+        self.requests += 1
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(p == path for _, p in self.routes):
+                return 405, {"error": f"{method} not allowed on {path}"}, {}
+            return 404, {"error": f"No route for {path}"}, {}
+
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                raise HTTPError(400, "Request body must be a JSON object")
+            return 200, await handler(body), {}
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"Invalid JSON: {e}"}, {}
+        except HTTPError as e:
+            return e.status, {"error": str(e)}, e.headers
+        except ValueError as e:
+            return 400, {"error": str(e)}, {}
+        except Exception as e:
+            print(f"Error handling {method} {path}: {e}")
+            return 500, {"error": str(e)}, {}
+
+    @staticmethod
+    def _write_response(
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Any,
+        extra_headers: Dict[str, str],
+        keep_alive: bool,
+    ):
+        if isinstance(payload, str):
+            body = payload.encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(payload, default=_json_default).encode("utf-8")
+            content_type = "application/json"
+        headers = {
+            "Content-Type": content_type,
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+            **extra_headers,
+        }
+        head = f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n" + "".join(
+            f"{k}: {v}\r\n" for k, v in headers.items()
+        )
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
@@ -0,0 +1,168 @@
+"""
+Latency vs prompt-size report for the MyntraRAG cross-encoder rerank stage.
+
+Runs the same questions through plain vector search (top-k straight into the
+prompt) and through fetch-N + cross-encoder rerank to top-k, and reports
+per-stage latency and the size of the packed prompt context.
+
+Usage:
+    python rerank_report.py --vector-store myntra_vector_store
+    python rerank_report.py --fetch-k 20,50,100 --top-k 5 --budget-ms 150
+    python rerank_report.py --queries-file questions.txt --with-llm --output report.md
+"""
+
+import argparse
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from myntra_rag import Config, MyntraRAG
+from reranker import CrossEncoderReranker
+
+DEFAULT_QUERIES = [
+    "UV protection shirt for men",
+    "running shoes under 3000",
+    "women's cotton kurta for summer",
+    "waterproof jacket for trekking",
+    "black formal shoes for office",
+    "kids t-shirt pack",
+    "lightweight backpack for travel",
+    "sports bra with high support",
+    "denim jeans slim fit",
+    "sunglasses with polarized lenses",
+]
+
+
+def measure(
+    rag: MyntraRAG,
+    queries: Sequence[str],
+    fetch_k: int,
+    top_k: int,
+    reranker: Optional[CrossEncoderReranker] = None,
+    with_llm: bool = False,
+) -> Dict:
+    """Time retrieval, reranking and (optionally) generation for each query"""
+    retrieve_ms, rerank_ms, llm_ms, total_ms, tokens, scored = [], [], [], [], [], []
+    for query in queries:
+        start = time.perf_counter()
+        docs = rag.search(query, k=fetch_k)
+        retrieved = time.perf_counter()
+
+        if reranker is not None:
+            docs, stats = reranker.rerank(query, docs, top_k)
+            scored.append(stats["scored"] / max(1, stats["candidates"]))
+        reranked = time.perf_counter()
+
+        context, context_stats = rag.build_context(docs)
+        if with_llm:
+            prompt = rag.prompt_template.format(context=context, question=query)
+            rag.get_llm().invoke(prompt)
+        done = time.perf_counter()
+
+        retrieve_ms.append((retrieved - start) * 1000)
+        rerank_ms.append((reranked - retrieved) * 1000)
+        llm_ms.append((done - reranked) * 1000)
+        total_ms.append((done - start) * 1000)
+        tokens.append(context_stats["context_tokens"])
+
+    return {
+        "setting": (
+            f"rerank {fetch_k} -> {top_k}" if reranker else f"vector top {fetch_k}"
+        ),
+        "retrieve_p50": float(np.percentile(retrieve_ms, 50)),
+        "rerank_p50": float(np.percentile(rerank_ms, 50)),
+        "rerank_p95": float(np.percentile(rerank_ms, 95)),
+        "llm_p50": float(np.percentile(llm_ms, 50)) if with_llm else None,
+        "total_p50": float(np.percentile(total_ms, 50)),
+        "total_p95": float(np.percentile(total_ms, 95)),
+        "context_tokens": float(np.mean(tokens)),
+        "scored": float(np.mean(scored)) if scored else None,
+    }
+
+
+def run_report(
+    rag: MyntraRAG,
+    queries: Sequence[str],
+    fetch_ks: Sequence[int],
+    top_k: int,
+    reranker: CrossEncoderReranker,
+    baseline_k: int = 10,
+    with_llm: bool = False,
+) -> List[Dict]:
+    """Compare the plain top-k baseline against each rerank fetch size"""
+    # Warm up the query path and load the cross-encoder outside the timings
+    rag.search(queries[0], k=max(fetch_ks))
+    reranker.rerank(queries[0], rag.search(queries[0], k=top_k), top_k)
+
+    rows = [measure(rag, queries, baseline_k, baseline_k, None, with_llm)]
+    for fetch_k in fetch_ks:
+        rows.append(measure(rag, queries, fetch_k, top_k, reranker, with_llm))
+    return rows
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def format_report(rows: List[Dict], num_queries: int, budget_ms) -> str:
+    """Render the results as a markdown table"""
+    budget = "none" if budget_ms is None else f"{budget_ms:g} ms"
+    lines = [
+        f"# Rerank latency vs prompt size ({num_queries} queries, budget {budget})",
+        "",
+        "| setting | retrieve p50 | rerank p50 | rerank p95 | llm p50 | "
+        "total p50 | total p95 | context tokens | scored |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in rows:
+        scored = "-" if r["scored"] is None else f"{r['scored']:.0%}"
+        lines.append(
+            f"| {r['setting']} | {_ms(r['retrieve_p50'])} | {_ms(r['rerank_p50'])} | "
+            f"{_ms(r['rerank_p95'])} | {_ms(r['llm_p50'])} | {_ms(r['total_p50'])} | "
+            f"{_ms(r['total_p95'])} | {r['context_tokens']:.0f} | {scored} |"
+        )
+    lines.append("")
+    lines.append("Latencies in ms. `scored` is the share of candidates the")
+    lines.append("cross-encoder reached before the latency budget ran out.")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vector-store", default=Config.vector_store_path)
+    parser.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    parser.add_argument("--queries-file", help="One question per line")
+    parser.add_argument("--fetch-k", default="20,50,100")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--baseline-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--with-llm", action="store_true", help="Include generation")
+    parser.add_argument("--output", help="Write the markdown report to this file")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    rag = MyntraRAG(Config(vector_store_path=args.vector_store))
+    reranker = CrossEncoderReranker(
+        args.model, batch_size=args.batch_size, budget_ms=args.budget_ms
+    )
+    fetch_ks = [int(k) for k in args.fetch_k.split(",")]
+
+    rows = run_report(
+        rag, queries, fetch_ks, args.top_k, reranker, args.baseline_k, args.with_llm
+    )
+    report = format_report(rows, len(queries), args.budget_ms)
+    print(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
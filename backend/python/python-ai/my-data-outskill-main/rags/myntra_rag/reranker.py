@@ -0,0 +1,97 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain.schema import Document
+
+
+class CrossEncoderReranker:
+    """Re-score retrieved chunks with a small CPU cross-encoder
+
+    Candidates are scored in batches in retrieval order. Once `budget_ms`
+    is spent no further batches are started; the unscored tail keeps its
+    retrieval order behind the scored candidates, so a slow machine degrades
+    to plain vector ranking instead of blowing the latency target.
+
+    Requires the optional `sentence-transformers` package unless a `model`
+    with a `predict(pairs, batch_size=...)` method is passed in.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 32,
+        budget_ms: Optional[float] = None,
+        max_length: int = 256,
+        model=None,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.max_length = max_length
+        self._model = model
+
+    @property
+    def model(self):
+        """Load the cross-encoder on first use"""
+        if self._model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as e:
+                raise ImportError(
+                    "Reranking needs sentence-transformers: "
+                    "pip install sentence-transformers"
+                ) from e
+            self._model = CrossEncoder(
+                self.model_name, max_length=self.max_length, device="cpu"
+            )
+        return self._model
+
+    def score(
+        self, query: str, texts: Sequence[str]
+    ) -> Tuple[List[float], Dict[str, Any]]:
+        """Score (query, text) pairs in batches until the budget runs out
+
+        Returns scores for the first len(scores) texts and timing stats.
+        """
+        start = time.perf_counter()
+        scores: List[float] = []
+        batches = 0
+        for offset in range(0, len(texts), self.batch_size):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if batches and self.budget_ms is not None and elapsed_ms >= self.budget_ms:
+                break
+            pairs = [(query, t) for t in texts[offset : offset + self.batch_size]]
+            batch_scores = self.model.predict(pairs, batch_size=self.batch_size)
+            scores.extend(float(s) for s in batch_scores)
+            batches += 1
+
+        stats = {
+            "candidates": len(texts),
+            "scored": len(scores),
+            "batches": batches,
+            "rerank_ms": (time.perf_counter() - start) * 1000,
+        }
+        return scores, stats
+
+    def rerank(
+        self, query: str, documents: List[Document], top_k: Optional[int] = None
+    ) -> Tuple[List[Document], Dict[str, Any]]:
+        """Return the top_k documents by cross-encoder score, plus stats
+
+        Returned documents are copies carrying a `rerank_score` in metadata.
+        """
+        scores, stats = self.score(query, [d.page_content for d in documents])
+        order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        order += list(range(len(scores), len(documents)))
+        if top_k is not None:
+            order = order[:top_k]
+
+        reranked = []
+        for i in order:
+            metadata = dict(documents[i].metadata)
+            if i < len(scores):
+                metadata["rerank_score"] = scores[i]
+            reranked.append(
+                Document(page_content=documents[i].page_content, metadata=metadata)
+            )
+        return reranked, stats
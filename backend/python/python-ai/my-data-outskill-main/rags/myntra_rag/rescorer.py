@@ -0,0 +1,97 @@
+import os
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+
+class FullVectorWriter:
+    """Appends float32 vectors to a temporary file that commit() moves into place
+
+    Vectors must be appended in index order, so row i of the file is
+    position i of the FAISS index.
+    """
+
+    def __init__(self, directory: str):
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        self.path = path / ExactRescorer.FILE_NAME
+        self._tmp_path = self.path.with_suffix(".tmp")
+        self._file = open(self._tmp_path, "wb")
+        self.count = 0
+
+    def append(self, vectors):
+        array = np.ascontiguousarray(vectors, dtype=np.float32)
+        array.tofile(self._file)
+        self.count += len(array)
+
+    def commit(self):
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class ExactRescorer:
+    """Re-ranks candidates from a compressed index against the exact vectors
+
+    float16/int8/PQ storage keeps only lossy codes in the index. The original
+    float32 vectors live in a flat file next to it and are memory-mapped, so
+    only the rows of the candidates being rescored are paged in.
+    """
+
+    FILE_NAME = "vectors.f32"
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    @classmethod
+    def load(cls, directory: str, dim: int) -> "ExactRescorer":
+        vectors = np.memmap(Path(directory) / cls.FILE_NAME, np.float32, mode="r")
+        return cls(vectors.reshape(-1, dim))
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return (Path(directory) / cls.FILE_NAME).exists()
+
+    @classmethod
+    def remove(cls, directory: str):
+        (Path(directory) / cls.FILE_NAME).unlink(missing_ok=True)
+
+    def search(
+        self, index, queries: np.ndarray, k: int, factor: int, params=None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """index.search over-fetching k * factor candidates, re-ranked exactly"""
+        fetch = min(k * factor, index.ntotal)
+        _, candidates = index.search(queries, fetch, params=params)
+        return self.rescore(queries, candidates, k)
+
+    def rescore(
+        self, queries: np.ndarray, candidates: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact L2 distances and positions of the best k candidates per query"""
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        positions = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, (query, found) in enumerate(zip(queries, candidates)):
+            # Sorted positions read the memory map front to back
+            found = np.unique(found[found >= 0])
+            if not len(found):
+                continue
+            exact = ((self.vectors[found] - query) ** 2).sum(axis=1)
+            best = np.argsort(exact)[:k]
+            distances[row, : len(best)] = exact[best]
+            positions[row, : len(best)] = found[best]
+        return distances, positions
+
+    def copy_to(
+        self, writer: FullVectorWriter, keep: np.ndarray, block_rows: int = 65_536
+    ):
+        """Append the rows where keep is True, a block at a time"""
+        for start in range(0, len(keep), block_rows):
+            end = start + block_rows
+            writer.append(self.vectors[start:end][keep[start:end]])
+
+    def __len__(self) -> int:
+        return len(self.vectors)
@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from native_store import StringColumn
+
+
+def _json_default(value: Any):
+    """Serialize numpy scalars found in row metadata"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class RowStore:
+    """Side store holding each product row once, keyed by row_index
+
+    Chunks in the vector store only carry row_index and chunk_index; the full
+    row metadata is looked up here when results are returned. Rows are kept
+    as one JSON document each in a native_store string column, sorted by
+    row_index, so a saved store is memory-mapped rather than read and a row
+    is only decoded when a result needs it. The last `cache_size` decoded
+    rows are kept.
+    """
+
+    # A directory: row_index.npy plus the rows string column
+    FILE_NAME = "rows"
+    # Pandas "table" JSON written before the columnar format
+    LEGACY_FILE_NAME = "rows.json"
+    CACHE_SIZE = 10_000
+
+    def __init__(
+        self, row_indices: np.ndarray, rows: StringColumn, cache_size: int = None
+    ):
+        self.row_indices = row_indices
+        self.rows = rows
+        self.cache_size = self.CACHE_SIZE if cache_size is None else cache_size
+        self._cache: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_metadatas(cls, metadatas: Sequence[Dict[str, Any]]) -> "RowStore":
+        """Build from per-row metadata dicts (each must contain row_index)"""
+        metadatas = sorted(metadatas, key=lambda m: m["row_index"])
+        row_indices = np.asarray([m["row_index"] for m in metadatas], dtype=np.int64)
+        if len(row_indices) > 1 and not (np.diff(row_indices) > 0).all():
+            raise ValueError("Duplicate row_index in row metadata")
+        rows = StringColumn.from_strings(
+            [json.dumps(m, default=_json_default) for m in metadatas]
+        )
+        return cls(row_indices, rows)
+
+    def _position(self, row_index: Any) -> int:
+        pos = int(np.searchsorted(self.row_indices, row_index))
+        if pos == len(self.row_indices) or self.row_indices[pos] != row_index:
+            raise KeyError(row_index)
+        return pos
+
+    def get(self, row_index: Any) -> Dict[str, Any]:
+        """Metadata of one row"""
+        with self._lock:
+            row = self._cache.get(row_index)
+            if row is not None:
+                self._cache.move_to_end(row_index)
+                return row
+        row = json.loads(self.rows[self._position(row_index)])
+        with self._lock:
+            self._cache[row_index] = row
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return row
+
+    def frame_for(self, row_indices: Sequence[Any]) -> pd.DataFrame:
+        """Row metadata for many positions at once (repeats allowed)"""
+        unique, inverse = np.unique(np.asarray(row_indices), return_inverse=True)
+        # One parse for all the rows instead of one per row
+        records: List[Dict[str, Any]] = json.loads(
+            "[" + ",".join(self.rows[self._position(r)] for r in unique) + "]"
+        )
+        frame = pd.DataFrame.from_records(records)
+        return frame.iloc[inverse].reset_index(drop=True)
+
+    def hydrate(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Expand compact chunk metadata back to the full row"""
+        return {**self.get(metadata["row_index"]), **metadata}
+
+    def save(self, directory: str):
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        tmp = path / f"{self.FILE_NAME}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        with open(tmp / "row_index.npy", "wb") as f:
+            np.save(f, np.asarray(self.row_indices), allow_pickle=False)
+        self.rows.save(tmp, "rows")
+        shutil.rmtree(path / self.FILE_NAME, ignore_errors=True)
+        os.replace(tmp, path / self.FILE_NAME)
+        (path / self.LEGACY_FILE_NAME).unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, directory: str) -> "RowStore":
+        """Memory-map a saved store (reads a legacy rows.json in full)"""
+        path = Path(directory) / cls.FILE_NAME
+        if not path.exists():
+            frame = pd.read_json(Path(directory) / cls.LEGACY_FILE_NAME, orient="table")
+            return cls.from_metadatas(frame.to_dict(orient="records"))
+        return cls(
+            np.load(path / "row_index.npy", mmap_mode="r"),
+            StringColumn.load(path, "rows"),
+        )
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        path = Path(directory)
+        return (path / cls.FILE_NAME / "row_index.npy").exists() or (
+            path / cls.LEGACY_FILE_NAME
+        ).exists()
+
+    def __len__(self) -> int:
+        return len(self.row_indices)
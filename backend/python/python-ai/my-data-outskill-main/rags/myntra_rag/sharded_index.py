@@ -0,0 +1,292 @@
+import json
+import os
+import shutil
+import uuid
+import zlib
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from ann_index import filtered_search, read_index_mmap, set_search_params
+from rescorer import FullVectorWriter
+
+SHARDS_DIR = "shards"
+MANIFEST_FILE = "shards.json"
+
+# Shard indexes opened by this process, keyed by (path, manifest version)
+_OPEN_SHARDS: Dict[Tuple[str, str], faiss.Index] = {}
+
+
+def shard_key(value: Any) -> str:
+    """Shard name for a shard_by value, for rows and filter values alike"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    # A numeric column read with missing values comes back as floats
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def shard_value(metadata: Dict[str, Any], shard_by: str, num_shards: int) -> str:
+    """Shard a row belongs to: its shard_by column value, or a hash bucket"""
+    if shard_by == "hash":
+        key = str(metadata["product_key"]).encode("utf-8")
+        return str(zlib.crc32(key) % num_shards)
+    return shard_key(metadata.get(shard_by))
+
+
+def open_shard(path: str, version: str, nprobe: int, ef_search: int) -> faiss.Index:
+    """Memory-map a shard index once per process and keep it open"""
+    key = (path, version)
+    index = _OPEN_SHARDS.get(key)
+    if index is None:
+        # A rebuilt store has a new version - drop the stale mappings
+        for stale in [k for k in _OPEN_SHARDS if k[0] == path]:
+            del _OPEN_SHARDS[stale]
+        index = read_index_mmap(os.path.join(path, "index.faiss"))
+        set_search_params(index, nprobe, ef_search)
+        _OPEN_SHARDS[key] = index
+    return index
+
+
+def open_shards(paths: Sequence[str], version: str, nprobe: int, ef_search: int):
+    """Process pool initializer - map every shard before the first query"""
+    for path in paths:
+        open_shard(path, version, nprobe, ef_search)
+
+
+def search_shard(
+    path: str,
+    version: str,
+    queries: np.ndarray,
+    k: int,
+    bitmap: Optional[np.ndarray],
+    nprobe: int,
+    ef_search: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Search one shard; returns distances and shard-local positions"""
+    index = open_shard(path, version, nprobe, ef_search)
+    k = min(k, index.ntotal)
+    if bitmap is not None:
+        return filtered_search(index, queries, k, bitmap, nprobe, ef_search)
+    return index.search(queries, k)
+
+
+class ShardedIndex:
+    """Per-shard FAISS indexes searched in parallel, hits merged by distance
+
+    Each shard holds the vectors of one category (or hash bucket) together
+    with their positions in the main index, so merged hits map straight back
+    to the main store's docstore, metadata filters and exact rescoring.
+    Shards are searched on a process pool whose workers memory-map the shard
+    files once and keep them open; a filter on the shard column skips the
+    shards it rules out without searching them.
+    """
+
+    def __init__(self, directory: str, manifest: Dict[str, Any]):
+        self.directory = Path(directory) / SHARDS_DIR
+        self.shard_by = manifest["shard_by"]
+        self.version = manifest["version"]
+        self.shards = manifest["shards"]
+        self.positions = {
+            s["dir"]: np.load(self.directory / s["dir"] / "positions.npy")
+            for s in self.shards
+        }
+
+    @classmethod
+    def load(cls, directory: str) -> "ShardedIndex":
+        with open(Path(directory) / SHARDS_DIR / MANIFEST_FILE, encoding="utf-8") as f:
+            return cls(directory, json.load(f))
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return (Path(directory) / SHARDS_DIR / MANIFEST_FILE).exists()
+
+    @classmethod
+    def remove(cls, directory: str):
+        shutil.rmtree(Path(directory) / SHARDS_DIR, ignore_errors=True)
+
+    @property
+    def total(self) -> int:
+        return sum(s["count"] for s in self.shards)
+
+    def paths(self) -> List[str]:
+        return [str(self.directory / s["dir"]) for s in self.shards]
+
+    def shards_for(self, filter: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Shards that can hold matches for filter (all of them for hash shards)"""
+        condition = (filter or {}).get(self.shard_by)
+        if condition is None or self.shard_by == "hash":
+            return self.shards
+
+        if not isinstance(condition, dict):
+            condition = (
+                {"$in": condition}
+                if isinstance(condition, (list, tuple, set))
+                else {"$eq": condition}
+            )
+        selected = self.shards
+        for op, value in condition.items():
+            if op == "$eq":
+                selected = [s for s in selected if s["value"] == shard_key(value)]
+            elif op == "$in":
+                allowed = {shard_key(v) for v in value}
+                selected = [s for s in selected if s["value"] in allowed]
+            elif op == "$ne":
+                selected = [s for s in selected if s["value"] != shard_key(value)]
+            # Range conditions cannot rule a shard out by its name
+        return selected
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        filter: Dict[str, Any] = None,
+        bitmap: Optional[np.ndarray] = None,
+        executor: Optional[Executor] = None,
+        nprobe: int = 16,
+        ef_search: int = 64,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Scatter queries over the shards and merge the k nearest hits
+
+        bitmap is the packed metadata-filter bitmap over main-index positions.
+        Returns distances and main-index positions, padded with -1.
+        """
+        allowed = None
+        if bitmap is not None:
+            allowed = np.unpackbits(bitmap, bitorder="little").astype(bool)
+
+        jobs = []
+        for shard in self.shards_for(filter):
+            positions = self.positions[shard["dir"]]
+            local_bitmap = None
+            if allowed is not None:
+                mask = allowed[positions]
+                if not mask.any():
+                    continue
+                local_bitmap = np.packbits(mask, bitorder="little")
+            args = (
+                str(self.directory / shard["dir"]),
+                self.version,
+                queries,
+                k,
+                local_bitmap,
+                nprobe,
+                ef_search,
+            )
+            jobs.append((positions, args))
+
+        if executor is not None and len(jobs) > 1:
+            futures = [executor.submit(search_shard, *args) for _, args in jobs]
+            results = [f.result() for f in futures]
+        else:
+            results = [search_shard(*args) for _, args in jobs]
+
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        merged = np.full((len(queries), k), -1, dtype=np.int64)
+        if not results:
+            return distances, merged
+        all_distances = np.hstack([d for d, _ in results])
+        all_positions = np.hstack(
+            [
+                np.where(local >= 0, positions[np.maximum(local, 0)], -1)
+                for (positions, _), (_, local) in zip(jobs, results)
+            ]
+        )
+        all_distances[all_positions < 0] = np.inf
+        order = np.argsort(all_distances, axis=1, kind="stable")[:, :k]
+        found = np.take_along_axis(all_positions, order, axis=1)
+        n = found.shape[1]
+        distances[:, :n] = np.take_along_axis(all_distances, order, axis=1)
+        merged[:, :n] = found
+        return distances, merged
+
+
+class ShardedIndexWriter:
+    """Collects vectors per shard during an ingest, then builds the shard indexes
+
+    Vectors are spilled to one file per shard as they arrive, so only one
+    shard is in memory at a time while its index is built. Everything is
+    written to a temporary directory that replaces the previous shards on
+    commit().
+    """
+
+    def __init__(self, directory: str, shard_by: str, num_shards: int = 8):
+        self.directory = Path(directory)
+        self.shard_by = shard_by
+        self.num_shards = num_shards
+        self._tmp = self.directory / f"{SHARDS_DIR}.tmp"
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        self._shard_of_row: Dict[Any, str] = {}
+        self._writers: Dict[str, FullVectorWriter] = {}
+        self._positions: Dict[str, List[np.ndarray]] = {}
+        self.dim: Optional[int] = None
+
+    def assign(self, metadatas: Iterable[Dict[str, Any]]):
+        """Record the shard of each row (rows need row_index and product_key)"""
+        for metadata in metadatas:
+            self._shard_of_row[metadata["row_index"]] = shard_value(
+                metadata, self.shard_by, self.num_shards
+            )
+
+    def add(self, row_indices: Sequence[Any], start: int, vectors):
+        """Route vectors added at main-index positions start.. to their shards"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(vectors):
+            return
+        self.dim = vectors.shape[1]
+        shards = np.array([self._shard_of_row[r] for r in row_indices], dtype=object)
+        positions = np.arange(start, start + len(vectors), dtype=np.int64)
+        for value in dict.fromkeys(shards):
+            mask = shards == value
+            writer = self._writers.get(value)
+            if writer is None:
+                shard_dir = self._tmp / f"shard_{len(self._writers):03d}"
+                writer = self._writers[value] = FullVectorWriter(str(shard_dir))
+                self._positions[value] = []
+            writer.append(vectors[mask])
+            self._positions[value].append(positions[mask])
+
+    def commit(self, build_index: Callable[[np.ndarray], faiss.Index]) -> int:
+        """Build every shard index, write the manifest and swap the shards in
+
+        build_index gets one shard's vectors (memory-mapped) and returns a
+        filled index. Returns the number of shards written.
+        """
+        shards = []
+        for value, writer in self._writers.items():
+            writer.commit()
+            vectors = np.memmap(writer.path, np.float32, mode="r").reshape(-1, self.dim)
+            index = build_index(vectors)
+            shard_dir = writer.path.parent
+            faiss.write_index(index, str(shard_dir / "index.faiss"))
+            np.save(shard_dir / "positions.npy", np.concatenate(self._positions[value]))
+            del vectors
+            writer.path.unlink()
+            shards.append(
+                {"dir": shard_dir.name, "value": value, "count": index.ntotal}
+            )
+
+        self._tmp.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "shard_by": self.shard_by,
+            "version": uuid.uuid4().hex,
+            "shards": shards,
+        }
+        with open(self._tmp / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        target = self.directory / SHARDS_DIR
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(self._tmp, target)
+        return len(shards)
+
+    def abort(self):
+        for writer in self._writers.values():
+            writer.abort()
+        shutil.rmtree(self._tmp, ignore_errors=True)
@@ -0,0 +1,45 @@
+import logging
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# The RAG modules import each other flat, as when run from their directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from myntra_rag import Config  # noqa: E402
+from rag_benchmark import BenchmarkRAG, synthesize_catalog  # noqa: E402
+
+# CharacterTextSplitter warns about every chunk longer than chunk_size
+logging.getLogger("langchain_text_splitters").setLevel(logging.ERROR)
+
+
+@pytest.fixture(scope="session")
+def catalog(tmp_path_factory) -> str:
+    """Small synthetic catalog shared by the tests (read-only)"""
+    path = tmp_path_factory.mktemp("catalog") / "catalog.csv"
+    return synthesize_catalog(400, str(path))
+
+
+@pytest.fixture(scope="session")
+def top_brand(catalog) -> str:
+    return pd.read_csv(catalog)["brand"].value_counts().index[0]
+
+
+@pytest.fixture
+def make_rag(tmp_path, catalog):
+    """Build a BenchmarkRAG (fake embeddings and LLM) over a store in tmp_path"""
+
+    def make(**overrides) -> BenchmarkRAG:
+        options = dict(
+            csv_file_path=catalog,
+            vector_store_path=str(tmp_path / "store"),
+            embedding_cache_path=None,
+            answer_cache_enabled=False,
+            split_workers=0,
+        )
+        options.update(overrides)
+        return BenchmarkRAG(Config(**options), dim=32)
+
+    return make
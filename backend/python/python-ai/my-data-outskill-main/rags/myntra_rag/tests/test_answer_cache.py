@@ -0,0 +1,84 @@
+import answer_cache
+from answer_cache import SemanticAnswerCache, question_numbers
+from myntra_rag import Config
+
+SCOPE = ("model", None)
+
+
+def test_exact_hit_ignores_case_and_whitespace():
+    cache = SemanticAnswerCache()
+    cache.put(SCOPE, "Red  cotton shirts", {"answer": "a"})
+
+    assert cache.get_exact(SCOPE, "red cotton SHIRTS") == {"answer": "a"}
+    assert cache.get_exact(("other", None), "red cotton shirts") is None
+
+
+def test_semantic_hit_above_threshold():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.put(SCOPE, "red cotton shirts", {"answer": "a"}, [1.0, 0.0])
+
+    value, similarity = cache.get_similar(SCOPE, "cotton shirts in red", [0.99, 0.1])
+    assert value == {"answer": "a"}
+    assert similarity > 0.9
+    assert cache.get_similar(SCOPE, "blue jeans", [0.0, 1.0]) is None
+    assert cache.stats()["semantic_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_semantic_hit_needs_the_same_numbers():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.put(SCOPE, "shirts under 1,000", {"answer": "a"}, [1.0, 0.0])
+
+    assert cache.get_similar(SCOPE, "shirts below 500", [1.0, 0.0]) is None
+    assert cache.get_similar(SCOPE, "shirts below 1000", [1.0, 0.0]) is not None
+    assert question_numbers("size 42 under 2,999.50") == ("42", "2999.50")
+
+
+def test_filters_are_part_of_the_scope():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.put(("model", '{"brand": "Nike"}'), "shoes", {"answer": "a"}, [1.0, 0.0])
+
+    assert (
+        cache.get_similar(("model", '{"brand": "Puma"}'), "shoes", [1.0, 0.0]) is None
+    )
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticAnswerCache(ttl=60)
+    cache.put(SCOPE, "red shirts", {"answer": "a"}, [1.0, 0.0])
+
+    now[0] += 59
+    assert cache.get_exact(SCOPE, "red shirts") is not None
+    now[0] += 2
+    assert cache.get_exact(SCOPE, "red shirts") is None
+    assert cache.get_similar(SCOPE, "red shirts", [1.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.put(SCOPE, "a", 1)
+    cache.put(SCOPE, "b", 2)
+    cache.get_exact(SCOPE, "a")
+    cache.put(SCOPE, "c", 3)
+
+    assert cache.get_exact(SCOPE, "b") is None
+    assert cache.get_exact(SCOPE, "a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_answer_cache_is_off_by_default():
+    assert Config().answer_cache_enabled is False
+
+
+def test_ingest_invalidates_cached_answers(make_rag):
+    rag = make_rag(answer_cache_enabled=True)
+    rag.ingest_data()
+
+    assert "cached" not in rag.query("red cotton shirt")
+    assert rag.query("Red cotton  shirt")["cached"] == "exact"
+
+    rag.ingest_data()
+    assert "cached" not in rag.query("red cotton shirt")
@@ -0,0 +1,45 @@
+from langchain.schema import Document
+
+from context_builder import ELISION_MARKER, build_context, count_tokens
+
+
+def chunk(text: str, row: int, index: int) -> Document:
+    return Document(
+        page_content=text, metadata={"row_index": row, "chunk_index": index}
+    )
+
+
+def test_adjacent_chunks_merge_without_repeating_the_overlap():
+    docs = [chunk("a\nb\nc", 0, 0), chunk("c\nd", 0, 1)]
+    context, _ = build_context(docs)
+    assert context == "Text: a\nb\nc\nd"
+
+
+def test_gaps_between_chunks_are_marked_not_merged():
+    # Chunk 2 starts with the line chunk 0 ends with, but chunk 1 is missing
+    docs = [chunk("c\nd", 0, 2), chunk("a\nb\nc", 0, 0)]
+    context, _ = build_context(docs)
+    assert context == f"Text: a\nb\nc\n{ELISION_MARKER}\nc\nd"
+
+
+def test_duplicate_hits_are_dropped():
+    docs = [chunk("a\nb", 0, 0), chunk("a\nb", 0, 0)]
+    context, stats = build_context(docs)
+    assert context == "Text: a\nb"
+    assert stats["products"] == 1
+
+
+def test_products_are_packed_in_rank_order_within_budget():
+    docs = [chunk("x" * 40, 1, 0), chunk("y" * 400, 2, 0), chunk("z" * 40, 3, 0)]
+    context, stats = build_context(docs, token_budget=40)
+    assert "x" in context and "z" in context and "y" not in context
+    assert stats["products_packed"] == 2
+    assert stats["context_tokens"] <= 40
+
+
+def test_top_product_over_budget_is_truncated():
+    docs = [chunk("x" * 4000, 1, 0), chunk("y" * 40, 2, 0)]
+    context, stats = build_context(docs, token_budget=50)
+    assert context.startswith("Text: xxx")
+    assert count_tokens(context) <= 50
+    assert stats["products_truncated"] == 1
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from myntra_rag import MyntraRAG
+
+
+def frame() -> pd.DataFrame:
+    # Index starts mid-file, as for the second block of a chunked read
+    return pd.DataFrame(
+        {
+            "product_name": ["Linen Shirt", None, "Denim Jacket"],
+            "price": [1499, 999, np.nan],
+            "color": [np.nan, np.nan, "Blue"],
+            "empty": [np.nan, np.nan, np.nan],
+        },
+        index=[500, 501, 502],
+    )
+
+
+def test_nan_cells_are_left_out_of_the_text():
+    docs = MyntraRAG._frame_to_documents(frame())
+
+    assert [d.page_content for d in docs] == [
+        "product_name: Linen Shirt\nprice: 1499.0",
+        "price: 999.0",
+        "product_name: Denim Jacket\ncolor: Blue",
+    ]
+
+
+def test_row_index_follows_the_frame_index():
+    docs = MyntraRAG._frame_to_documents(frame())
+    assert [d.metadata["row_index"] for d in docs] == [500, 501, 502]
+
+
+def test_excluded_columns_stay_in_the_metadata_only():
+    docs = MyntraRAG._frame_to_documents(frame(), exclude=["price"])
+
+    assert [d.page_content for d in docs] == [
+        "product_name: Linen Shirt",
+        "",
+        "product_name: Denim Jacket\ncolor: Blue",
+    ]
+    assert docs[0].metadata["price"] == 1499
+    assert docs[2].metadata["color"] == "Blue"
+
+
+def test_empty_frame_gives_no_documents():
+    assert MyntraRAG._frame_to_documents(frame().iloc[:0]) == []
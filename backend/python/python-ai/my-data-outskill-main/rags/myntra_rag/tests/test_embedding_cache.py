@@ -0,0 +1,82 @@
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbeddings(Embeddings):
+    """Returns [len(text), model offset] vectors and records every call"""
+
+    def __init__(self, offset: float = 0.0):
+        self.offset = offset
+        self.calls: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(t)), self.offset] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def test_misses_are_embedded_once_and_then_hit(tmp_path):
+    stub = CountingEmbeddings()
+    cached = CachedEmbeddings(stub, "model-a", EmbeddingCache(str(tmp_path / "c.db")))
+
+    first = cached.embed_documents(["shirt", "jeans", "shirt"])
+    assert stub.calls == [["shirt", "jeans"]]
+    assert cached.stats() == {"hits": 0, "misses": 3}
+
+    cached.reset_stats()
+    assert cached.embed_documents(["jeans", "shirt", "socks"]) == [
+        first[1],
+        first[0],
+        [5.0, 0.0],
+    ]
+    assert stub.calls[1:] == [["socks"]]
+    assert cached.stats() == {"hits": 2, "misses": 1}
+
+
+def test_vectors_survive_reopening_the_cache(tmp_path):
+    path = str(tmp_path / "c.db")
+    CachedEmbeddings(
+        CountingEmbeddings(), "model-a", EmbeddingCache(path)
+    ).embed_documents(["shirt"])
+
+    stub = CountingEmbeddings()
+    cached = CachedEmbeddings(stub, "model-a", EmbeddingCache(path))
+    assert cached.embed_documents(["shirt"]) == [[5.0, 0.0]]
+    assert stub.calls == []
+
+
+def test_vectors_are_kept_apart_per_model(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "c.db"))
+    CachedEmbeddings(CountingEmbeddings(0.0), "model-a", cache).embed_documents(
+        ["shirt"]
+    )
+
+    stub = CountingEmbeddings(1.0)
+    cached = CachedEmbeddings(stub, "model-b", cache)
+    assert cached.embed_documents(["shirt"]) == [[5.0, 1.0]]
+    assert cached.stats() == {"hits": 0, "misses": 1}
+
+
+def test_queries_are_not_cached(tmp_path):
+    stub = CountingEmbeddings()
+    cached = CachedEmbeddings(stub, "model-a", EmbeddingCache(str(tmp_path / "c.db")))
+    cached.embed_query("shirt")
+    cached.embed_query("shirt")
+    assert len(stub.calls) == 2
+    assert cached.stats() == {"hits": 0, "misses": 0}
+
+
+def test_local_backends_get_their_own_cache_key(make_rag):
+    keys = {
+        make_rag(
+            embedding_provider="local", local_embedding_backend=backend
+        )._embedding_key()
+        for backend in ("torch", "onnx")
+    }
+    assert len(keys) == 2
+    assert make_rag()._embedding_key() == make_rag().config.embedding_model
@@ -0,0 +1,39 @@
+import json
+from pathlib import Path
+
+import pytest
+
+LOCAL = dict(embedding_provider="local", local_embedding_backend="torch")
+
+
+@pytest.mark.parametrize(
+    "built_with, loaded_with, differs",
+    [
+        ({}, LOCAL, "provider"),
+        ({}, dict(embedding_model="models/other-embedding"), "model"),
+        (LOCAL, {**LOCAL, "local_embedding_backend": "onnx"}, "backend"),
+    ],
+)
+def test_store_from_other_embeddings_is_refused(
+    make_rag, built_with, loaded_with, differs
+):
+    make_rag(**built_with).ingest_data()
+
+    with pytest.raises(ValueError, match=f"differ in {differs}"):
+        make_rag(**loaded_with).load_vector_store()
+    # The same settings still load
+    assert make_rag(**built_with).load_vector_store().index.ntotal > 0
+
+
+def test_incremental_ingest_rebuilds_for_new_embeddings(make_rag, capsys):
+    make_rag().ingest_data()
+
+    rag = make_rag(**LOCAL)
+    rag.ingest_data(incremental=True)
+    assert "Embedding provider changed" in capsys.readouterr().out
+
+    stored = json.loads(
+        (Path(rag.config.vector_store_path) / "embeddings.json").read_text()
+    )
+    assert stored["provider"] == "local"
+    assert make_rag(**LOCAL).load_vector_store().index.ntotal > 0
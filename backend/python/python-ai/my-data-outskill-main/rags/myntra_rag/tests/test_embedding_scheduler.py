@@ -0,0 +1,156 @@
+import asyncio
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+import embedding_scheduler
+from embedding_scheduler import (
+    EmbeddingScheduler,
+    TokenBucket,
+    estimate_tokens,
+    is_retryable,
+    pack_batches,
+)
+
+
+class StatusError(Exception):
+    """Provider error carrying an HTTP status, like google.api_core errors"""
+
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class StubEmbeddings(Embeddings):
+    """Returns [len(text)] vectors; `fail` maps call number -> error to raise"""
+
+    def __init__(self, fail=None):
+        self.fail = fail or {}
+        self.calls: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        error = self.fail.get(len(self.calls))
+        if error is not None:
+            raise error
+        return [[float(len(t))] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def scheduler(embeddings, **kwargs) -> EmbeddingScheduler:
+    options = dict(max_batch_size=2, concurrency=1, base_delay=0.0, max_retries=3)
+    options.update(kwargs)
+    return EmbeddingScheduler(embeddings, "stub", **options)
+
+
+TEXTS = [f"text {'x' * i}" for i in range(7)]
+EXPECTED = [[float(len(t))] for t in TEXTS]
+
+
+def test_pack_batches_respects_limits_and_order():
+    texts = ["a" * 40, "b" * 40, "c" * 400, "d" * 4, "e" * 4, "f" * 4]
+    batches = pack_batches(texts, max_batch_size=2, max_batch_tokens=30)
+
+    assert [i for batch in batches for i in batch] == list(range(len(texts)))
+    for batch in batches:
+        assert len(batch) <= 2
+        # A single oversize text still gets a batch of its own
+        if len(batch) > 1:
+            assert sum(estimate_tokens(texts[i]) for i in batch) <= 30
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (StatusError(429), True),
+        (StatusError(503), True),
+        (TimeoutError(), True),
+        (StatusError(400), False),
+        (StatusError(403), False),
+        (ValueError("bad input"), False),
+    ],
+)
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+def test_is_retryable_follows_wrapped_cause():
+    try:
+        try:
+            raise StatusError(429)
+        except StatusError as e:
+            raise RuntimeError("Error embedding content") from e
+    except RuntimeError as wrapped:
+        assert is_retryable(wrapped)
+
+
+def test_transient_errors_are_retried():
+    stub = StubEmbeddings(fail={1: StatusError(429), 3: TimeoutError()})
+    s = scheduler(stub)
+
+    assert s.embed_documents(TEXTS) == EXPECTED
+    assert s.retries == 2
+    assert len(stub.calls) == 4 + 2
+
+
+def test_permanent_errors_are_not_retried():
+    stub = StubEmbeddings(fail={1: StatusError(400)})
+    s = scheduler(stub)
+
+    with pytest.raises(StatusError):
+        s.embed_documents(TEXTS[:2])
+    assert s.retries == 0
+    assert len(stub.calls) == 1
+
+
+def test_retries_give_up_after_max_retries():
+    stub = StubEmbeddings(fail={n: StatusError(503) for n in range(1, 10)})
+    s = scheduler(stub, max_retries=2)
+
+    with pytest.raises(StatusError):
+        s.embed_documents(TEXTS[:2])
+    assert len(stub.calls) == 3
+
+
+def test_retries_reacquire_rate_limits(monkeypatch):
+    acquired = []
+    original = TokenBucket.acquire
+
+    async def spy(self, amount=1.0):
+        acquired.append(amount)
+        await original(self, amount)
+
+    monkeypatch.setattr(embedding_scheduler.TokenBucket, "acquire", spy)
+    stub = StubEmbeddings(fail={1: StatusError(429), 2: StatusError(429)})
+    s = scheduler(stub, requests_per_minute=6000)
+
+    s.embed_documents(TEXTS[:2])
+    # One request token per attempt: the first try and both retries
+    assert acquired == [1, 1, 1]
+
+
+def test_resume_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.db")
+    # Batches still starting when the run fails must not reach the checkpoint
+    failing = StubEmbeddings(fail={n: StatusError(401) for n in range(3, 10)})
+    with pytest.raises(StatusError):
+        scheduler(failing, checkpoint_path=checkpoint).embed_documents(TEXTS)
+
+    stub = StubEmbeddings()
+    s = scheduler(stub, checkpoint_path=checkpoint)
+    assert s.embed_documents(TEXTS) == EXPECTED
+    # Two of the four batches finished before the failure
+    assert s.resumed_batches == 2
+    assert stub.calls == [TEXTS[4:6], TEXTS[6:]]
+    assert not (tmp_path / "checkpoint.db").exists()
+
+
+def test_concurrent_batches_keep_input_order():
+    async def run():
+        s = scheduler(StubEmbeddings(), concurrency=4)
+        return await s.aembed_documents(TEXTS)
+
+    assert asyncio.run(run()) == EXPECTED
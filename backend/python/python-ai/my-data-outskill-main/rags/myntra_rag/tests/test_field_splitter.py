@@ -0,0 +1,59 @@
+from context_builder import count_tokens
+from field_splitter import FieldAwareSplitter, parse_fields
+
+COLUMNS = ["product_name", "brand", "material", "description", "price"]
+SENTENCES = [
+    f"Sentence {i} describes the fabric and the fit in detail." for i in range(40)
+]
+
+
+def row_text(description: str) -> str:
+    return "\n".join(
+        [
+            "product_name: Linen Shirt",
+            "brand: Roadster",
+            "material: linen",
+            f"description: {description}",
+            "price: 1499",
+        ]
+    )
+
+
+def test_parse_fields_only_starts_later_columns():
+    text = row_text("Breathable.\nmaterial: not a field here\nprice: 1499 too")
+
+    fields = parse_fields(text, COLUMNS)
+    assert [name for name, _ in fields] == COLUMNS
+    # "material:" comes before description, so it stays part of it;
+    # "price:" is a later column and starts the next field
+    assert fields[3][1] == "description: Breathable.\nmaterial: not a field here"
+    assert fields[4][1] == "price: 1499 too\nprice: 1499"
+
+
+def test_short_rows_stay_whole():
+    text = row_text("A light summer shirt.")
+    assert FieldAwareSplitter(token_budget=512).split_text(text, COLUMNS) == [text]
+
+
+def test_long_rows_break_at_field_and_sentence_boundaries():
+    splitter = FieldAwareSplitter(token_budget=60)
+    chunks = splitter.split_text(row_text(" ".join(SENTENCES)), COLUMNS)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(c) <= 60 for c in chunks)
+    # Short attributes are never cut apart
+    for line in ("product_name: Linen Shirt", "brand: Roadster", "price: 1499"):
+        assert sum(line in c.split("\n") for c in chunks) == 1
+    # Descriptions only break between sentences
+    for sentence in SENTENCES:
+        assert sum(sentence in c for c in chunks) == 1
+
+
+def test_sentence_over_the_budget_is_split_by_words():
+    splitter = FieldAwareSplitter(token_budget=20)
+    sentence = " ".join(["cotton"] * 60)
+    chunks = splitter.split_text(row_text(sentence), COLUMNS)
+
+    assert len(chunks) > 3
+    assert sum(c.split().count("cotton") for c in chunks) == 60
+    assert "brand: Roadster" in chunks[0]
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from ann_index import STORAGE_TYPES, build_faiss_index, filtered_search
+
+
+def _allowed_bitmap(n: int, step: int) -> np.ndarray:
+    return np.packbits(np.arange(n) % step == 0, bitorder="little")
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf", "ivfpq"])
+@pytest.mark.parametrize("storage", STORAGE_TYPES)
+def test_filtered_search_returns_only_allowed_positions(index_type, storage):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((3000, 32)).astype(np.float32)
+    index = build_faiss_index(
+        vectors, index_type=index_type, storage=storage, ivf_nlist=16, pq_m=4
+    )
+    index.add(vectors)
+
+    _, positions = filtered_search(
+        index, vectors[:5], 10, _allowed_bitmap(len(vectors), 7), nprobe=16
+    )
+    assert positions.shape == (5, 10)
+    assert (positions >= 0).all()
+    assert (positions % 7 == 0).all()
+
+
+def test_filtered_search_pads_when_few_positions_match():
+    vectors = np.random.default_rng(1).standard_normal((1000, 16)).astype(np.float32)
+    index = build_faiss_index(vectors, storage="pq", pq_m=4)
+    index.add(vectors)
+    bitmap = np.packbits(np.arange(1000) < 3, bitorder="little")
+
+    _, positions = filtered_search(index, vectors[:2], 10, bitmap)
+    assert sorted(positions[0][positions[0] >= 0]) == [0, 1, 2]
+    assert (positions[:, 3:] == -1).all()
+
+
+@pytest.mark.parametrize("storage", STORAGE_TYPES)
+@pytest.mark.parametrize("shard_by", [None, "category"])
+def test_filtered_rag_search_per_storage(make_rag, top_brand, storage, shard_by):
+    rag = make_rag(vector_storage=storage, pq_m=4, shard_by=shard_by, shard_workers=0)
+    rag.ingest_data()
+
+    results = rag.search("cotton shirt", k=5, filter={"brand": top_brand})
+    assert len(results) == 5
+    assert all(d.metadata["brand"] == top_brand for d in results)
+
+
+def test_filtered_rag_search_matches_exact_search(make_rag, top_brand):
+    rag = make_rag()
+    rag.ingest_data()
+    store = rag.vector_store
+
+    results = rag.search("cotton shirt", k=5, filter={"brand": top_brand})
+
+    # Brute force over the chunks of matching rows
+    query = np.asarray(rag.embeddings.embed_query("cotton shirt"), dtype=np.float32)
+    matching = [
+        pos
+        for pos, doc_id in store.index_to_docstore_id.items()
+        if rag._hydrate([store.docstore.search(doc_id)])[0].metadata["brand"]
+        == top_brand
+    ]
+    vectors = store.index.reconstruct_batch(np.asarray(matching))
+    order = np.argsort(((vectors - query) ** 2).sum(axis=1), kind="stable")[:5]
+    expected = [
+        store.docstore.search(store.index_to_docstore_id[matching[i]]) for i in order
+    ]
+    assert [d.page_content for d in results] == [d.page_content for d in expected]
+
+
+def test_saved_metadata_index_is_loaded_without_a_docstore_scan(
+    make_rag, top_brand, monkeypatch
+):
+    make_rag().ingest_data()
+
+    rag = make_rag()
+    rag.load_vector_store(lazy=True)
+    monkeypatch.setattr(
+        rag, "_build_metadata_index", lambda: pytest.fail("metadata index rebuilt")
+    )
+    results = rag.search("cotton shirt", k=5, filter={"brand": top_brand})
+    assert all(d.metadata["brand"] == top_brand for d in results)
@@ -0,0 +1,117 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def chunk_metadata(rag, product_key: str):
+    store = rag.vector_store
+    return store.docstore.search(f"{product_key}:0").metadata
+
+
+def test_edit_to_an_excluded_column_is_reingested(make_rag, catalog, tmp_path, capsys):
+    csv = str(tmp_path / "catalog.csv")
+    shutil.copy(catalog, csv)
+    rag = make_rag(
+        csv_file_path=csv, compact_metadata=False, embed_exclude_columns=["rating"]
+    )
+    rag.ingest_data()
+
+    df = pd.read_csv(csv)
+    key = df.loc[5, "product_id"]
+    df.loc[5, "rating"] = 0.5
+    df.to_csv(csv, index=False)
+    capsys.readouterr()
+    rag.ingest_data(incremental=True)
+
+    assert "0 added, 1 changed, 0 removed" in capsys.readouterr().out
+    assert chunk_metadata(rag, key)["rating"] == 0.5
+
+
+def test_incremental_ingest_applies_only_the_delta(make_rag, catalog, tmp_path, capsys):
+    csv = str(tmp_path / "catalog.csv")
+    df = pd.read_csv(catalog)
+    df.to_csv(csv, index=False)
+    rag = make_rag(csv_file_path=csv)
+    rag.ingest_data()
+
+    removed, changed = df.loc[0, "product_id"], df.loc[1, "product_id"]
+    added = df.loc[[2]].assign(product_id="NEW0001")
+    df.loc[1, "description"] = "Completely rewritten description"
+    df = pd.concat([added, df.drop(index=0)], ignore_index=True)
+    df.to_csv(csv, index=False)
+
+    capsys.readouterr()
+    rag.ingest_data(incremental=True)
+    out = capsys.readouterr().out
+
+    assert "1 added, 1 changed, 1 removed, 398 unchanged" in out
+    ids = set(rag.vector_store.index_to_docstore_id.values())
+    assert not any(i.startswith(f"{removed}:") for i in ids)
+    assert "NEW0001:0" in ids
+    assert len(ids) == rag.vector_store.index.ntotal
+
+    # Every row moved down by one - chunks must hydrate to their own row
+    for key in (changed, df.loc[300, "product_id"]):
+        chunk = rag.vector_store.docstore.search(f"{key}:0")
+        assert rag._hydrate([chunk])[0].metadata["product_id"] == key
+    texts = [
+        rag.vector_store.docstore.search(i).page_content
+        for i in ids
+        if i.startswith(f"{changed}:")
+    ]
+    assert any("Completely rewritten description" in t for t in texts)
+
+    capsys.readouterr()
+    rag.ingest_data(incremental=True)
+    assert "Index is up to date." in capsys.readouterr().out
+
+
+def test_incremental_matches_a_full_rebuild(make_rag, catalog, tmp_path):
+    csv = str(tmp_path / "catalog.csv")
+    df = pd.read_csv(catalog)
+    df.to_csv(csv, index=False)
+    incremental = make_rag(csv_file_path=csv)
+    incremental.ingest_data()
+
+    df.loc[10, "price"] = 1
+    df.drop(index=[20, 21]).to_csv(csv, index=False)
+    incremental.ingest_data(incremental=True)
+
+    full = make_rag(csv_file_path=csv, vector_store_path=str(tmp_path / "full"))
+    full.ingest_data()
+
+    def snapshot(rag):
+        store = rag.vector_store
+        return {
+            doc_id: store.docstore.search(doc_id).page_content
+            for doc_id in store.index_to_docstore_id.values()
+        }
+
+    assert snapshot(incremental) == snapshot(full)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "ivfpq"])
+def test_removals_keep_positions_aligned(make_rag, catalog, tmp_path, index_type):
+    csv = str(tmp_path / "catalog.csv")
+    df = pd.read_csv(catalog)
+    df.to_csv(csv, index=False)
+    rag = make_rag(csv_file_path=csv, index_type=index_type, ivf_nlist=4, pq_m=4)
+    rag.ingest_data()
+
+    df.drop(index=range(0, 100, 2)).to_csv(csv, index=False)
+    rag.ingest_data(incremental=True)
+
+    # Every chunk must come back as the nearest neighbour of its own text
+    store = rag.vector_store
+    doc_ids = list(store.index_to_docstore_id.values())[::10][:30]
+    texts = [store.docstore.search(doc_id).page_content for doc_id in doc_ids]
+    vectors = np.asarray(rag.embeddings.embed_documents(texts), dtype=np.float32)
+    _, positions = store.index.search(vectors, 1)
+    found = [
+        store.docstore.search(store.index_to_docstore_id[int(p)]).page_content
+        for p in positions[:, 0]
+    ]
+    # Compared by text - the synthetic catalog repeats some chunks verbatim
+    assert found == texts
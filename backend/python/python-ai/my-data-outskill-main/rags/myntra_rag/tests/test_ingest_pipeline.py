@@ -0,0 +1,29 @@
+import pytest
+
+import ingest_pipeline
+
+
+def test_process_pool_ingest_matches_serial(make_rag, tmp_path):
+    serial = make_rag(vector_store_path=str(tmp_path / "serial"))
+    serial.ingest_data()
+    pooled = make_rag(
+        vector_store_path=str(tmp_path / "pooled"),
+        split_workers=2,
+        ingest_block_rows=100,
+    )
+    pooled.ingest_data()
+
+    assert pooled.last_ingest_stats["stages"]["split"]["items"] == 400
+    assert dict(pooled.vector_store.index_to_docstore_id) == dict(
+        serial.vector_store.index_to_docstore_id
+    )
+
+
+def test_single_block_catalog_starts_no_processes(make_rag, monkeypatch):
+    def fail(*args, **kwargs):
+        pytest.fail("process pool started for a single block")
+
+    monkeypatch.setattr(ingest_pipeline, "ProcessPoolExecutor", fail)
+    rag = make_rag(split_workers=None)
+    rag.ingest_data()
+    assert rag.last_ingest_stats["stages"]["split"]["items"] == 400
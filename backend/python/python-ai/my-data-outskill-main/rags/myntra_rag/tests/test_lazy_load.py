@@ -0,0 +1,40 @@
+import pytest
+
+from native_store import NativeDocstore
+
+
+def results(rag, top_brand):
+    """Documents returned for a few plain, filtered and batched searches"""
+    docs = [
+        rag.search("cotton shirt", k=5),
+        rag.search("blue denim jacket", k=5, filter={"brand": top_brand}),
+        *rag.search_batch(["running shoes", "silk saree"], k=3),
+    ]
+    return [[(d.page_content, d.metadata) for d in found] for found in docs]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf"])
+@pytest.mark.parametrize("compact", [True, False])
+def test_lazy_load_matches_an_eager_load(make_rag, top_brand, index_type, compact):
+    options = dict(index_type=index_type, ivf_nlist=4, compact_metadata=compact)
+    make_rag(**options).ingest_data()
+
+    eager = make_rag(**options)
+    eager.vector_store = eager.load_vector_store(lazy=False)
+    lazy = make_rag(**options)
+    lazy.vector_store = lazy.load_vector_store(lazy=True)
+
+    assert isinstance(lazy.vector_store.docstore, NativeDocstore)
+    assert results(lazy, top_brand) == results(eager, top_brand)
+
+
+def test_lazy_store_is_read_only(make_rag):
+    make_rag().ingest_data()
+    store = make_rag().load_vector_store(lazy=True)
+
+    with pytest.raises(NotImplementedError, match="read-only"):
+        store.docstore.add(
+            {"new": store.docstore.search(store.index_to_docstore_id[0])}
+        )
+    with pytest.raises(NotImplementedError, match="read-only"):
+        store.docstore.delete([store.index_to_docstore_id[0]])
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+DOCS = {
+    "shirt": "Blue cotton shirt with a slim fit",
+    "jeans": "Dark blue denim jeans",
+    "dress": "Red cotton summer dress, cotton lining",
+    "sku": "Running shoes PROD001 size 8-10",
+}
+
+
+@pytest.fixture(scope="module")
+def index() -> LexicalIndex:
+    return LexicalIndex.build(list(DOCS), list(DOCS.values()))
+
+
+def test_tokenize_keeps_skus_and_ranges_whole():
+    assert tokenize("Shoes PROD001, size 8-10!") == ["shoes", "prod001", "size", "8-10"]
+
+
+def test_search_ranks_by_bm25(index):
+    ids = [doc_id for doc_id, _ in index.search("cotton", k=10)]
+    # Two mentions in a document of similar length outrank one
+    assert ids == ["dress", "shirt"]
+
+
+def test_search_scores_every_query_term(index):
+    results = index.search("blue cotton shirt", k=10)
+    assert results[0][0] == "shirt"
+    assert {doc_id for doc_id, _ in results} == {"shirt", "jeans", "dress"}
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_finds_exact_identifiers(index):
+    assert index.search("prod001", k=1)[0][0] == "sku"
+    assert index.search("unknown words", k=5) == []
+
+
+def test_save_and_load_round_trip(index, tmp_path):
+    index.save(str(tmp_path))
+    loaded = LexicalIndex.load(str(tmp_path))
+    assert loaded.search("blue cotton shirt", k=10) == index.search(
+        "blue cotton shirt", k=10
+    )
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], k=60)
+    # a: 1/61 + 1/62, c: 1/63 + 1/61, b: 1/62, d: 1/63
+    assert fused == ["a", "c", "b", "d"]
+
+
+def test_hybrid_search_returns_lexical_matches(make_rag, catalog):
+    product = pd.read_csv(catalog).iloc[7]
+    rag = make_rag(search_type="hybrid")
+    rag.ingest_data()
+
+    # Hashing embeddings know nothing of ids - the BM25 side has to find it
+    results = rag.search(str(product["product_id"]), k=5)
+    assert product["product_id"] in {d.metadata["product_id"] for d in results}
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from metadata_index import MetadataIndex
+
+ROWS = [
+    {"brand": "Nike", "price": 1500, "in_stock": True, "chunk_index": 0},
+    {"brand": "Puma", "price": 2500, "in_stock": False, "chunk_index": 0},
+    {"brand": "Nike", "price": 999, "in_stock": False, "chunk_index": 1},
+    {"brand": "Adidas", "price": None, "in_stock": True, "chunk_index": 0},
+    {"brand": "Nike", "price": 4000, "in_stock": True, "chunk_index": 0},
+    {"brand": None, "price": 2000, "in_stock": True, "chunk_index": 0},
+    {"brand": "Puma", "price": 1999, "in_stock": True, "chunk_index": 0},
+    {"brand": "Adidas", "price": 3000, "in_stock": False, "chunk_index": 0},
+    {"brand": "Nike", "price": 2000, "in_stock": True, "chunk_index": 0},
+]
+
+
+def positions(bitmap: np.ndarray) -> list:
+    bits = np.unpackbits(bitmap, bitorder="little")[: len(ROWS)]
+    return np.flatnonzero(bits).tolist()
+
+
+def matching(predicate) -> list:
+    return [i for i, row in enumerate(ROWS) if predicate(row)]
+
+
+@pytest.fixture(scope="module")
+def index() -> MetadataIndex:
+    return MetadataIndex(ROWS)
+
+
+@pytest.mark.parametrize(
+    "filter, predicate",
+    [
+        ({"brand": "Nike"}, lambda r: r["brand"] == "Nike"),
+        ({"brand": ["Puma", "Adidas"]}, lambda r: r["brand"] in ("Puma", "Adidas")),
+        ({"brand": {"$ne": "Nike"}}, lambda r: r["brand"] not in ("Nike", None)),
+        ({"in_stock": True}, lambda r: r["in_stock"]),
+        (
+            {"price": {"$lt": 2000}},
+            lambda r: r["price"] is not None and r["price"] < 2000,
+        ),
+        (
+            {"price": {"$gte": 1500, "$lte": 3000}},
+            lambda r: r["price"] is not None and 1500 <= r["price"] <= 3000,
+        ),
+        ({"price": 2000}, lambda r: r["price"] == 2000),
+        (
+            {"brand": "Nike", "price": {"$gt": 1000}, "in_stock": True},
+            lambda r: r["brand"] == "Nike" and r["in_stock"] and r["price"] > 1000,
+        ),
+        ({"brand": "Reebok"}, lambda r: False),
+    ],
+)
+def test_select_matches_a_scan(index, filter, predicate):
+    bitmap, count = index.select(filter)
+    assert positions(bitmap) == matching(predicate)
+    assert count == len(matching(predicate))
+
+
+def test_bitmap_is_packed_for_faiss(index):
+    bitmap, _ = index.select({"brand": "Nike"})
+    assert bitmap.dtype == np.uint8
+    assert len(bitmap) == (len(ROWS) + 7) // 8
+
+
+def test_internal_fields_are_not_indexed(index):
+    assert index.fields == ["brand", "in_stock", "price"]
+    with pytest.raises(ValueError, match="not indexed"):
+        index.select({"chunk_index": 0})
+
+
+def test_unknown_operator_is_rejected(index):
+    with pytest.raises(ValueError, match="Unsupported filter operator"):
+        index.select({"price": {"$between": [1, 2]}})
+
+
+def test_high_cardinality_text_is_skipped():
+    rows = [{"name": f"product {i}", "brand": "Nike"} for i in range(20)]
+    index = MetadataIndex(rows, max_categorical_values=10)
+    assert index.fields == ["brand"]
+
+
+def test_save_load_round_trip(index, tmp_path):
+    index.save(str(tmp_path))
+    loaded = MetadataIndex.load(str(tmp_path))
+
+    assert loaded.fields == index.fields
+    assert loaded.size == index.size
+    for filter in (
+        {"brand": "Nike"},
+        {"in_stock": False},
+        {"price": {"$gte": 1500, "$lt": 3000}},
+        {"brand": {"$ne": "Puma"}, "price": {"$gt": 1000}},
+    ):
+        assert positions(loaded.select(filter)[0]) == positions(index.select(filter)[0])
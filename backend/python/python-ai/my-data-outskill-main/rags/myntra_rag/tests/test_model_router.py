@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+
+from model_router import ModelRouter
+
+
+class FakeEndpoints:
+    """Per-model latency (seconds) and failures, recording every call"""
+
+    def __init__(self, latency=None, failing=()):
+        self.latency = latency or {}
+        self.failing = set(failing)
+        self.calls = []
+
+    def __call__(self, model: str) -> str:
+        self.calls.append(model)
+        time.sleep(self.latency.get(model, 0))
+        if model in self.failing:
+            raise RuntimeError(f"{model} is down")
+        return f"answer from {model}"
+
+    async def acall(self, model: str) -> str:
+        self.calls.append(model)
+        await asyncio.sleep(self.latency.get(model, 0))
+        if model in self.failing:
+            raise RuntimeError(f"{model} is down")
+        return f"answer from {model}"
+
+
+def test_invoke_falls_over_to_the_next_candidate():
+    router = ModelRouter()
+    endpoints = FakeEndpoints(failing={"a", "b"})
+
+    model, answer, hedged = router.invoke(["a", "b", "c"], endpoints)
+    assert (model, answer, hedged) == ("c", "answer from c", False)
+    assert endpoints.calls == ["a", "b", "c"]
+    assert router.stats()["a"]["error_rate"] == 1.0
+    assert router.stats()["c"]["error_rate"] == 0.0
+
+
+def test_invoke_raises_when_every_candidate_fails():
+    router = ModelRouter()
+    with pytest.raises(RuntimeError, match="b is down"):
+        router.invoke(["a", "b"], FakeEndpoints(failing={"a", "b"}))
+
+
+def test_invoke_hedges_a_slow_primary():
+    router = ModelRouter()
+    endpoints = FakeEndpoints(latency={"a": 0.5})
+
+    model, _, hedged = router.invoke(["a", "b"], endpoints, hedge_delay=0.05)
+    assert (model, hedged) == ("b", True)
+
+
+def test_ainvoke_falls_over_to_the_next_candidate():
+    router = ModelRouter()
+    endpoints = FakeEndpoints(failing={"a"})
+
+    model, _, hedged = asyncio.run(router.ainvoke(["a", "b"], endpoints.acall))
+    assert (model, hedged) == ("b", False)
+
+
+def test_ainvoke_does_not_record_the_cancelled_loser():
+    router = ModelRouter()
+    endpoints = FakeEndpoints(latency={"a": 0.5})
+
+    model, _, hedged = asyncio.run(
+        router.ainvoke(["a", "b"], endpoints.acall, hedge_delay=0.05)
+    )
+    assert (model, hedged) == ("b", True)
+    assert "a" not in router.stats()
+    assert router.stats()["b"]["samples"] == 1
+
+
+def test_rank_prefers_healthy_then_fast_models():
+    router = ModelRouter(min_samples=2)
+    for _ in range(2):
+        router.record("slow", 0.5, True)
+        router.record("fast", 0.1, True)
+        router.record("broken", 0.05, False)
+
+    assert router.rank(["broken", "slow", "fast", "new"]) == [
+        "new",
+        "fast",
+        "slow",
+        "broken",
+    ]
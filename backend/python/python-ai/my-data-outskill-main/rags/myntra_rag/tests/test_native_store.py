@@ -0,0 +1,171 @@
+import json
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pandas as pd
+import pytest
+from langchain.schema import Document
+
+import native_store
+
+
+def read_manifest_files(store: str):
+    with open(Path(store) / native_store.MANIFEST_FILE, encoding="utf-8") as f:
+        return json.load(f)["files"]
+
+
+def test_manifest_covers_side_stores(make_rag, tmp_path):
+    store = str(tmp_path / "store")
+    rag = make_rag(shard_by="category", shard_workers=0, rescore_factor=2)
+    rag.ingest_data()
+
+    files = read_manifest_files(store)
+    for name in (
+        "index.faiss",
+        "embeddings.json",
+        "rows/row_index.npy",
+        "lexical_index.npz",
+        "metadata_index.npz",
+        "ingest_state.json",
+        "vectors.f32",
+        "shards/shards.json",
+    ):
+        assert name in files
+    # Every file on disk apart from the manifest itself is covered
+    on_disk = {
+        p.relative_to(store).as_posix()
+        for p in Path(store).rglob("*")
+        if p.is_file() and p.name != native_store.MANIFEST_FILE
+    }
+    assert on_disk == set(files)
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_ingest_writes_the_manifest_once(
+    make_rag, catalog, tmp_path, monkeypatch, incremental
+):
+    make_rag().ingest_data()
+    # One product fewer, so the incremental ingest has a delta to save
+    edited = str(tmp_path / "edited.csv")
+    pd.read_csv(catalog).iloc[1:].to_csv(edited, index=False)
+    writes = []
+    write_manifest = native_store._write_manifest
+    monkeypatch.setattr(
+        native_store,
+        "_write_manifest",
+        lambda *args: writes.append(args) or write_manifest(*args),
+    )
+
+    make_rag(csv_file_path=edited).ingest_data(incremental=incremental)
+    assert len(writes) == 1
+    make_rag().load_vector_store(lazy=False)
+
+
+def test_lazy_load_checks_sizes_without_hashing(make_rag, monkeypatch):
+    make_rag().ingest_data()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("lazy load hashed a file")
+
+    monkeypatch.setattr(native_store, "file_checksum", fail)
+    rag = make_rag(lazy_load=True)
+    rag.vector_store = rag.load_vector_store()
+    assert rag.vector_store.index.ntotal > 0
+
+
+def snapshot(store):
+    return [
+        (doc_id, doc.page_content, doc.metadata)
+        for pos in range(store.index.ntotal)
+        for doc_id in [store.index_to_docstore_id[pos]]
+        for doc in [store.docstore.search(doc_id)]
+    ]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_round_trip(make_rag, lazy):
+    rag = make_rag()
+    rag.ingest_data()
+    saved = rag.vector_store
+
+    loaded = make_rag().load_vector_store(lazy=lazy)
+    assert snapshot(loaded) == snapshot(saved)
+    query = np.random.default_rng(0).random((3, saved.index.d), dtype=np.float32)
+    assert np.array_equal(
+        saved.index.search(query, 5)[1], loaded.index.search(query, 5)[1]
+    )
+    assert loaded.docstore.search("missing") == "ID missing not found."
+
+
+def test_unicode_and_numpy_metadata_round_trip(tmp_path):
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    index = faiss.IndexFlatL2(4)
+    index.add(np.eye(4, dtype=np.float32))
+    docs = {
+        f"id{i}": Document(
+            page_content=text, metadata={"price": np.int64(i), "tags": ["a", "ü"]}
+        )
+        for i, text in enumerate(["plain", "Kurta – ₹999", "日本語", ""])
+    }
+    store = FAISS(None, index, InMemoryDocstore(docs), dict(enumerate(docs)))
+    native_store.save_store(store, str(tmp_path))
+
+    loaded_index, docstore, id_map = native_store.load_store(str(tmp_path))
+    assert loaded_index.ntotal == 4
+    for pos, doc_id in id_map.items():
+        assert docstore.search(doc_id).page_content == docs[doc_id].page_content
+        assert docstore.search(doc_id).metadata == {"price": pos, "tags": ["a", "ü"]}
+
+
+def corrupt(path: Path):
+    """Flip one byte without changing the file size"""
+    data = bytearray(path.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+
+def test_checksum_failure_is_reported(make_rag, tmp_path):
+    make_rag().ingest_data()
+    corrupt(tmp_path / "store" / "docstore" / "content.data.npy")
+
+    with pytest.raises(ValueError, match="fails its checksum"):
+        make_rag().load_vector_store(lazy=False)
+    # Lazy loads check sizes only, so same-size damage is not seen there
+    make_rag().load_vector_store(lazy=True)
+
+
+def test_side_store_checksum_failure_is_reported(make_rag, tmp_path):
+    make_rag().ingest_data()
+    corrupt(tmp_path / "store" / "lexical_index.npz")
+
+    with pytest.raises(ValueError, match="lexical_index.npz"):
+        make_rag().load_vector_store(lazy=False)
+
+
+def test_truncated_and_missing_files_are_reported(make_rag, tmp_path):
+    make_rag().ingest_data()
+    index_file = tmp_path / "store" / "index.faiss"
+    index_file.write_bytes(index_file.read_bytes()[:-1])
+    with pytest.raises(ValueError, match="wrong size"):
+        make_rag().load_vector_store(lazy=True)
+
+    index_file.unlink()
+    with pytest.raises(ValueError, match="missing"):
+        make_rag().load_vector_store(lazy=True)
+
+
+def test_interrupted_save_fails_verification(make_rag, tmp_path, monkeypatch):
+    rag = make_rag()
+    rag.ingest_data()
+
+    # The manifest is written last - a save that dies before it leaves the
+    # old manifest, which no longer matches the new files
+    monkeypatch.setattr(native_store, "_write_manifest", lambda *args: None)
+    rag.vector_store.add_texts(["one more product"])
+    rag.save_vector_store()
+    monkeypatch.undo()
+    with pytest.raises(ValueError):
+        make_rag().load_vector_store(lazy=False)
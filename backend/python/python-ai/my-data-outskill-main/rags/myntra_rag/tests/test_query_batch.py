@@ -0,0 +1,45 @@
+import pytest
+
+QUESTIONS = [f"cotton shirt {i}" for i in range(6)]
+
+
+@pytest.fixture
+def rag(make_rag):
+    rag = make_rag(metrics_enabled=True)
+    rag.ingest_data()
+    return rag
+
+
+def fail_for(rag, monkeypatch, failing: str):
+    agenerate = rag._agenerate
+
+    async def generate(question, *args):
+        if question == failing:
+            raise RuntimeError("provider unavailable")
+        return await agenerate(question, *args)
+
+    monkeypatch.setattr(rag, "_agenerate", generate)
+
+
+def test_results_keep_input_order(rag):
+    results = rag.query_batch(QUESTIONS, concurrency=3)
+    assert [r["question"] for r in results] == QUESTIONS
+    assert all("answer" in r for r in results)
+
+
+def test_a_failed_item_does_not_fail_the_batch(rag, monkeypatch):
+    fail_for(rag, monkeypatch, QUESTIONS[2])
+    results = rag.query_batch(QUESTIONS)
+
+    assert [r["question"] for r in results] == QUESTIONS
+    assert results[2]["error"] == "provider unavailable"
+    assert all("answer" in r for i, r in enumerate(results) if i != 2)
+
+
+def test_each_item_is_counted(rag, monkeypatch):
+    fail_for(rag, monkeypatch, QUESTIONS[0])
+    rag.query_batch(QUESTIONS)
+
+    counters = rag.metrics.snapshot()["counters"]
+    assert counters['queries_total{entry="aquery_batch",outcome="answered"}'] == 5
+    assert counters['queries_total{entry="aquery_batch",outcome="error"}'] == 1
@@ -0,0 +1,77 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from metadata_index import MetadataIndex
+from rag_server import MAX_BODY_BYTES, HTTPError, RAGServer
+
+
+def read_request(server: RAGServer, raw: bytes):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await server._read_request(reader)
+
+    return asyncio.run(run())
+
+
+def post(length: str, body: bytes = b"") -> bytes:
+    return f"POST /search HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode() + body
+
+
+@pytest.fixture
+def server(make_rag):
+    return RAGServer(make_rag(), port=0)
+
+
+def test_request_body_is_read(server):
+    method, path, _, body = read_request(server, post("2", b"{}"))
+    assert (method, path, body) == ("POST", "/search", b"{}")
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "+5", "5_0", "1.5"])
+def test_invalid_content_length_is_rejected(server, length):
+    with pytest.raises(HTTPError) as e:
+        read_request(server, post(length))
+    assert e.value.status == 400
+
+
+def test_oversize_body_is_rejected(server):
+    with pytest.raises(HTTPError) as e:
+        read_request(server, post(str(MAX_BODY_BYTES + 1)))
+    assert e.value.status == 413
+
+
+def test_concurrent_searches_from_worker_threads(make_rag, top_brand):
+    rag = make_rag(search_type="hybrid")
+    rag.ingest_data()
+    # A fresh instance builds its side stores on first use, like a server
+    rag = make_rag(search_type="hybrid")
+    rag.QUERY_EMBEDDING_MEMO_SIZE = 4
+
+    def search(i: int):
+        return rag.search(f"cotton shirt {i % 8}", k=5, filter={"brand": top_brand})
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(search, range(64)))
+
+    assert all(len(r) == 5 for r in results)
+    assert all(d.metadata["brand"] == top_brand for r in results for d in r)
+    assert len(rag._query_embeddings) <= 4
+
+
+@pytest.mark.parametrize("saved_index", [True, False])
+def test_warm_up_does_not_scan_the_docstore(make_rag, monkeypatch, saved_index):
+    make_rag().ingest_data()
+    if not saved_index:
+        # A store written before the filter index was saved with it
+        monkeypatch.setattr(MetadataIndex, "exists", classmethod(lambda *_: False))
+
+    rag = make_rag(lazy_load=True)
+    monkeypatch.setattr(
+        rag, "_build_metadata_index", lambda: pytest.fail("metadata index rebuilt")
+    )
+    RAGServer(rag, port=0).warm_up()
+    assert (rag.metadata_index is not None) is saved_index
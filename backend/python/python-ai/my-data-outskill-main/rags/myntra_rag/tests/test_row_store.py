@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from row_store import RowStore
+
+ROWS = [
+    {"row_index": 3, "brand": "Nike", "price": 1500, "rating": None},
+    {"row_index": 0, "brand": "Puma", "price": np.int64(999), "rating": 4.5},
+    {"row_index": 7, "brand": "Bata", "price": 2000, "rating": float("nan")},
+]
+
+
+@pytest.fixture
+def saved(tmp_path) -> str:
+    RowStore.from_metadatas(ROWS).save(str(tmp_path))
+    return str(tmp_path)
+
+
+def test_round_trip_is_memory_mapped(saved):
+    store = RowStore.load(saved)
+    assert isinstance(store.row_indices, np.memmap)
+    assert len(store) == 3
+    assert store.get(0) == {
+        "row_index": 0,
+        "brand": "Puma",
+        "price": 999,
+        "rating": 4.5,
+    }
+    assert store.get(3)["rating"] is None
+    assert math.isnan(store.get(7)["rating"])
+    with pytest.raises(KeyError):
+        store.get(5)
+
+
+def test_hydrate_keeps_chunk_fields(saved):
+    store = RowStore.load(saved)
+    hydrated = store.hydrate({"row_index": 3, "chunk_index": 2})
+    assert hydrated["brand"] == "Nike"
+    assert hydrated["chunk_index"] == 2
+
+
+def test_frame_for_allows_repeats_in_order(saved):
+    frame = RowStore.load(saved).frame_for([7, 0, 7, 3])
+    assert frame["brand"].tolist() == ["Bata", "Puma", "Bata", "Nike"]
+
+
+def test_decoded_rows_cache_is_bounded(saved):
+    store = RowStore.load(saved)
+    store.cache_size = 2
+    for row_index in (0, 3, 7, 0):
+        store.get(row_index)
+    assert list(store._cache) == [7, 0]
+
+
+def test_legacy_json_is_read_and_replaced(tmp_path):
+    frame = pd.DataFrame.from_records(ROWS[:2])
+    frame.to_json(tmp_path / RowStore.LEGACY_FILE_NAME, orient="table", index=False)
+    assert RowStore.exists(str(tmp_path))
+
+    store = RowStore.load(str(tmp_path))
+    assert store.get(3)["brand"] == "Nike"
+    store.save(str(tmp_path))
+    assert not (tmp_path / RowStore.LEGACY_FILE_NAME).exists()
+    assert RowStore.load(str(tmp_path)).get(0)["brand"] == "Puma"
+
+
+def test_compact_store_hydrates_search_results(make_rag, top_brand):
+    rag = make_rag()
+    rag.ingest_data()
+
+    stored = rag.vector_store.docstore.search(rag.vector_store.index_to_docstore_id[0])
+    assert set(stored.metadata) == {"row_index", "chunk_index"}
+
+    lazy = make_rag(lazy_load=True)
+    results = lazy.search("cotton shirt", k=5, filter={"brand": top_brand})
+    assert all(d.metadata["brand"] == top_brand for d in results)
+    assert all("product_id" in d.metadata for d in results)
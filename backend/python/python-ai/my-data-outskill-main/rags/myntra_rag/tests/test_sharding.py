@@ -0,0 +1,78 @@
+import faiss
+import numpy as np
+import pytest
+
+from sharded_index import SHARDS_DIR, ShardedIndex, shard_value
+
+
+@pytest.mark.parametrize(
+    "index_type, storage, expected",
+    [
+        ("hnsw", "float32", faiss.IndexFlatL2),
+        ("ivf", "int8", faiss.IndexScalarQuantizer),
+        ("ivfpq", "float32", faiss.IndexPQ),
+    ],
+)
+def test_sharded_store_keeps_a_flat_main_index(make_rag, index_type, storage, expected):
+    rag = make_rag(
+        shard_by="category",
+        shard_workers=0,
+        index_type=index_type,
+        vector_storage=storage,
+        pq_m=4,
+        ivf_nlist=4,
+    )
+    rag.ingest_data()
+
+    assert type(rag.vector_store.index) is expected
+    assert rag.get_shards() is not None
+    assert len(rag.search("cotton shirt", k=5)) == 5
+
+
+def test_unsharded_store_builds_the_configured_index(make_rag):
+    rag = make_rag(index_type="hnsw")
+    rag.ingest_data()
+    assert isinstance(rag.vector_store.index, faiss.IndexHNSWFlat)
+
+
+def sharded_by_size(directory, values) -> ShardedIndex:
+    shards = []
+    for i, value in enumerate(values):
+        (directory / SHARDS_DIR / str(i)).mkdir(parents=True)
+        np.save(directory / SHARDS_DIR / str(i) / "positions.npy", np.arange(1))
+        shards.append({"dir": str(i), "value": value, "count": 1})
+    return ShardedIndex(
+        str(directory), {"shard_by": "size", "version": "v1", "shards": shards}
+    )
+
+
+def test_filter_values_are_normalized_like_row_values(tmp_path):
+    # A numeric column with missing values is read back as floats
+    rows = [{"size": 38.0}, {"size": 40.0}, {"size": float("nan")}]
+    values = [shard_value(row, "size", 0) for row in rows]
+    assert values == ["38", "40", ""]
+    shards = sharded_by_size(tmp_path, values)
+
+    def selected(filter):
+        return [s["value"] for s in shards.shards_for(filter)]
+
+    assert selected({"size": 38}) == ["38"]
+    assert selected({"size": np.int64(40)}) == ["40"]
+    assert selected({"size": (38.0, 40)}) == ["38", "40"]
+    assert selected({"size": {"$ne": 38}}) == ["40", ""]
+
+
+def test_close_stops_the_shard_workers(make_rag):
+    rag = make_rag(shard_by="category", shard_workers=1)
+    rag.ingest_data()
+    assert len(rag.search("cotton shirt", k=5)) == 5
+    executor = rag._shard_executor
+    assert executor is not None
+
+    rag.close()
+    assert rag._shard_executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+    # A later search starts a fresh pool
+    assert len(rag.search("cotton shirt", k=5)) == 5
+    rag.close()
@@ -0,0 +1,65 @@
+from typing import Iterator
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from myntra_rag import StreamedAnswer
+
+
+class TokenLLM:
+    """Streams a fixed answer a few characters at a time"""
+
+    def __init__(self, answer: str):
+        self.answer = answer
+
+    def stream(self, prompt) -> Iterator[AIMessageChunk]:
+        for i in range(0, len(self.answer), 4):
+            yield AIMessageChunk(content=self.answer[i : i + 4])
+
+    def invoke(self, prompt) -> AIMessage:
+        return AIMessage(content=self.answer)
+
+
+def test_empty_tokens_are_skipped_and_the_result_is_filled_at_the_end():
+    completed = []
+    stream = StreamedAnswer(
+        iter(["Cot", "", "ton ", "shirts"]),
+        {"question": "q", "model": "m"},
+        0.0,
+        completed.append,
+    )
+    assert stream.result is None
+
+    assert list(stream) == ["Cot", "ton ", "shirts"]
+    assert stream.result["answer"] == "Cotton shirts"
+    assert stream.result["model"] == "m"
+    assert 0 < stream.result["time_to_first_token"] <= stream.result["latency"]
+    assert completed == [stream.result]
+
+
+def test_query_stream_yields_the_same_answer_as_query(make_rag, monkeypatch):
+    rag = make_rag()
+    rag.ingest_data()
+    llm = TokenLLM("Try the linen shirts from the summer range.")
+    monkeypatch.setattr(rag, "get_llm", lambda model=None: llm)
+
+    stream = rag.query_stream("cotton shirt")
+    tokens = list(stream)
+    assert len(tokens) > 1
+    assert "".join(tokens) == stream.result["answer"] == llm.answer
+
+    expected = rag.query("cotton shirt")
+    assert stream.result["answer"] == expected["answer"]
+    assert stream.result["sources"] == expected["sources"]
+
+
+def test_cached_answer_streams_as_one_token(make_rag, monkeypatch):
+    rag = make_rag(answer_cache_enabled=True)
+    rag.ingest_data()
+    llm = TokenLLM("Try the linen shirts from the summer range.")
+    monkeypatch.setattr(rag, "get_llm", lambda model=None: llm)
+    first = rag.query_stream("cotton shirt")
+    list(first)
+
+    again = rag.query_stream("cotton shirt")
+    assert list(again) == [llm.answer]
+    assert again.result["cached"]